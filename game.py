@@ -3,15 +3,23 @@
 
 import os
 import sys
-import time
 from typing import Optional, Dict, List, Tuple
 
 import pygame
 from game.game_constants import (
-    GAME_TITLE, GAME_FONT, FPS, WIDTH, HEIGHT, GAMEICON, SCALE, SHEET_SIZE, TILE_SIZE,
-    GAME_MAPS, EVENTS_DATA, TILESET, OBJECTSET, SPRITESHEET, HEROSET, SAVE_FILE,
+    GAME_TITLE, GAME_FONT, DIRTY_RECTS, SIM_TICK, MAX_CATCHUP_TICKS, TEXT_CACHE_BYTES, WIDTH, HEIGHT, GAMEICON, SCALE, SHEET_SIZE, TILE_SIZE,
+    GAME_MAPS, WARM_MAPS, EVENTS_DATA, SCRIPTS_DATA, TILESET, OBJECTSET, SPRITESHEET, HEROSET, SAVE_FILE,
 )
 from game.game_class import IState, Player
+from game.game_events import load_events_file
+from game.game_grid import MapOverrides
+from game.game_mapfile import IndexedMaps, load_compiled_maps
+from game.game_overlay import OverlayCache
+from game.game_pacer import FramePacer
+from game.game_scheduler import Scheduler
+from game.game_script import load_scripts_file
+from game.game_text import TextCache, TextEngine
+from game.game_world import WorldGraph
 
 from game.gamestate_menu      import MenuState
 from game.gamestate_help      import HelpState
@@ -54,12 +62,16 @@ class AssetManager:
     def load_font(self, rel_path: str) -> str:
         return os.path.join(self.root, rel_path)
     
-    def load_maps(self, rel_path: str) -> str:
-        return load_maps_file(os.path.join(self.root, rel_path))
+    def load_maps(self, rel_path: str):
+        bin_path = self.cache_path(os.path.splitext(rel_path)[0] + ".bin")
+        return load_compiled_maps(os.path.join(self.root, rel_path), bin_path, warm=WARM_MAPS)
     
     def load_events(self, rel_path: str):
         return load_events_file(os.path.join(self.root, rel_path))
     
+    def load_scripts(self, rel_path: str, events):
+        return load_scripts_file(os.path.join(self.root, rel_path), events)
+    
     def load_icon(self, rel_path: str):
         return pygame.image.load(os.path.join(self.root, rel_path))
     
@@ -107,76 +119,12 @@ class AssetManager:
     
     def save_path(self, rel_path: str) -> str:
         return os.path.join(app_base_dir(True), rel_path)
-
-def load_maps_file(path):
-    with open(path, "r", encoding="utf-8") as f:
-        raw = [ln.rstrip("\n") for ln in f]
-    
-    lines = [ln.strip() for ln in raw if ln.strip() and not ln.strip().startswith("#")]
-    maps = {}
     
-    i = 0
-    while i < len(lines):
-        map_name = lines[i]
-        if not map_name.lower().startswith("map"):
-            raise ValueError(f"Expected a map name (e.g., 'MapD1') at line {i+1}, got: {map_name}")
-        i += 1
-        
-        if i >= len(lines) or not lines[i].lower().startswith("size:"):
-            raise ValueError(f"Missing 'size: W,H' after {map_name}")
-        try:
-            _, size_str = lines[i].split(":", 1)
-            w_str, h_str = [p.strip() for p in size_str.split(",")]
-            w, h = int(w_str), int(h_str)
-        except Exception as e:
-            raise ValueError(f"Invalid size header in {path}: {lines[i]}") from e
-        i += 1
-        
-        grid = [[0]*h for _ in range(w)]
-        for row in range(h):
-            if i >= len(lines):
-                raise ValueError(f"Unexpected EOF while reading {map_name}, row {row}")
-            row_line = lines[i]
-            cells = [c.strip() for c in row_line.split(",")]
-            for col in range(w):
-                try:
-                    parts = cells[col].split(":")
-                except (ValueError, IndexError):
-                    parts = 99, 99, 0
-                if len(parts) != 3:
-                    parts = 99, 99, 0
-                try:
-                    tile_id = int(parts[0])
-                    obj_id  = int(parts[1])
-                    ev_id   = int(parts[2])
-                except Exception as e:
-                    tile_id, obj_id, ev_id = 99, 99, 0
-                grid[col][row] = tile_id, obj_id, ev_id
-            i += 1
-        
-        maps[map_name] = (w, h, grid)
-    return maps
-
-def load_events_file(path):
-    events = {}
-    with open(path, "r", encoding="utf-8") as f:
-        for raw in f:
-            s = raw.strip()
-            if not s or s.startswith("#"):
-                continue
-            parts = s.split("@", 2)
-            if len(parts) == 2:
-                parts.append("")
-            if len(parts) != 3:
-                continue
-            try:
-                ev_id   = int(parts[0])
-                ev_type = parts[1]
-                ev_data = parts[2]
-                events[ev_id] = (ev_type, ev_data)
-            except:
-                pass
-    return events
+    def cache_path(self, rel_path: str) -> str:
+        # compiled caches sit next to their source, except in a bundle: that is unpacked to a temporary dir
+        if hasattr(sys, '_MEIPASS'):
+            return self.save_path(os.path.basename(rel_path))
+        return self._full(rel_path)
 
 def load_tileset(sheet, tile_size = TILE_SIZE, scale = SCALE):
     w, h = sheet.get_size()
@@ -210,15 +158,24 @@ def load_spritesheet(sheet, sheet_size = SHEET_SIZE, scale = SCALE):
 # Game Main Class
 # ---------------------------------------------------------------------------
 class Game:
-    def __init__(self):
+    def __init__(self, headless: bool = False):
+        # headless: no window output and no pacing, for simulate()
+        self.headless = headless
+        if headless:
+            os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+            os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
         pygame.init()
         
         pygame.display.set_caption(GAME_TITLE)
         self.screen = pygame.display.set_mode((WIDTH, HEIGHT), pygame.RESIZABLE | pygame.SCALED)
         
-        self.clock = pygame.time.Clock()
+        self.pacer = FramePacer()
+        self.scheduler = Scheduler()
         self.running = True
         
+        # frame time not yet simulated
+        self.accumulator = 0.0
+        
         assets_dir = init_assets()
         self.assets = AssetManager(assets_dir)
         
@@ -228,11 +185,12 @@ class Game:
         self.save_path = self.assets.save_path(SAVE_FILE)
         self.maps = self.assets.load_maps(GAME_MAPS)
         self.events = self.assets.load_events(EVENTS_DATA)
+        self.scripts = self.assets.load_scripts(SCRIPTS_DATA, self.events)
         self.sprites = self.assets.load_spritesheet(SPRITESHEET)
         self.tiles = self.assets.load_tileset(TILESET)
         self.objects = self.assets.load_objectset(OBJECTSET)
         self.heroset = self.assets.load_heroset(HEROSET)
-        self.map_flags = {}
+        self.map_overrides = MapOverrides()
         
         self.player = Player(self)
         self.player.create()
@@ -240,12 +198,24 @@ class Game:
         self.states: Dict[str, IState] = {}
         self.register_states()
         
+        # map-to-map warp routes; each map is scanned on the first query that reaches it
+        self.world = WorldGraph(self)
+        
         self.state: IState = self.states["menu"]
         self.state.enter()
         
         self.load_map_flag = True
         self._toast: Optional[Tuple[str, float]] = None
+        self._toast_rect: Optional[pygame.Rect] = None
+        self._toast_under: Optional[pygame.Surface] = None
         self._font_cache: Dict[int, pygame.font.Font] = {}
+        self.text = TextEngine(self._get_font)
+        self._text_cache = TextCache(self.text.render, TEXT_CACHE_BYTES)
+        self.overlays = OverlayCache()
+        
+        self.dirty_rects_mode = DIRTY_RECTS
+        self.full_redraw = True
+        self.dirty: List[pygame.Rect] = []
     
     def register_states(self):
         menu_state = MenuState(self)
@@ -271,49 +241,127 @@ class Game:
             self._font_cache[size] = pygame.font.Font(font_path, size)
         return self._font_cache[size]
     
+    def render_text(self, text: str, size: int, color=(220, 220, 220), antialias: bool = True) -> pygame.Surface:
+        return self._text_cache.render(text, size, color, antialias)
+    
     def draw_text_center(self, text: str, x: int, y: int, *, size: int = 20, color=(220, 220, 220)):
-        font = self._get_font(size)
-        surf = font.render(text, True, color)
+        surf = self.render_text(text, size, color)
         rect = surf.get_rect(center=(x, y))
         self.screen.blit(surf, rect)
     
     def toast(self, text: str, duration: float = 2):
-        self._toast = (text, time.time() + duration)
+        # timed in simulated seconds, so toasts follow the fixed timestep and simulate()
+        self._toast = (text, self.scheduler.now + duration)
+    
+    def mark_dirty(self, rect):
+        self.dirty.append(pygame.Rect(rect))
+    
+    def redraw_all(self):
+        self.full_redraw = True
     
     def change_state(self, new_state: IState):
         if self.state:
             self.state.exit()
         self.state = new_state
         self.state.enter()
+        self.redraw_all()
+    
+    def present(self):
+        if not self.dirty_rects_mode or self.full_redraw or not self.state.partial_render:
+            pygame.display.flip()
+        elif self.dirty:
+            pygame.display.update(self.dirty)
+        self.dirty = []
+        self.full_redraw = False
+    
+    def _restore_toast_background(self):
+        # put back what the last toast covered, so partial renders never blend it twice
+        if self._toast_under is not None:
+            self.screen.blit(self._toast_under, self._toast_rect)
+            self.mark_dirty(self._toast_rect)
+        self._toast_under = None
+        self._toast_rect = None
+    
+    def _draw_toast(self):
+        if self._toast is None:
+            return
+        
+        msg, _ = self._toast
+        surf = self.render_text(msg, 18, (255, 250, 210))
+        rect = surf.get_rect(center=(WIDTH//2, HEIGHT - 40))
+        pad = 8
+        bg = self.overlays.get((rect.width + pad*2, rect.height + pad*2), (0,0,0,160))
+        bg_rect = bg.get_rect(center=rect.center).clip(self.screen.get_rect())
+        
+        if self.dirty_rects_mode:
+            self._toast_rect = bg_rect
+            self._toast_under = self.screen.subsurface(bg_rect).copy()
+            self.mark_dirty(bg_rect)
+        
+        self.screen.blit(bg, bg_rect)
+        self.screen.blit(surf, rect)
+    
+    def draw_frame(self):
+        # also used by states that must show an intermediate frame mid-update
+        if self.headless:
+            return
+        if self.dirty_rects_mode:
+            self._restore_toast_background()
+        self.state.render(self.screen)
+        self._draw_toast()
+        self.present()
+    
+    def is_idle(self) -> bool:
+        return self._toast is None and not self.full_redraw and not self.scheduler.busy() and self.state.is_idle()
+    
+    def dispatch(self, events):
+        for event in self.scheduler.filter_input(list(events)):
+            if event.type == pygame.QUIT:
+                self.running = False
+            elif event.type == pygame.WINDOWEXPOSED:
+                self.redraw_all()
+            else:
+                self.state.handle_event(event)
+    
+    def tick(self):
+        self.scheduler.update(SIM_TICK)
+        if self._toast is not None and self.scheduler.now >= self._toast[1]:
+            self._toast = None
+        self.state.update(SIM_TICK)
+    
+    def simulate(self, ticks: int, inputs: Optional[Dict[int, List[pygame.event.Event]]] = None):
+        # run ticks back to back, as fast as they compute; inputs maps a tick number to the events handled before it
+        inputs = inputs or {}
+        for n in range(ticks):
+            if not self.running:
+                break
+            self.dispatch(inputs.get(n, ()))
+            self.tick()
     
     def run(self):
         while self.running:
-            delta_time = self.clock.tick(FPS) / 1000.0
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    self.running = False
-                else:
-                    self.state.handle_event(event)
+            idle = self.is_idle()
+            events = self.pacer.next_frame(idle)
+            if events is None:
+                continue
             
-            self.state.update(delta_time)
-            self.state.render(self.screen)
+            # time spent waiting idle had nothing to simulate, so it is not caught up on
+            self.accumulator = SIM_TICK if idle else self.accumulator + self.pacer.delta_time
+            self.overlays.begin_frame()
+            self.dispatch(events)
             
-            if self._toast is not None:
-                msg, until = self._toast
-                if time.time() < until:
-                    font = self._get_font(18)
-                    surf = font.render(msg, True, (255, 250, 210))
-                    rect = surf.get_rect(center=(WIDTH//2, HEIGHT - 40))
-                    pad = 8
-                    bg = pygame.Surface((rect.width + pad*2, rect.height + pad*2), pygame.SRCALPHA)
-                    bg.fill((0,0,0,160))
-                    bg_rect = bg.get_rect(center=rect.center)
-                    self.screen.blit(bg, bg_rect)
-                    self.screen.blit(surf, rect)
-                else:
-                    self._toast = None
+            ticks = 0
+            while self.accumulator >= SIM_TICK and ticks < MAX_CATCHUP_TICKS:
+                self.tick()
+                self.accumulator -= SIM_TICK
+                ticks += 1
+            if self.accumulator >= SIM_TICK:
+                self.accumulator %= SIM_TICK
             
-            pygame.display.flip()
+            self.draw_frame()
+            
+            if WARM_MAPS and isinstance(self.maps, IndexedMaps):
+                self.maps.start_warm()
         
         pygame.quit()
 
@@ -8,6 +8,9 @@ def get_item_type_ids(item_type):
     return [item_id for item_id, data in ITEMS.items() if data["type"] == item_type]
 
 class IState:
+    # states that only repaint what they report through Game.mark_dirty
+    partial_render = False
+    
     def enter(self):
         pass
 
@@ -22,6 +25,10 @@ class IState:
 
     def render(self, screen: pygame.Surface):
         pass
+    
+    def is_idle(self) -> bool:
+        # True while nothing changes on screen until the next input event
+        return False
 
 class Player:
     _PER_LEVEL_EXP = 600
@@ -48,18 +55,14 @@ class Player:
     def create(self, name = "Eric"):
         self.name = name
         
-        start_pos = self.game.events.get(0)[1]
-        parts = [p.strip() for p in start_pos.split(",")]
-        
-        if len(parts) == 4:
-            map_name, sx, sy, dir_code = parts[0], int(parts[1]), int(parts[2]), int(parts[3])
-        else:
+        start_pos = self.game.events.get(0)
+        if start_pos is None or start_pos.kind != "start_pos":
             raise Exception("Bad Map Value!")
         
-        self.map_name = map_name
-        self.x = sx
-        self.y = sy
-        self.facing = dir_code
+        self.map_name = start_pos.map_name
+        self.x = start_pos.x
+        self.y = start_pos.y
+        self.facing = start_pos.facing
         
         self.hp = self._DEFAULT_HP
         self.mp = self._DEFAULT_EX
@@ -10,13 +10,49 @@ WIN_SCALE = 2
 SCALE = 1
 FPS = 60
 
+# frame pacing: idle states wait for input instead of redrawing at FPS
+BACKGROUND_FPS = 10
+IDLE_WAIT_MS = 250
+MINIMIZED_WAIT_MS = 1000
+
+# fixed simulation step: update() always advances the game by SIM_TICK, however fast frames are drawn
+SIM_HZ = 60
+SIM_TICK = 1 / SIM_HZ
+# most ticks run in one frame to catch up; a longer stall is dropped rather than replayed
+MAX_CATCHUP_TICKS = 8
+
+# memory cap for the shared rendered-text cache
+TEXT_CACHE_BYTES = 8 * 1024 * 1024
+
+# translucent overlay panels kept filled between frames, and spare surfaces kept per size
+OVERLAY_CACHE_SIZE = 32
+OVERLAY_POOL_SIZE = 2
+
+# present only the regions states report as changed instead of flipping every frame
+DIRTY_RECTS = False
+
 WIDTH = BASE_WIDTH * WIN_SCALE
 HEIGHT = BASE_HEIGHT * WIN_SCALE
 SHEET_SIZE = 64
 TILE_SIZE = 32
+MAP_CHUNK_SIZE = 8
+
+# map chunks kept resident: decoded cells per map, and pre-baked surfaces of the current map
+MAP_CHUNK_BUDGET = 256
+RENDER_CHUNK_BUDGET = 32
+
+# parse the maps not visited yet on a background thread once the first frame is up
+WARM_MAPS = True
+
+# BFS distance fields kept per map for path requests, each covering this many cells around its target
+NAV_CACHE_SIZE = 16
+NAV_RADIUS = 64
+# cells a path search outside that window may visit before the target counts as out of reach
+NAV_SEARCH_BUDGET = 16384
 
 GAME_MAPS   = "./data/maps.txt"
 EVENTS_DATA = "./data/events.txt"
+SCRIPTS_DATA = "./data/scripts.txt"
 HELP_TEXT   = "./data/help.txt"
 TILESET     = "./tileset_tiles.png"
 OBJECTSET   = "./tileset_objects.png"
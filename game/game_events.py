@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import sys
+from typing import Dict
+
+from .game_constants import ENEMIES, ITEMS
+
+# events.txt lines are "id@kind@data"; each kind's data is parsed once here, when the file is loaded
+
+class Event:
+    __slots__ = ("id", "kind", "data")
+    
+    def __init__(self, ev_id: int, kind: str, data: str):
+        self.id = ev_id
+        self.kind = kind
+        self.data = data
+        self.parse(data)
+    
+    def parse(self, data: str):
+        pass
+    
+    def __repr__(self):
+        return f"{type(self).__name__}({self.id:03}, {self.kind!r}, {self.data!r})"
+
+class TextEvent(Event):
+    # sign, dialogue_box, one_time_dialogue_box, walkable_dialogue_box
+    __slots__ = ("text",)
+    
+    def parse(self, data: str):
+        self.text = data
+
+class TextBoxEvent(Event):
+    # "Queen@./data/queen.txt"
+    __slots__ = ("title", "path")
+    
+    def parse(self, data: str):
+        self.title, self.path = data.split("@")
+
+class WarpEvent(Event):
+    # start_pos and change_map: "MapT1,18,34,0"
+    __slots__ = ("map_name", "x", "y", "facing")
+    
+    def parse(self, data: str):
+        parts = [p.strip() for p in data.split(",")]
+        if len(parts) != 4:
+            raise ValueError("expected 'map,x,y,facing'")
+        self.map_name = parts[0]
+        self.x, self.y, self.facing = int(parts[1]), int(parts[2]), int(parts[3])
+
+class ButtonEvent(Event):
+    # walkable_button: "-1,0@14:00:000", the offset of the cell it changes and what that cell becomes
+    __slots__ = ("dx", "dy", "cell")
+    
+    def parse(self, data: str):
+        offset, cell = data.split("@")
+        self.dx, self.dy = (int(p) for p in offset.split(","))
+        self.cell = tuple(int(p.strip()) for p in cell.split(":"))
+        if len(self.cell) != 3:
+            raise ValueError("expected 'tile:object:event'")
+
+class OffsetEvent(Event):
+    # inn: "-5,1", where the player wakes up relative to where they rested
+    __slots__ = ("dx", "dy")
+    
+    def parse(self, data: str):
+        self.dx, self.dy = (int(p) for p in data.split(","))
+
+class MonsterEvent(Event):
+    # battle and boss
+    __slots__ = ("mon_id",)
+    
+    def parse(self, data: str):
+        self.mon_id = int(data)
+        if self.mon_id not in ENEMIES:
+            raise ValueError(f"unknown monster {self.mon_id}")
+
+class GoldEvent(Event):
+    __slots__ = ("amount",)
+    
+    def parse(self, data: str):
+        self.amount = int(data)
+
+class ItemEvent(Event):
+    __slots__ = ("item_id",)
+    
+    def parse(self, data: str):
+        self.item_id = int(data)
+        if self.item_id not in ITEMS:
+            raise ValueError(f"unknown item {self.item_id}")
+
+class ScriptEvent(Event):
+    # script: name of a script in scripts.txt
+    __slots__ = ("name",)
+    
+    def parse(self, data: str):
+        self.name = data.strip()
+        if not self.name:
+            raise ValueError("expected a script name")
+
+EVENT_TYPES = {
+    "start_pos": WarpEvent,
+    "change_map": WarpEvent,
+    
+    "sign": TextEvent,
+    "dialogue_box": TextEvent,
+    "one_time_dialogue_box": TextEvent,
+    "walkable_dialogue_box": TextEvent,
+    "text_box": TextBoxEvent,
+    
+    "walkable": Event,
+    "unwalkable": Event,
+    "walkable_button": ButtonEvent,
+    "door": Event,
+    
+    "battle": MonsterEvent,
+    "boss": MonsterEvent,
+    "gold": GoldEvent,
+    "item": ItemEvent,
+    
+    "shop": Event,
+    "inn": OffsetEvent,
+    "tavern": Event,
+    "queen": Event,
+    "princess": Event,
+    "end_screen": Event,
+    "script": ScriptEvent,
+}
+
+def compile_event(ev_id: int, kind: str, data: str) -> Event:
+    # kinds are interned so handler tables keyed by them hash and compare by identity
+    cls = EVENT_TYPES.get(kind)
+    if cls is None:
+        raise ValueError(f"unknown event kind '{kind}'")
+    return cls(ev_id, sys.intern(kind), data)
+
+def load_events_file(path) -> Dict[int, Event]:
+    events = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for n, raw in enumerate(f, 1):
+            s = raw.strip()
+            if not s or s.startswith("#"):
+                continue
+            parts = s.split("@", 2)
+            if len(parts) == 2:
+                parts.append("")
+            try:
+                if len(parts) != 3:
+                    raise ValueError("expected 'id@kind@data'")
+                ev_id = int(parts[0])
+                events[ev_id] = compile_event(ev_id, parts[1], parts[2])
+            except ValueError as e:
+                print(f"[WARN] event on line {n} ignored: '{s}': {e}")
+    return events
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from array import array
+from collections import OrderedDict
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+import sys
+
+from .game_constants import MAP_CHUNK_SIZE, MAP_CHUNK_BUDGET
+
+class MapGrid:
+    # three parallel uint16 planes (tile, object, event), row-major: cell (x, y) lives at y*w + x
+    def __init__(self, w: int, h: int, tiles: array, objects: array, events: array):
+        self.w = w
+        self.h = h
+        self.tiles = tiles
+        self.objects = objects
+        self.events = events
+    
+    @classmethod
+    def from_records(cls, w: int, h: int, data) -> "MapGrid":
+        # data is packed little-endian <HHH records, the layout of maps.bin
+        cells = array("H")
+        cells.frombytes(data)
+        if sys.byteorder == "big":
+            cells.byteswap()
+        return cls(w, h, cells[0::3], cells[1::3], cells[2::3])
+    
+    @classmethod
+    def from_cells(cls, w: int, h: int, cells) -> "MapGrid":
+        # cells is a row-major sequence of (tile, object, event)
+        return cls(w, h, array("H", (c[0] for c in cells)), array("H", (c[1] for c in cells)), array("H", (c[2] for c in cells)))
+    
+    def __getitem__(self, pos) -> Tuple[int, int, int]:
+        x, y = pos
+        i = y * self.w + x
+        return self.tiles[i], self.objects[i], self.events[i]
+    
+    def __setitem__(self, pos, cell):
+        x, y = pos
+        i = y * self.w + x
+        self.tiles[i], self.objects[i], self.events[i] = cell
+    
+    def row(self, y: int, x0: int = 0, x1: Optional[int] = None) -> Tuple[array, array, array]:
+        x1 = self.w if x1 is None else x1
+        a, b = y * self.w + x0, y * self.w + x1
+        return self.tiles[a:b], self.objects[a:b], self.events[a:b]
+    
+    def rect(self, x0: int, y0: int, x1: int, y1: int) -> Iterator[Tuple[int, int, int, int, int]]:
+        # (x, y, tile, object, event) for every cell in [x0, x1) x [y0, y1), one slice per row
+        for y in range(y0, y1):
+            tiles, objects, events = self.row(y, x0, x1)
+            for x, t, o, e in zip(range(x0, x1), tiles, objects, events):
+                yield x, y, t, o, e
+    
+    def cells_with_event(self) -> Iterator[Tuple[int, int, int]]:
+        # (x, y, event id) of every cell that carries an event
+        w = self.w
+        for i, ev in enumerate(self.events):
+            if ev:
+                yield i % w, i // w, ev
+
+class ChunkedGrid:
+    # a map decoded in MAP_CHUNK_SIZE square MapGrid chunks on demand; at most `budget` chunks stay resident,
+    # so memory follows what is being looked at instead of the map size
+    def __init__(self, w: int, h: int, load_chunk: Callable[[int, int, int, int], MapGrid],
+                 load_events: Callable[[], List[Tuple[int, int]]], chunk: int = MAP_CHUNK_SIZE, budget: int = MAP_CHUNK_BUDGET):
+        self.w = w
+        self.h = h
+        self.load_chunk = load_chunk
+        self.load_events = load_events
+        self.chunk = chunk
+        self.budget = budget
+        self._chunks: "OrderedDict[Tuple[int, int], MapGrid]" = OrderedDict()
+        # (cell index, event id) of every event cell, loaded once; it stays small however big the map is
+        self._events: Optional[List[Tuple[int, int]]] = None
+    
+    def chunk_at(self, cx: int, cy: int) -> MapGrid:
+        key = (cx, cy)
+        grid = self._chunks.get(key)
+        if grid is not None:
+            self._chunks.move_to_end(key)
+            return grid
+        
+        c = self.chunk
+        x0, y0 = cx * c, cy * c
+        grid = self._chunks[key] = self.load_chunk(x0, y0, min(self.w, x0 + c), min(self.h, y0 + c))
+        while len(self._chunks) > self.budget:
+            self._chunks.popitem(last=False)
+        return grid
+    
+    def __getitem__(self, pos) -> Tuple[int, int, int]:
+        x, y = pos
+        c = self.chunk
+        return self.chunk_at(x // c, y // c)[x % c, y % c]
+    
+    def row(self, y: int, x0: int = 0, x1: Optional[int] = None) -> Tuple[array, array, array]:
+        x1 = self.w if x1 is None else x1
+        c = self.chunk
+        tiles, objects, events = array("H"), array("H"), array("H")
+        for cx in range(x0 // c, (x1 + c - 1) // c):
+            t, o, e = self.chunk_at(cx, y // c).row(y % c, max(x0 - cx * c, 0), min(x1 - cx * c, c))
+            tiles += t
+            objects += o
+            events += e
+        return tiles, objects, events
+    
+    def rect(self, x0: int, y0: int, x1: int, y1: int) -> Iterator[Tuple[int, int, int, int, int]]:
+        # one band of chunks at a time, held locally so a wide rect can't evict what it is still reading
+        c = self.chunk
+        for cy in range(y0 // c, (y1 + c - 1) // c):
+            band = [(cx * c, self.chunk_at(cx, cy)) for cx in range(x0 // c, (x1 + c - 1) // c)]
+            for y in range(max(y0, cy * c), min(y1, cy * c + c)):
+                for bx, grid in band:
+                    a, b = max(x0, bx), min(x1, bx + grid.w)
+                    tiles, objects, events = grid.row(y - cy * c, a - bx, b - bx)
+                    for x, t, o, e in zip(range(a, b), tiles, objects, events):
+                        yield x, y, t, o, e
+    
+    def cells_with_event(self) -> Iterator[Tuple[int, int, int]]:
+        if self._events is None:
+            self._events = self.load_events()
+        w = self.w
+        for i, ev in self._events:
+            yield i % w, i // w, ev
+
+class OverlayGrid:
+    # copy-on-write view of a shared MapGrid: edits land in a sparse dict and the base is never touched
+    def __init__(self, base: MapGrid):
+        self.base = base
+        self.w = base.w
+        self.h = base.h
+        self.edits = {}
+    
+    def __getitem__(self, pos) -> Tuple[int, int, int]:
+        cell = self.edits.get(pos)
+        return self.base[pos] if cell is None else cell
+    
+    def __setitem__(self, pos, cell):
+        self.edits[pos] = tuple(cell)
+    
+    def row(self, y: int, x0: int = 0, x1: Optional[int] = None) -> Tuple[array, array, array]:
+        tiles, objects, events = self.base.row(y, x0, x1)
+        if self.edits:
+            x1 = self.w if x1 is None else x1
+            for (x, ey), (t, o, e) in self.edits.items():
+                if ey == y and x0 <= x < x1:
+                    tiles[x - x0], objects[x - x0], events[x - x0] = t, o, e
+        return tiles, objects, events
+    
+    def rect(self, x0: int, y0: int, x1: int, y1: int) -> Iterator[Tuple[int, int, int, int, int]]:
+        for y in range(y0, y1):
+            tiles, objects, events = self.row(y, x0, x1)
+            for x, t, o, e in zip(range(x0, x1), tiles, objects, events):
+                yield x, y, t, o, e
+    
+    def cells_with_event(self) -> Iterator[Tuple[int, int, int]]:
+        for x, y, ev in self.base.cells_with_event():
+            if (x, y) not in self.edits:
+                yield x, y, ev
+        for (x, y), (_, _, ev) in self.edits.items():
+            if ev:
+                yield x, y, ev
+
+class MapOverrides:
+    # permanent cell edits that are saved with the game: {map name: {cell index: (tile, object, event)}}
+    def __init__(self):
+        self.maps: Dict[str, Dict[int, Tuple[int, int, int]]] = {}
+        # bumped on every edit so per-map caches know when to rebuild
+        self.versions: Dict[str, int] = {}
+    
+    def for_map(self, name: str) -> Dict[int, Tuple[int, int, int]]:
+        return self.maps.setdefault(name, {})
+    
+    def get(self, name: str, index: int) -> Optional[Tuple[int, int, int]]:
+        return self.maps.get(name, {}).get(index)
+    
+    def set(self, name: str, index: int, cell):
+        self.for_map(name)[index] = tuple(cell)
+        self.versions[name] = self.versions.get(name, 0) + 1
+    
+    def version(self, name: str) -> int:
+        return self.versions.get(name, 0)
+    
+    def clear(self):
+        for cells in self.maps.values():
+            cells.clear()
+        for name in self.versions:
+            self.versions[name] += 1
+    
+    # savegame.json keeps the original "MapD1,05,07": "22:00:096" layout
+    @classmethod
+    def from_legacy(cls, flags: dict, maps) -> "MapOverrides":
+        store = cls()
+        for key, value in sorted(flags.items()):
+            try:
+                name, x, y = key.split(",")
+                cell = tuple(int(v) for v in value.split(":"))
+                if len(cell) != 3:
+                    raise ValueError(value)
+                w = maps.size(name)[0]
+                store.set(name, int(y) * w + int(x), cell)
+            except (ValueError, KeyError) as e:
+                print(f"[WARN] map flag '{key}': '{value}' ignored: {e}")
+        return store
+    
+    def to_legacy(self, maps) -> dict:
+        flags = {}
+        for name, cells in self.maps.items():
+            w = maps.size(name)[0]
+            for index, (tile_idx, obj_idx, ev_id) in cells.items():
+                y, x = divmod(index, w)
+                flags[f'{name},{x:02},{y:02}'] = f"{tile_idx:02}:{obj_idx:02}:{ev_id:03}"
+        return dict(sorted(flags.items()))
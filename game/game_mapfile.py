@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from collections.abc import Mapping
+from functools import partial
+from typing import Dict, List, Tuple
+import hashlib
+import mmap
+import os
+import struct
+import threading
+
+from .game_grid import ChunkedGrid, MapGrid
+
+# maps.bin layout, all little-endian:
+#   header  magic, version, map count, source size, source mtime (ns), source content digest
+#   table   one entry per map: name, width, height, offset of its first record, offset and length of its event table
+#   records tile, object and event id per cell, row-major
+#   events  cell index and event id of every cell that has an event, so event lookups never touch the records
+MAPFILE_MAGIC = b"RFMP"
+MAPFILE_VERSION = 3
+HEADER = struct.Struct("<4sHHQQ16s")
+MAP_NAME_BYTES = 16
+ENTRY = struct.Struct(f"<{MAP_NAME_BYTES}sHHIII")
+RECORD = struct.Struct("<HHH")
+EVENT = struct.Struct("<IH")
+
+BAD_CELL = (99, 99, 0)
+
+def source_digest(data: bytes) -> bytes:
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+def parse_size_header(map_name, line, path) -> Tuple[int, int]:
+    if not line.lower().startswith("size:"):
+        raise ValueError(f"Missing 'size: W,H' after {map_name}")
+    try:
+        _, size_str = line.split(":", 1)
+        w_str, h_str = [p.strip() for p in size_str.split(",")]
+        return int(w_str), int(h_str)
+    except Exception as e:
+        raise ValueError(f"Invalid size header in {path}: {line}") from e
+
+def parse_map_rows(map_name, w, h, rows) -> List[Tuple[int, int, int]]:
+    # rows are the map's h significant lines; cells are returned row-major
+    cells = []
+    for row in range(h):
+        if row >= len(rows):
+            raise ValueError(f"Unexpected EOF while reading {map_name}, row {row}")
+        row_cells = [c.strip() for c in rows[row].split(",")]
+        for col in range(w):
+            cell = row_cells[col] if col < len(row_cells) else ""
+            try:
+                tile_id, obj_id, ev_id = (int(p) for p in cell.split(":"))
+                if not all(0 <= v <= 0xFFFF for v in (tile_id, obj_id, ev_id)):
+                    raise ValueError(cell)
+            except ValueError:
+                print(f"[WARN] {map_name} cell {col},{row} is malformed: '{cell}'")
+                tile_id, obj_id, ev_id = BAD_CELL
+            cells.append((tile_id, obj_id, ev_id))
+    return cells
+
+def write_compiled_maps(bin_path, grids, st, digest):
+    # grids yields (name, w, h, MapGrid); st and digest are the os.stat and source_digest of the maps.txt they came from
+    grids = list(grids)
+    offset = HEADER.size + ENTRY.size * len(grids)
+    table = []
+    body = []
+    for name, w, h, grid in grids:
+        name_b = name.encode("utf-8")
+        if len(name_b) > MAP_NAME_BYTES:
+            raise ValueError(f"Map name too long for the compiled format: {name}")
+        records = b"".join(RECORD.pack(*cell) for cell in zip(grid.tiles, grid.objects, grid.events))
+        events = b"".join(EVENT.pack(i, ev_id) for i, ev_id in enumerate(grid.events) if ev_id)
+        table.append(ENTRY.pack(name_b, w, h, offset, offset + len(records), len(events) // EVENT.size))
+        body.append(records)
+        body.append(events)
+        offset += len(records) + len(events)
+    
+    tmp_path = bin_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAPFILE_MAGIC, MAPFILE_VERSION, len(grids), st.st_size, st.st_mtime_ns, digest))
+        f.writelines(table)
+        f.writelines(body)
+    os.replace(tmp_path, bin_path)
+
+class IndexedMaps(Mapping):
+    # maps.txt behind a seek table: only the name and size headers are read up front,
+    # a map's rows are parsed the first time it is looked up
+    def __init__(self, src_path, compile_to=None):
+        self.path = src_path
+        self.compile_to = compile_to
+        self.stat = os.stat(src_path)
+        self._index: Dict[str, Tuple[int, int, int, int]] = {}
+        self._grids: Dict[str, MapGrid] = {}
+        self._lock = threading.Lock()
+        self._warm_thread = None
+        
+        with open(src_path, "rb") as f:
+            data = f.read()
+        self.digest = source_digest(data)
+        
+        # (byte offset, stripped text) of every significant line
+        lines = []
+        offset = 0
+        for raw in data.splitlines(keepends=True):
+            ln = raw.strip()
+            if ln and not ln.startswith(b"#"):
+                lines.append((offset, ln.decode("utf-8")))
+            offset += len(raw)
+        
+        i = 0
+        while i < len(lines):
+            map_name = lines[i][1]
+            if not map_name.lower().startswith("map"):
+                raise ValueError(f"Expected a map name (e.g., 'MapD1') at line {i+1}, got: {map_name}")
+            if i + 1 >= len(lines):
+                raise ValueError(f"Missing 'size: W,H' after {map_name}")
+            w, h = parse_size_header(map_name, lines[i + 1][1], src_path)
+            i += 2
+            
+            if i + h > len(lines):
+                raise ValueError(f"Unexpected EOF while reading {map_name}, row {len(lines) - i}")
+            start = lines[i][0] if h else offset
+            end = lines[i + h][0] if i + h < len(lines) else offset
+            self._index[map_name] = (w, h, start, end)
+            i += h
+    
+    def _parse(self, name) -> MapGrid:
+        w, h, start, end = self._index[name]
+        with open(self.path, "rb") as f:
+            f.seek(start)
+            body = f.read(end - start).decode("utf-8")
+        rows = [ln.strip() for ln in body.splitlines() if ln.strip() and not ln.strip().startswith("#")]
+        return MapGrid.from_cells(w, h, parse_map_rows(name, w, h, rows))
+    
+    def __getitem__(self, name):
+        w, h, _, _ = self._index[name]
+        grid = self._grids.get(name)
+        if grid is None:
+            # the warm thread may be parsing the same map
+            with self._lock:
+                grid = self._grids.get(name)
+                if grid is None:
+                    grid = self._grids[name] = self._parse(name)
+        return w, h, grid
+    
+    def __iter__(self):
+        return iter(self._index)
+    
+    def __len__(self):
+        return len(self._index)
+    
+    def size(self, name) -> Tuple[int, int]:
+        w, h, _, _ = self._index[name]
+        return w, h
+    
+    def warm(self):
+        # parse whatever has not been visited yet, then refresh maps.bin so the next start maps it directly
+        for name in self._index:
+            self[name]
+        if self.compile_to is not None:
+            try:
+                write_compiled_maps(self.compile_to, ((name, *self[name]) for name in self._index), self.stat, self.digest)
+            except OSError as e:
+                # unwritable cache dirs still work, the maps are just parsed again next start
+                print(f"[WARN] maps not compiled to '{self.compile_to}': {e}")
+    
+    def start_warm(self):
+        if self._warm_thread is None:
+            self._warm_thread = threading.Thread(target=self.warm, name="maps-warm", daemon=True)
+            self._warm_thread.start()
+
+class CompiledMaps(Mapping):
+    # read-only view over maps.bin; a map's grid reads its chunks straight from the mapping as they are needed
+    def __init__(self, bin_path):
+        self.path = bin_path
+        with open(bin_path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        
+        magic, version, count, self.src_size, self.src_mtime_ns, self.src_digest = HEADER.unpack_from(self._mm, 0)
+        if magic != MAPFILE_MAGIC or version != MAPFILE_VERSION:
+            self._mm.close()
+            raise ValueError(f"Not a version {MAPFILE_VERSION} map file: {bin_path}")
+        
+        self._index: Dict[str, Tuple[int, int, int, int, int]] = {}
+        self._grids: Dict[str, ChunkedGrid] = {}
+        for n in range(count):
+            name_b, w, h, offset, ev_offset, ev_count = ENTRY.unpack_from(self._mm, HEADER.size + n * ENTRY.size)
+            self._index[name_b.rstrip(b"\0").decode("utf-8")] = (w, h, offset, ev_offset, ev_count)
+    
+    def is_stale(self, src_path) -> bool:
+        # an unchanged stat is trusted as is; a new mtime alone (a onefile build unpacks maps.txt afresh on every launch)
+        # is settled by the content digest
+        st = os.stat(src_path)
+        if (st.st_size, st.st_mtime_ns) == (self.src_size, self.src_mtime_ns):
+            return False
+        if st.st_size != self.src_size:
+            return True
+        with open(src_path, "rb") as f:
+            return source_digest(f.read()) != self.src_digest
+    
+    def _load_chunk(self, name, x0, y0, x1, y1) -> MapGrid:
+        # one slice of the row-major records per chunk row
+        w, _, offset, _, _ = self._index[name]
+        mm = self._mm
+        data = b"".join(mm[offset + RECORD.size * (y * w + x0):offset + RECORD.size * (y * w + x1)] for y in range(y0, y1))
+        return MapGrid.from_records(x1 - x0, y1 - y0, data)
+    
+    def _load_events(self, name) -> List[Tuple[int, int]]:
+        _, _, _, ev_offset, ev_count = self._index[name]
+        return list(EVENT.iter_unpack(self._mm[ev_offset:ev_offset + EVENT.size * ev_count]))
+    
+    def __getitem__(self, name):
+        w, h, _, _, _ = self._index[name]
+        grid = self._grids.get(name)
+        if grid is None:
+            grid = self._grids[name] = ChunkedGrid(w, h, partial(self._load_chunk, name), partial(self._load_events, name))
+        return w, h, grid
+    
+    def __iter__(self):
+        return iter(self._index)
+    
+    def __len__(self):
+        return len(self._index)
+    
+    def size(self, name) -> Tuple[int, int]:
+        w, h, _, _, _ = self._index[name]
+        return w, h
+    
+    def close(self):
+        self._mm.close()
+
+def load_compiled_maps(src_path, bin_path, warm=True):
+    # an up-to-date maps.bin is mapped as is; otherwise maps.txt is read through its seek table and maps.bin is rebuilt,
+    # by the warm thread once the game runs when warm is set, or right away when it is not
+    try:
+        maps = CompiledMaps(bin_path)
+        if not maps.is_stale(src_path):
+            return maps
+        maps.close()
+    except (OSError, ValueError, struct.error):
+        pass
+    
+    maps = IndexedMaps(src_path, compile_to=bin_path)
+    if not warm:
+        maps.warm()
+    return maps
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from array import array
+from collections import OrderedDict, deque
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .game_constants import NAV_CACHE_SIZE, NAV_RADIUS, NAV_SEARCH_BUDGET
+
+# fields hold 32-bit distances: a window's cell count is far below this, so no real distance can reach it
+UNREACHABLE = 0xFFFFFFFF
+
+# (dx, dy, facing) in the order the map screen checks keys
+STEPS = ((0, -1, 0), (-1, 0, 1), (1, 0, 2), (0, 1, 3))
+
+class Search:
+    # BFS out from a target across the whole map, grown only as far as path requests need it and never
+    # past `budget` cells, so a far click costs at most that much and reads only the chunks it crosses
+    __slots__ = ("map", "dist", "queue", "budget")
+    
+    def __init__(self, game_map: "GameMap", tx: int, ty: int, budget: int):
+        self.map = game_map
+        self.dist: Dict[Tuple[int, int], int] = {(tx, ty): 0}
+        self.queue = deque([(tx, ty)])
+        self.budget = budget
+    
+    def reach(self, x: int, y: int) -> Optional[int]:
+        # distance from (x, y) to the target, or None when it is unreachable or beyond the budget
+        dist, queue = self.dist, self.queue
+        walkable = self.map.is_walkable
+        while (x, y) not in dist and queue and len(dist) < self.budget:
+            cx, cy = queue.popleft()
+            d = dist[cx, cy] + 1
+            for dx, dy, _ in STEPS:
+                n = (cx + dx, cy + dy)
+                if n not in dist and walkable(*n):
+                    dist[n] = d
+                    queue.append(n)
+        return dist.get((x, y))
+
+class Navigator:
+    # BFS distance fields towards target cells, shared by every path request that heads to the same cell;
+    # a field covers NAV_RADIUS cells around its target, so its cost does not grow with the map, and only
+    # a start the window cannot lead to the target from falls back to a budgeted Search
+    def __init__(self, game_map: "GameMap", max_fields: int = NAV_CACHE_SIZE, radius: int = NAV_RADIUS, budget: int = NAV_SEARCH_BUDGET):
+        self.map = game_map
+        self.max_fields = max_fields
+        self.radius = radius
+        self.budget = budget
+        self._fields: "OrderedDict[Tuple, Tuple[int, object]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+    
+    def _window(self, tx: int, ty: int) -> Tuple[int, int, int, int]:
+        r = self.radius
+        return max(0, tx - r), max(0, ty - r), min(self.map.w, tx + r + 1), min(self.map.h, ty + r + 1)
+    
+    def _passable(self, x0: int, y0: int, x1: int, y1: int) -> bytes:
+        # the Shadow's Cloak lets the player through everything inside the map
+        m = self.map
+        if m.game.player.has_item(12) > 0:
+            return b"\x01" * ((x1 - x0) * (y1 - y0))
+        return m.walkable_window(x0, y0, x1, y1)
+    
+    def _cached(self, kind: str, tx: int, ty: int, build: Callable[[], object]):
+        # fields and searches share one LRU, dropped whenever walkability changes
+        m = self.map
+        cloak = m.game.player.has_item(12) > 0
+        key = (m.name, ty * m.w + tx, cloak, kind)
+        
+        cached = self._fields.get(key)
+        if cached is not None and cached[0] == m.walk_version:
+            self._fields.move_to_end(key)
+            self.hits += 1
+            return cached[1]
+        
+        self.misses += 1
+        value = build()
+        self._fields[key] = (m.walk_version, value)
+        self._fields.move_to_end(key)
+        while len(self._fields) > self.max_fields:
+            self._fields.popitem(last=False)
+        return value
+    
+    def field(self, tx: int, ty: int) -> Tuple[Tuple[int, int, int, int], array]:
+        # (window, distances): distances are row-major over the window [x0, x1) x [y0, y1)
+        def build():
+            window = self._window(tx, ty)
+            return window, self._bfs(tx, ty, window)
+        return self._cached("field", tx, ty, build)
+    
+    def search(self, tx: int, ty: int) -> Search:
+        return self._cached("search", tx, ty, lambda: Search(self.map, tx, ty, self.budget))
+    
+    def distance_field(self, tx: int, ty: int) -> array:
+        return self.field(tx, ty)[1]
+    
+    def _bfs(self, tx: int, ty: int, window: Tuple[int, int, int, int]) -> array:
+        # the target itself may be a door, chest or NPC: it is reached by bumping into it
+        x0, y0, x1, y1 = window
+        w, h = x1 - x0, y1 - y0
+        passable = self._passable(x0, y0, x1, y1)
+        dist = array("I", [UNREACHABLE]) * (w * h)
+        
+        start = (ty - y0) * w + tx - x0
+        dist[start] = 0
+        queue = deque([start])
+        while queue:
+            i = queue.popleft()
+            d = dist[i] + 1
+            x, y = i % w, i // w
+            for dx, dy, _ in STEPS:
+                nx, ny = x + dx, y + dy
+                if 0 <= nx < w and 0 <= ny < h:
+                    n = ny * w + nx
+                    if dist[n] == UNREACHABLE and passable[n]:
+                        dist[n] = d
+                        queue.append(n)
+        return dist
+    
+    def _distances(self, sx: int, sy: int, tx: int, ty: int) -> Tuple[Callable[[int, int], Optional[int]], Optional[int]]:
+        # (distance of any cell, distance of the start): the window's field when it leads from the start, else the search
+        (x0, y0, x1, y1), field = self.field(tx, ty)
+        w = x1 - x0
+        
+        def windowed(x, y):
+            if x0 <= x < x1 and y0 <= y < y1:
+                d = field[(y - y0) * w + x - x0]
+                if d != UNREACHABLE:
+                    return d
+            return None
+        
+        d = windowed(sx, sy)
+        if d is not None or (w, y1 - y0) == (self.map.w, self.map.h):
+            return windowed, d
+        search = self.search(tx, ty)
+        return (lambda x, y: search.dist.get((x, y))), search.reach(sx, sy)
+    
+    def distance(self, sx: int, sy: int, tx: int, ty: int) -> Optional[int]:
+        return self._distances(sx, sy, tx, ty)[1]
+    
+    def next_step(self, sx: int, sy: int, tx: int, ty: int) -> Optional[Tuple[int, int, int]]:
+        # (dx, dy, facing) of one step downhill towards the target, or None when there is no way there
+        if (sx, sy) == (tx, ty):
+            return None
+        distance_at, d = self._distances(sx, sy, tx, ty)
+        if d is None:
+            return None
+        for dx, dy, facing in STEPS:
+            if distance_at(sx + dx, sy + dy) == d - 1:
+                return dx, dy, facing
+        return None
+    
+    def path(self, sx: int, sy: int, tx: int, ty: int) -> Optional[List[Tuple[int, int]]]:
+        # cells after the start up to and including the target; one cached field makes this O(path length)
+        cells = []
+        x, y = sx, sy
+        while (x, y) != (tx, ty):
+            step = self.next_step(x, y, tx, ty)
+            if step is None:
+                return None
+            x, y = x + step[0], y + step[1]
+            cells.append((x, y))
+        return cells
+    
+    def clear(self):
+        self._fields.clear()
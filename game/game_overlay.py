@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+
+import pygame
+from .game_constants import OVERLAY_CACHE_SIZE, OVERLAY_POOL_SIZE
+
+class OverlayCache:
+    # pre-filled translucent rectangles keyed by (size, rgba), so panels are not reallocated every frame
+    def __init__(self, max_entries: int = OVERLAY_CACHE_SIZE, pool_size: int = OVERLAY_POOL_SIZE):
+        self.max_entries = max_entries
+        self.pool_size = pool_size
+        self._surfaces: "OrderedDict[Tuple, pygame.Surface]" = OrderedDict()
+        # evicted surfaces wait here to be refilled with another colour of the same size
+        self._pool: Dict[Tuple[int, int], List[pygame.Surface]] = {}
+        
+        self.allocations = 0
+        self.total_allocations = 0
+    
+    def begin_frame(self):
+        self.allocations = 0
+    
+    def get(self, size, rgba) -> pygame.Surface:
+        w, h = int(size[0]), int(size[1])
+        rgba = tuple(rgba) if len(rgba) == 4 else (*rgba, 255)
+        key = (w, h, rgba)
+        surf = self._surfaces.get(key)
+        if surf is not None:
+            self._surfaces.move_to_end(key)
+            return surf
+        
+        pooled = self._pool.get((w, h))
+        if pooled:
+            surf = pooled.pop()
+        else:
+            surf = pygame.Surface((w, h), pygame.SRCALPHA)
+            self.allocations += 1
+            self.total_allocations += 1
+        surf.fill(rgba)
+        self._surfaces[key] = surf
+        
+        while len(self._surfaces) > self.max_entries:
+            (ow, oh, _), old = self._surfaces.popitem(last=False)
+            pooled = self._pool.setdefault((ow, oh), [])
+            if len(pooled) < self.pool_size:
+                pooled.append(old)
+        return surf
+    
+    def blit(self, screen: pygame.Surface, rect, rgba):
+        rect = pygame.Rect(rect)
+        screen.blit(self.get(rect.size, rgba), rect)
+    
+    def clear(self):
+        self._surfaces.clear()
+        self._pool.clear()
+    
+    def stats(self) -> dict:
+        return {
+            "entries":           len(self._surfaces),
+            "pooled":            sum(len(p) for p in self._pool.values()),
+            "allocations":       self.allocations,
+            "total_allocations": self.total_allocations,
+        }
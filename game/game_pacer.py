@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from typing import Optional, List
+
+import pygame
+from .game_constants import FPS, BACKGROUND_FPS, IDLE_WAIT_MS, MINIMIZED_WAIT_MS
+
+class FramePacer:
+    def __init__(self):
+        self.clock = pygame.time.Clock()
+        self.delta_time = 0.0
+        self.focused = True
+        self.minimized = False
+    
+    def _track(self, event: pygame.event.Event):
+        if event.type == pygame.WINDOWFOCUSLOST:
+            self.focused = False
+        elif event.type == pygame.WINDOWFOCUSGAINED:
+            self.focused = True
+        elif event.type in (pygame.WINDOWMINIMIZED, pygame.WINDOWHIDDEN):
+            self.minimized = True
+        elif event.type in (pygame.WINDOWRESTORED, pygame.WINDOWSHOWN, pygame.WINDOWMAXIMIZED):
+            self.minimized = False
+    
+    def next_frame(self, idle: bool, timeout_ms: int = IDLE_WAIT_MS) -> Optional[List[pygame.event.Event]]:
+        # idle: sleep until input arrives (or the timeout runs out, then None - nothing to redraw)
+        # busy: classic fixed rate, dropped to BACKGROUND_FPS while the window has no focus
+        if idle or self.minimized:
+            if self.minimized or not self.focused:
+                timeout_ms = max(timeout_ms, MINIMIZED_WAIT_MS)
+            first = pygame.event.wait(timeout_ms)
+            if first.type == pygame.NOEVENT:
+                return None
+            events = [first] + pygame.event.get()
+            self.delta_time = self.clock.tick() / 1000.0
+        else:
+            self.delta_time = self.clock.tick(FPS if self.focused else BACKGROUND_FPS) / 1000.0
+            events = pygame.event.get()
+        
+        for event in events:
+            self._track(event)
+        return events
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import heapq
+from itertools import count
+from typing import Callable, List, Tuple
+
+import pygame
+
+# events held back while input is locked out, then delivered in order
+INPUT_EVENTS = (pygame.KEYDOWN, pygame.KEYUP, pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP, pygame.TEXTINPUT)
+
+class Timer:
+    __slots__ = ("due", "callback", "cancelled")
+    
+    def __init__(self, due: float, callback: Callable[[], None]):
+        self.due = due
+        self.callback = callback
+        self.cancelled = False
+    
+    def cancel(self):
+        self.cancelled = True
+
+class Scheduler:
+    # cooperative timers advanced once a frame by Game.run; nothing here ever sleeps
+    def __init__(self):
+        self.now = 0.0
+        self._timers: List[Tuple[float, int, Timer]] = []
+        self._seq = count()
+        self.lock_until = 0.0
+        self._held: List[pygame.event.Event] = []
+    
+    def after(self, seconds: float, callback: Callable[[], None]) -> Timer:
+        # run callback once, on the first frame at least this many seconds from now
+        timer = Timer(self.now + seconds, callback)
+        heapq.heappush(self._timers, (timer.due, next(self._seq), timer))
+        return timer
+    
+    def lock_input(self, seconds: float):
+        # hold input events back for a while; the frame loop keeps running and presenting meanwhile
+        self.lock_until = max(self.lock_until, self.now + seconds)
+    
+    @property
+    def input_locked(self) -> bool:
+        return self.now < self.lock_until
+    
+    def busy(self) -> bool:
+        # something will happen without new input, so the frame loop must not go idle
+        return self.input_locked or bool(self._held) or any(not t.cancelled for _, _, t in self._timers)
+    
+    def update(self, delta_time: float):
+        self.now += delta_time
+        while self._timers and self._timers[0][0] <= self.now:
+            _, _, timer = heapq.heappop(self._timers)
+            if not timer.cancelled:
+                timer.callback()
+    
+    def filter_input(self, events: List[pygame.event.Event]) -> List[pygame.event.Event]:
+        # the events to handle this frame: input is held while locked and released in order afterwards
+        if self.input_locked:
+            self._held.extend(e for e in events if e.type in INPUT_EVENTS)
+            return [e for e in events if e.type not in INPUT_EVENTS]
+        if self._held:
+            events = self._held + list(events)
+            self._held = []
+        return events
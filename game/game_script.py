@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import shlex
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+from .game_constants import ENEMIES, ITEMS
+from .game_events import TextBoxEvent, TextEvent
+
+# scripts.txt: "script <name>" starts a script, "<label>:" marks a jump target, every other line is one op.
+# Ops compile to a flat array of ints: opcode, then its arguments; labels become code offsets.
+#
+#   say <text>            show a text event (or a text_box event with its title and file) and wait for it
+#   ask <text> <label>    Yes/No question; anything but Yes jumps to label
+#   jump <label>
+#   need <item> <label>   jump to label unless the player carries item
+#   dead <label>          jump to label when the player has no HP left
+#   give <item> / take <item>
+#   event <id>            replace the event id of the cell the script was started from (saved)
+#   set <x>,<y> <t:o:e>   saved cell override; +x,+y / -x,-y are relative to the script's cell
+#   trigger               end the script and run whatever event its cell now holds
+#   monster <id>          monster for battle and for {name}/{hp}/{exp}/{gold} in texts
+#   battle <label>        fight the monster; losing or fleeing jumps to label
+#   delay                 pause for one movement beat
+#   toast "<text>"
+#   stop
+
+OP_SAY, OP_ASK, OP_JUMP, OP_NEED, OP_DEAD, OP_GIVE, OP_TAKE, OP_EVENT, OP_SET, OP_TRIGGER, OP_MONSTER, OP_BATTLE, OP_DELAY, OP_TOAST, OP_STOP = range(1, 16)
+
+# name -> (opcode, argument kinds): t text event, l label, i int, p position (3 slots), c cell (3 slots), s string
+OPS = {
+    "say":     (OP_SAY,     "t"),
+    "ask":     (OP_ASK,     "tl"),
+    "jump":    (OP_JUMP,    "l"),
+    "need":    (OP_NEED,    "il"),
+    "dead":    (OP_DEAD,    "l"),
+    "give":    (OP_GIVE,    "i"),
+    "take":    (OP_TAKE,    "i"),
+    "event":   (OP_EVENT,   "i"),
+    "set":     (OP_SET,     "pc"),
+    "trigger": (OP_TRIGGER, ""),
+    "monster": (OP_MONSTER, "i"),
+    "battle":  (OP_BATTLE,  "l"),
+    "delay":   (OP_DELAY,   ""),
+    "toast":   (OP_TOAST,   "s"),
+    "stop":    (OP_STOP,    ""),
+}
+SLOTS = {"t": 1, "l": 1, "i": 1, "p": 3, "c": 3, "s": 1}
+ARITY = [0] * (max(op for op, _ in OPS.values()) + 1)
+for _op, _kinds in OPS.values():
+    ARITY[_op] = sum(SLOTS[k] for k in _kinds)
+
+# ops a runner executes per frame at most before handing control back to the game loop
+SCRIPT_OPS_PER_FRAME = 64
+
+class Script:
+    __slots__ = ("name", "code", "consts")
+    
+    def __init__(self, name: str, code: array, consts: Tuple[str, ...]):
+        self.name = name
+        self.code = code
+        self.consts = consts
+
+def compile_script(name: str, lines: List[Tuple[int, str]], events) -> Script:
+    # lines are (line number, text); raises ValueError naming the offending line
+    code = array("i")
+    consts: List[str] = []
+    labels: Dict[str, int] = {}
+    fixups: List[Tuple[int, str, int]] = []
+    
+    for n, line in lines:
+        try:
+            if line.endswith(":"):
+                label = line[:-1].strip()
+                if label in labels:
+                    raise ValueError(f"label '{label}' defined twice")
+                labels[label] = len(code)
+                continue
+            
+            words = shlex.split(line)
+            spec = OPS.get(words[0])
+            if spec is None:
+                raise ValueError(f"unknown op '{words[0]}'")
+            op, kinds = spec
+            if len(words) - 1 != len(kinds):
+                raise ValueError(f"'{words[0]}' takes {len(kinds)} argument(s)")
+            
+            code.append(op)
+            for kind, word in zip(kinds, words[1:]):
+                if kind == "t":
+                    ev = events.get(int(word))
+                    if not isinstance(ev, (TextEvent, TextBoxEvent)):
+                        raise ValueError(f"event {word} is not a text")
+                    code.append(ev.id)
+                elif kind == "l":
+                    fixups.append((len(code), word, n))
+                    code.append(0)
+                elif kind == "i":
+                    value = int(word)
+                    if op in (OP_GIVE, OP_TAKE, OP_NEED) and value not in ITEMS:
+                        raise ValueError(f"unknown item {value}")
+                    if op == OP_MONSTER and value not in ENEMIES:
+                        raise ValueError(f"unknown monster {value}")
+                    code.append(value)
+                elif kind == "p":
+                    x, y = word.split(",")
+                    relative = x[0] in "+-" or y[0] in "+-"
+                    code.extend((int(relative), int(x), int(y)))
+                elif kind == "c":
+                    cell = [int(p) for p in word.split(":")]
+                    if len(cell) != 3:
+                        raise ValueError("expected 'tile:object:event'")
+                    code.extend(cell)
+                elif kind == "s":
+                    code.append(len(consts))
+                    consts.append(word)
+        except ValueError as e:
+            raise ValueError(f"line {n}: {e}") from None
+    
+    for at, label, n in fixups:
+        if label not in labels:
+            raise ValueError(f"line {n}: unknown label '{label}'")
+        code[at] = labels[label]
+    return Script(name, code, tuple(consts))
+
+def load_scripts_file(path, events) -> Dict[str, Script]:
+    blocks: Dict[str, List[Tuple[int, str]]] = {}
+    name = None
+    with open(path, "r", encoding="utf-8") as f:
+        for n, raw in enumerate(f, 1):
+            s = raw.strip()
+            if not s or s.startswith("#"):
+                continue
+            if s.startswith("script "):
+                name = s[len("script "):].strip()
+                blocks[name] = []
+            elif name is None:
+                print(f"[WARN] script line {n} is outside any script: '{s}'")
+            else:
+                blocks[name].append((n, s))
+    
+    scripts = {}
+    for name, lines in blocks.items():
+        try:
+            scripts[name] = compile_script(name, lines, events)
+        except ValueError as e:
+            print(f"[WARN] script '{name}' ignored: {e}")
+    return scripts
+
+class ScriptRunner:
+    # one running script; dialogue, delay and battle ops suspend it and the host resumes it once a frame
+    def __init__(self, script: Script, host, x: int, y: int, monster: Optional[int] = None):
+        self.script = script
+        self.host = host
+        self.game = host.game
+        self.x = x
+        self.y = y
+        self.monster = monster
+        self.pc = 0
+        self.done = False
+        # set by the trigger op: the host runs the cell's event once the script has ended
+        self.trigger = False
+        
+        # what the script is suspended on
+        self.modal = None
+        self.no_target: Optional[int] = None
+        self.delayed = False
+        self.battle_target: Optional[int] = None
+        
+        self._ops = [None] * len(ARITY)
+        for op, handler in (
+            (OP_SAY, self._say), (OP_ASK, self._ask), (OP_JUMP, self._jump), (OP_NEED, self._need),
+            (OP_DEAD, self._dead), (OP_GIVE, self._give), (OP_TAKE, self._take), (OP_EVENT, self._event),
+            (OP_SET, self._set), (OP_TRIGGER, self._trigger), (OP_MONSTER, self._monster),
+            (OP_BATTLE, self._battle), (OP_DELAY, self._delay), (OP_TOAST, self._toast), (OP_STOP, self._stop),
+        ):
+            self._ops[op] = handler
+    
+    def waiting_for_input(self) -> bool:
+        return self.modal is not None and self.modal.result is None
+    
+    def battle_over(self, won: Optional[bool]):
+        if self.battle_target is not None and not won:
+            self.pc = self.battle_target
+        self.battle_target = None
+    
+    def resume(self, budget: int = SCRIPT_OPS_PER_FRAME) -> bool:
+        # True once the script has finished
+        if self.delayed:
+            if self.game.scheduler.input_locked:
+                return False
+            self.delayed = False
+        if self.modal is not None:
+            if self.modal.result is None:
+                return False
+            if self.no_target is not None and self.modal.result != "Yes":
+                self.pc = self.no_target
+            self.modal = None
+            self.no_target = None
+        if self.battle_target is not None:
+            return False
+        
+        code = self.script.code
+        for _ in range(budget):
+            if self.done or self.pc >= len(code):
+                self.done = True
+                return True
+            op = code[self.pc]
+            args = code[self.pc + 1:self.pc + 1 + ARITY[op]]
+            self.pc += 1 + ARITY[op]
+            if self._ops[op](*args):
+                return self.done
+        return False
+    
+    def _text(self, ev_id: int) -> Tuple[str, str]:
+        ev = self.game.events[ev_id]
+        if isinstance(ev, TextBoxEvent):
+            return self.game.assets.load_text(ev.path), ev.title
+        text = ev.text
+        if self.monster is not None:
+            mon = ENEMIES[self.monster]
+            try:
+                text = text.format(name=mon["name"], hp=mon["hp"], exp=mon["exp"], gold=mon["gold"])
+            except (KeyError, IndexError):
+                pass
+        return text, ""
+    
+    # each op returns True when it suspends the script
+    def _say(self, ev_id):
+        text, title = self._text(ev_id)
+        self.modal = self.host.open_dialogue(text, title)
+        return True
+    
+    def _ask(self, ev_id, target):
+        text, title = self._text(ev_id)
+        self.modal = self.host.open_dialogue(text, title, ("Yes", "No"))
+        self.no_target = target
+        return True
+    
+    def _jump(self, target):
+        self.pc = target
+    
+    def _need(self, item_id, target):
+        if self.game.player.has_item(item_id) <= 0:
+            self.pc = target
+    
+    def _dead(self, target):
+        if self.game.player.hp == 0:
+            self.pc = target
+    
+    def _give(self, item_id):
+        self.game.player.add_item(item_id)
+    
+    def _take(self, item_id):
+        self.game.player.consume_item(item_id)
+    
+    def _event(self, ev_id):
+        self.game.cur_map.set_event_id(self.x, self.y, ev_id)
+    
+    def _set(self, relative, x, y, tile_idx, obj_idx, ev_id):
+        if relative:
+            x, y = self.x + x, self.y + y
+        self.game.cur_map.set_override(x, y, tile_idx, obj_idx, ev_id)
+    
+    def _trigger(self):
+        self.done = True
+        self.trigger = True
+        return True
+    
+    def _monster(self, mon_id):
+        self.monster = mon_id
+    
+    def _battle(self, target):
+        self.battle_target = target
+        self.host.start_battle(self.monster, self.x, self.y)
+        return True
+    
+    def _delay(self):
+        self.host.game_delay()
+        self.delayed = True
+        return True
+    
+    def _toast(self, const):
+        self.game.toast(self.script.consts[const])
+    
+    def _stop(self):
+        self.done = True
+        return True
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from typing import Callable, Dict, Iterator, Optional, Set, Tuple
+
+from .game_constants import MAP_CHUNK_SIZE
+
+class EventIndex:
+    # event cells of one map bucketed by kind and by MAP_CHUNK_SIZE chunk: {kind: {(cx, cy): {cell index}}}
+    def __init__(self, w: int, h: int, classify: Callable[[int], Optional[str]], chunk: int = MAP_CHUNK_SIZE):
+        self.w = w
+        self.h = h
+        self.classify = classify
+        self.chunk = chunk
+        self.buckets: Dict[str, Dict[Tuple[int, int], Set[int]]] = {}
+        # cell index -> (kind, event id) for every indexed cell
+        self.cells: Dict[int, Tuple[str, int]] = {}
+        # event id -> kind, an event's kind never changes
+        self._kinds: Dict[int, Optional[str]] = {}
+    
+    def build(self, cells: Iterator[Tuple[int, int, int]]):
+        self.buckets = {}
+        self.cells = {}
+        for x, y, ev_id in cells:
+            self.update(x, y, ev_id)
+    
+    def update(self, x: int, y: int, ev_id: int):
+        i = y * self.w + x
+        key = (x // self.chunk, y // self.chunk)
+        old = self.cells.pop(i, None)
+        if old is not None:
+            bucket = self.buckets[old[0]][key]
+            bucket.discard(i)
+            if not bucket:
+                del self.buckets[old[0]][key]
+        
+        kind = self._kinds.get(ev_id, False)
+        if kind is False:
+            kind = self._kinds[ev_id] = self.classify(ev_id) if ev_id > 0 else None
+        if kind is not None:
+            self.cells[i] = (kind, ev_id)
+            self.buckets.setdefault(kind, {}).setdefault(key, set()).add(i)
+    
+    def count(self, kind: str) -> int:
+        return sum(len(b) for b in self.buckets.get(kind, {}).values())
+    
+    def rect(self, kind: str, x0: int, y0: int, x1: int, y1: int) -> Iterator[Tuple[int, int, int]]:
+        # (x, y, event id) of every cell of this kind inside [x0, x1) x [y0, y1)
+        chunks = self.buckets.get(kind)
+        if not chunks:
+            return
+        w, c = self.w, self.chunk
+        for cy in range(max(0, y0) // c, max(0, y1 - 1) // c + 1):
+            for cx in range(max(0, x0) // c, max(0, x1 - 1) // c + 1):
+                for i in chunks.get((cx, cy), ()):
+                    x, y = i % w, i // w
+                    if x0 <= x < x1 and y0 <= y < y1:
+                        yield x, y, self.cells[i][1]
+    
+    def nearest(self, kind: str, x: int, y: int) -> Optional[Tuple[int, int, int]]:
+        # closest cell of this kind by steps (Manhattan distance), searched ring by ring of chunks
+        chunks = self.buckets.get(kind)
+        if not chunks:
+            return None
+        w, c = self.w, self.chunk
+        ccx, ccy = x // c, y // c
+        max_ring = max(ccx, ccy, (self.w - 1) // c - ccx, (self.h - 1) // c - ccy)
+        best, best_d = None, None
+        for r in range(max_ring + 1):
+            for cy in range(ccy - r, ccy + r + 1):
+                for cx in range(ccx - r, ccx + r + 1):
+                    if max(abs(cx - ccx), abs(cy - ccy)) != r:
+                        continue
+                    for i in chunks.get((cx, cy), ()):
+                        d = abs(i % w - x) + abs(i // w - y)
+                        if best_d is None or d < best_d:
+                            best, best_d = i, d
+            # every cell further out is at least r * chunk + 1 steps away
+            if best_d is not None and best_d <= r * c + 1:
+                break
+        return None if best is None else (best % w, best // w, self.cells[best][1])
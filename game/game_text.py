@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from typing import Callable, Dict, List, Tuple
+from collections import OrderedDict
+import re
+import string
+
+import pygame
+
+# every glyph the game text uses; anything else falls back to FreeType
+ATLAS_CHARS = string.printable[:95] + "–—•…←↑→↓"
+
+def surface_bytes(surf: pygame.Surface) -> int:
+    return surf.get_pitch() * surf.get_height()
+
+class GlyphAtlas:
+    # pre-rasterized glyphs of one font size and color, packed into a single sheet
+    def __init__(self, font: pygame.font.Font, color, chars: str = ATLAS_CHARS):
+        self.height = font.get_height()
+        self.cells: Dict[str, Tuple[pygame.Rect, int, int]] = {}
+        
+        glyphs = []
+        for ch in chars:
+            metrics = font.metrics(ch)[0]
+            if metrics is None:
+                continue
+            glyphs.append((ch, font.render(ch, True, color), min(0, metrics[0]), metrics[4]))
+        
+        self.sheet = pygame.Surface((max(1, sum(g.get_width() for _, g, _, _ in glyphs)), self.height), pygame.SRCALPHA)
+        self.sheet.fill((0, 0, 0, 0))
+        
+        x = 0
+        for ch, glyph, offset, advance in glyphs:
+            # BLEND_RGBA_MAX onto a cleared sheet copies the glyph as-is
+            self.sheet.blit(glyph, (x, 0), special_flags=pygame.BLEND_RGBA_MAX)
+            self.cells[ch] = (pygame.Rect(x, 0, glyph.get_width(), self.height), offset, advance)
+            x += glyph.get_width()
+    
+    def covers(self, text: str) -> bool:
+        cells = self.cells
+        return all(ch in cells for ch in text)
+    
+    def render(self, text: str) -> pygame.Surface:
+        placed = []
+        x = 0
+        for ch in text:
+            area, offset, advance = self.cells[ch]
+            placed.append((area, x + offset))
+            x += advance
+        
+        shift = -min(0, min(px for _, px in placed))
+        width = max(x, max(px + area.width for area, px in placed)) + shift
+        
+        surf = pygame.Surface((width, self.height), pygame.SRCALPHA)
+        surf.fill((0, 0, 0, 0))
+        for area, px in placed:
+            surf.blit(self.sheet, (px + shift, 0), area, special_flags=pygame.BLEND_RGBA_MAX)
+        return surf
+
+class TextEngine:
+    def __init__(self, get_font: Callable[[int], pygame.font.Font]):
+        self.get_font = get_font
+        self._atlases: Dict[Tuple, GlyphAtlas] = {}
+        self._advances: Dict[int, Dict[str, int]] = {}
+    
+    def atlas(self, size: int, color) -> GlyphAtlas:
+        key = (size, tuple(color))
+        if key not in self._atlases:
+            self._atlases[key] = GlyphAtlas(self.get_font(size), color)
+        return self._atlases[key]
+    
+    def advances(self, size: int) -> Dict[str, int]:
+        if size not in self._advances:
+            font = self.get_font(size)
+            table = {}
+            for ch in ATLAS_CHARS:
+                metrics = font.metrics(ch)[0]
+                if metrics is not None:
+                    table[ch] = metrics[4]
+            self._advances[size] = table
+        return self._advances[size]
+    
+    def measure(self, text: str, size: int) -> int:
+        table = self.advances(size)
+        width = 0
+        for ch in text:
+            advance = table.get(ch)
+            if advance is None:
+                return self.get_font(size).size(text)[0]
+            width += advance
+        return width
+    
+    def render(self, text: str, size: int, color=(220, 220, 220), antialias: bool = True) -> pygame.Surface:
+        if text and antialias:
+            atlas = self.atlas(size, color)
+            if atlas.covers(text):
+                return atlas.render(text)
+        return self.get_font(size).render(text, antialias, color)
+    
+    def wrap(self, text: str, size: int, max_width: int) -> List[str]:
+        # greedy wrap on word/space tokens, keeping a running width instead of re-measuring the line
+        lines = []
+        for paragraph in text.split("\n"):
+            cur = ""
+            cur_w = 0
+            for t in re.findall(r'\S+|\s+', paragraph):
+                t_w = self.measure(t, size)
+                if not cur or cur_w + t_w <= max_width:
+                    cur += t
+                    cur_w += t_w
+                else:
+                    lines.append(cur)
+                    cur = t.lstrip()
+                    cur_w = self.measure(cur, size)
+            
+            if cur:
+                lines.append(cur)
+            
+            if paragraph == "":
+                lines.append("")
+        
+        return lines
+
+class TextCache:
+    # LRU of rendered strings keyed by (text, size, color, antialias), bounded by surface memory
+    def __init__(self, render: Callable[..., pygame.Surface], max_bytes: int):
+        self._render = render
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._surfaces: "OrderedDict[Tuple, pygame.Surface]" = OrderedDict()
+    
+    def render(self, text: str, size: int, color=(220, 220, 220), antialias: bool = True) -> pygame.Surface:
+        key = (text, size, tuple(color), antialias)
+        surf = self._surfaces.get(key)
+        if surf is not None:
+            self._surfaces.move_to_end(key)
+            self.hits += 1
+            return surf
+        
+        self.misses += 1
+        surf = self._render(text, size, color, antialias)
+        self._surfaces[key] = surf
+        self.bytes += surface_bytes(surf)
+        
+        while self.bytes > self.max_bytes and len(self._surfaces) > 1:
+            _, old = self._surfaces.popitem(last=False)
+            self.bytes -= surface_bytes(old)
+        return surf
+    
+    def clear(self):
+        self._surfaces.clear()
+        self.bytes = 0
+    
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._surfaces),
+            "bytes":   self.bytes,
+            "hits":    self.hits,
+            "misses":  self.misses,
+        }
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from abc import ABC, abstractmethod
+from typing import Callable, Dict, List, Optional, Tuple
+
+import pygame
+from .game_constants import WIDTH, HEIGHT
+
+class TextDocument:
+    # a block of text laid out once into a tall surface; scrolling only picks the window to blit
+    def __init__(self, game: "Game", width: int, *, size: int, color=(220, 220, 220), line_height: int = 20, wrap: Optional[Callable[[str, int, int], List[str]]] = None):
+        self.game = game
+        self.width = width
+        self.size = size
+        self.color = color
+        self.line_height = line_height
+        self.wrap = wrap or game.text.wrap
+        
+        self.text: Optional[str] = None
+        self.lines: List[str] = []
+        self.surface: Optional[pygame.Surface] = None
+    
+    def set_text(self, text: str, size: Optional[int] = None):
+        size = self.size if size is None else size
+        if text == self.text and size == self.size:
+            return
+        self.text = text
+        self.size = size
+        self.lines = self.wrap(text, size, self.width)
+        self.surface = None
+    
+    def layout(self) -> pygame.Surface:
+        if self.surface is None:
+            font_h = self.game._get_font(self.size).get_height()
+            height = max(font_h, (len(self.lines) - 1) * self.line_height + font_h)
+            
+            self.surface = pygame.Surface((self.width, height), pygame.SRCALPHA)
+            self.surface.fill((0, 0, 0, 0))
+            for i, line in enumerate(self.lines):
+                if line:
+                    # lines may overlap by the font's leading; MAX keeps both glyph edges intact
+                    line_surf = self.game.render_text(line, self.size, self.color)
+                    self.surface.blit(line_surf, (0, i * self.line_height), special_flags=pygame.BLEND_RGBA_MAX)
+        return self.surface
+    
+    def max_scroll(self) -> int:
+        return max(0, (len(self.lines) - 1) * self.line_height)
+    
+    def draw(self, screen: pygame.Surface, pos, scroll_px: int = 0, view_h: Optional[int] = None):
+        surface = self.layout()
+        view_h = surface.get_height() if view_h is None else view_h
+        view = pygame.Rect(0, scroll_px, self.width, view_h).clip(surface.get_rect())
+        screen.blit(surface, pos, view)
+
+class Widget(ABC):
+    # retained piece of UI: its surface is rebuilt only when the properties bound to it change
+    def __init__(self, game: "Game"):
+        self.game = game
+        self.props = None
+        self.surface: Optional[pygame.Surface] = None
+        self.rect = pygame.Rect(0, 0, 0, 0)
+        self.drawn: Optional[pygame.Rect] = None
+    
+    def bind(self, **props):
+        if props != self.props:
+            self.props = props
+            self.surface = None
+        return self
+    
+    def leaves(self):
+        return (self,)
+    
+    @abstractmethod
+    def build(self) -> Tuple[pygame.Surface, pygame.Rect]:
+        pass
+    
+    def prepare(self):
+        if self.surface is None:
+            self.surface, self.rect = self.build()
+
+class Label(Widget):
+    def set(self, text: str, pos, *, size: int = 20, color=(220, 220, 220), anchor: str = "center", underline=None, underline_offset: int = 2):
+        return self.bind(text=text, pos=tuple(pos), size=size, color=tuple(color), anchor=anchor, underline=underline, underline_offset=underline_offset)
+    
+    def build(self):
+        p = self.props
+        text_surf = self.game.render_text(p["text"], p["size"], p["color"])
+        rect = text_surf.get_rect(**{p["anchor"]: p["pos"]})
+        if not p["underline"]:
+            return text_surf, rect
+        
+        w, h = text_surf.get_size()
+        uy = h + p["underline_offset"]
+        surf = pygame.Surface((w + 1, max(h, uy + 2)), pygame.SRCALPHA)
+        surf.fill((0, 0, 0, 0))
+        surf.blit(text_surf, (0, 0))
+        pygame.draw.line(surf, p["underline"], (0, uy), (w, uy), 2)
+        return surf, pygame.Rect(rect.topleft, surf.get_size())
+
+class HintBar(Label):
+    def set(self, text: str, y: int, *, size: int = 14, color=(170, 170, 180)):
+        return super().set(text, (WIDTH//2, y), size=size, color=color)
+
+class InputBox(Widget):
+    def set(self, text: str, rect: pygame.Rect, *, size: int = 20, centered: bool = False):
+        return self.bind(text=text, rect=tuple(rect), size=size, centered=centered)
+    
+    def build(self):
+        p = self.props
+        rect = pygame.Rect(p["rect"])
+        surf = pygame.Surface(rect.size)
+        surf.fill((50, 50, 70))
+        pygame.draw.rect(surf, (200, 200, 240), surf.get_rect(), 2)
+        
+        txt_surface = self.game.render_text(p["text"], p["size"], (255, 255, 255))
+        if p["centered"]:
+            surf.blit(txt_surface, txt_surface.get_rect(center=surf.get_rect().center))
+        else:
+            surf.blit(txt_surface, (5, 5))
+        return surf, rect
+
+class Group(Widget):
+    # lays out child labels; the layer draws its leaves, so the group itself has nothing to build
+    def build(self):
+        return pygame.Surface((0, 0)), pygame.Rect(self.rect.topleft, (0, 0))
+
+class ListView(Group):
+    # one Label per visible row, so moving the selection only rebuilds the rows it leaves and enters
+    def __init__(self, game: "Game"):
+        super().__init__(game)
+        self.rows: List[Label] = []
+    
+    def set(self, items: List[str], selected: int, pos, *, row_height: int, size: int = 18, color=(200, 200, 210), selected_color=(255, 220, 120), marker: bool = False, underline=None):
+        x, y0 = pos
+        del self.rows[len(items):]
+        while len(self.rows) < len(items):
+            self.rows.append(Label(self.game))
+        
+        for i, (row, text) in enumerate(zip(self.rows, items)):
+            sel = (i == selected)
+            if marker:
+                mark = "•" if sel else ""
+                text = f"{mark} {text} {mark}"
+            row.set(text, (x, y0 + i*row_height), size=size, color=selected_color if sel else color, underline=underline if sel else None)
+        return self
+    
+    def leaves(self):
+        return self.rows
+
+class ButtonRow(Group):
+    def __init__(self, game: "Game"):
+        super().__init__(game)
+        self.buttons: List[Label] = []
+    
+    def set(self, labels, selected: int, center_x: int, baseline_y: int, *, size: int = 16, spacing: int = 20, color=(255, 255, 255), underline=(0, 128, 255)):
+        widths = [self.game.text.measure(lbl, size) for lbl in labels]
+        x = (center_x*2 - sum(widths) - spacing*(len(labels)-1)) // 2
+        
+        del self.buttons[len(labels):]
+        while len(self.buttons) < len(labels):
+            self.buttons.append(Label(self.game))
+        
+        for i, (button, lbl) in enumerate(zip(self.buttons, labels)):
+            button.set(lbl, (x, baseline_y), size=size, color=color, anchor="bottomleft", underline=underline if i == selected else None, underline_offset=-2)
+            x += widths[i] + spacing
+        return self
+    
+    def leaves(self):
+        return self.buttons
+
+class Panel:
+    # translucent box with a title; panels are static and get baked into the layer background
+    def __init__(self, rect: pygame.Rect, title: str = "", alpha: int = 160):
+        self.rect = pygame.Rect(rect)
+        self.title = title
+        self.alpha = alpha
+    
+    def key(self):
+        return (tuple(self.rect), self.title, self.alpha)
+    
+    def paint(self, game: "Game", surface: pygame.Surface):
+        game.overlays.blit(surface, self.rect, (0, 0, 0, self.alpha))
+        if self.title:
+            title = game.render_text(self.title, 18, (255, 240, 220))
+            surface.blit(title, title.get_rect(center=(self.rect.centerx, self.rect.top + 14)))
+
+class WidgetLayer:
+    # root of a state's widgets: states describe their UI every frame by key, the layer keeps the
+    # widgets alive between frames and repaints only the ones whose bound data changed
+    def __init__(self, game: "Game"):
+        self.game = game
+        self.widgets: Dict[str, Widget] = {}
+        self.background: Optional[pygame.Surface] = None
+        self._bg_key = None
+        self._bg_color = (0, 0, 0)
+        self._panels: List[Panel] = []
+        self._seen = set()
+        self._shown: List[Widget] = []
+    
+    def begin(self, bg_color):
+        self._bg_color = tuple(bg_color)
+        self._panels = []
+        self._seen = set()
+    
+    def panel(self, rect: pygame.Rect, title: str = "", alpha: int = 160):
+        self._panels.append(Panel(rect, title, alpha))
+    
+    def _get(self, key: str, cls):
+        self._seen.add(key)
+        widget = self.widgets.get(key)
+        if type(widget) is not cls:
+            widget = self.widgets[key] = cls(self.game)
+        return widget
+    
+    def label(self, key: str, text: str, pos, **style) -> Label:
+        return self._get(key, Label).set(text, pos, **style)
+    
+    def hint(self, key: str, text: str, y: int, **style) -> HintBar:
+        return self._get(key, HintBar).set(text, y, **style)
+    
+    def input_box(self, key: str, text: str, rect: pygame.Rect, **style) -> InputBox:
+        return self._get(key, InputBox).set(text, rect, **style)
+    
+    def list_view(self, key: str, items: List[str], selected: int, pos, **style) -> ListView:
+        return self._get(key, ListView).set(items, selected, pos, **style)
+    
+    def buttons(self, key: str, labels, selected: int, center_x: int, baseline_y: int, **style) -> ButtonRow:
+        return self._get(key, ButtonRow).set(labels, selected, center_x, baseline_y, **style)
+    
+    def _compose_background(self):
+        bg_key = (self._bg_color, tuple(panel.key() for panel in self._panels))
+        if bg_key == self._bg_key and self.background is not None:
+            return
+        self._bg_key = bg_key
+        self.background = pygame.Surface((WIDTH, HEIGHT))
+        self.background.fill(self._bg_color)
+        for panel in self._panels:
+            panel.paint(self.game, self.background)
+        self.game.redraw_all()
+    
+    def render(self, screen: pygame.Surface):
+        self._compose_background()
+        for key in [key for key in self.widgets if key not in self._seen]:
+            del self.widgets[key]
+        
+        leaves = [leaf for widget in self.widgets.values() for leaf in widget.leaves()]
+        current = set(leaves)
+        regions = [leaf.drawn for leaf in self._shown if leaf not in current and leaf.drawn]
+        for leaf in leaves:
+            if leaf.surface is None:
+                if leaf.drawn:
+                    regions.append(leaf.drawn)
+                leaf.prepare()
+                regions.append(leaf.rect)
+        self._shown = leaves
+        
+        if not self.game.dirty_rects_mode or self.game.full_redraw:
+            screen.blit(self.background, (0, 0))
+            for leaf in leaves:
+                screen.blit(leaf.surface, leaf.rect)
+        else:
+            # restore the background under every changed area and put back whatever overlaps it
+            for region in regions:
+                screen.set_clip(region)
+                screen.blit(self.background, region, region)
+                for leaf in leaves:
+                    if leaf.rect.colliderect(region):
+                        screen.blit(leaf.surface, leaf.rect)
+                self.game.mark_dirty(region)
+            screen.set_clip(None)
+        
+        for leaf in leaves:
+            leaf.drawn = leaf.rect
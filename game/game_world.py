@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from collections import Counter, deque
+from typing import Dict, List, Optional, Set, Tuple
+
+# a warp is (map, x, y, dest map, dest x, dest y): the change_map cell and where bumping into it lands the player
+Warp = Tuple[str, int, int, str, int, int]
+Cell = Tuple[int, int]
+
+STEPS = ((0, -1), (-1, 0), (1, 0), (0, 1))
+
+class MapScan:
+    # one map's event cells, and the warps each walkable region can bump into. Regions are flooded when a query
+    # first needs them and remembered only at anchor cells (next to a warp, or arrival points), never as a plane
+    def __init__(self, world: "WorldGraph", name: str):
+        self.world = world
+        self.name = name
+        self.w, self.h = world.game.maps.size(name)
+        self.stamp = world.game.map_overrides.version(name)
+        self.overrides = world.game.map_overrides.for_map(name)
+        
+        self.events: Dict[Cell, int] = {}
+        # kinds of the events placed on the map, with how many cells carry each
+        self.kinds: Counter = Counter()
+        self.warps: Dict[Cell, Warp] = {}
+        # anchor cell -> region id; region id -> (its anchor cells, the warp cells it touches)
+        self.labels: Dict[Cell, int] = {}
+        self.regions: Dict[int, Tuple[List[Cell], Set[Cell]]] = {}
+        self._next_region = 0
+        
+        _, _, grid = world.game.maps[name]
+        for x, y, ev_id in grid.cells_with_event():
+            if y * self.w + x not in self.overrides:
+                self._set_event(x, y, ev_id)
+        for i, (_, _, ev_id) in self.overrides.items():
+            if ev_id:
+                self._set_event(i % self.w, i // self.w, ev_id)
+    
+    def cell(self, x: int, y: int) -> Tuple[int, int, int]:
+        # the saved cell: temporary edits of the current visit do not change the way between maps
+        cell = self.overrides.get(y * self.w + x)
+        return self.world.game.maps[self.name][2][x, y] if cell is None else cell
+    
+    def walkable(self, x: int, y: int) -> bool:
+        return 0 <= x < self.w and 0 <= y < self.h and self.world.game.cur_map.cell_walkable(*self.cell(x, y))
+    
+    def _set_event(self, x: int, y: int, ev_id: int):
+        events = self.world.game.events
+        old = self.events.pop((x, y), 0)
+        if old and old in events:
+            kind = events[old].kind
+            self.kinds[kind] -= 1
+            if not self.kinds[kind]:
+                del self.kinds[kind]
+        self.warps.pop((x, y), None)
+        
+        ev = events.get(ev_id) if ev_id else None
+        if ev_id:
+            self.events[x, y] = ev_id
+        if ev is None:
+            return
+        self.kinds[ev.kind] += 1
+        if ev.kind == "change_map":
+            if ev.map_name in self.world.game.maps:
+                self.warps[x, y] = (self.name, x, y, ev.map_name, ev.x, ev.y)
+            else:
+                print(f"[WARN] change_map event {ev.id:03} leads to unknown map '{ev.map_name}'")
+    
+    def _explore(self, x: int, y: int, blocked: Optional[Cell] = None):
+        # BFS over the walkable cells from (x, y): (region id, None, None) as soon as a remembered anchor is met,
+        # else (None, anchors, warp cells touched) for the whole region
+        seen = {(x, y)}
+        queue = deque([(x, y)])
+        anchors = []
+        touched = set()
+        while queue:
+            c = queue.popleft()
+            label = self.labels.get(c)
+            if label is not None:
+                return label, None, None
+            
+            anchor = False
+            for dx, dy in STEPS:
+                n = (c[0] + dx, c[1] + dy)
+                if n in self.warps:
+                    touched.add(n)
+                    anchor = True
+                if n not in seen and n != blocked and self.walkable(*n):
+                    seen.add(n)
+                    queue.append(n)
+            if anchor:
+                anchors.append(c)
+        return None, anchors, touched
+    
+    def _region_warps(self, x: int, y: int, remember: bool) -> Set[Cell]:
+        # warp cells the walkable cell (x, y) can reach; remember makes the cell an anchor itself
+        label, anchors, touched = self._explore(x, y)
+        if label is not None:
+            if remember and (x, y) not in self.labels:
+                self.labels[x, y] = label
+                self.regions[label][0].append((x, y))
+            return self.regions[label][1]
+        
+        if remember and (x, y) not in anchors:
+            anchors.append((x, y))
+        if anchors:
+            self._next_region += 1
+            self.regions[self._next_region] = (anchors, touched)
+            for c in anchors:
+                self.labels[c] = self._next_region
+        return touched
+    
+    def warps_at(self, x: int, y: int, remember: bool = False) -> List[Warp]:
+        # an arrival cell that is not walkable itself still connects to its walkable neighbours
+        if not (0 <= x < self.w and 0 <= y < self.h):
+            return []
+        if self.walkable(x, y):
+            cells = self._region_warps(x, y, remember)
+        else:
+            cells = set()
+            for dx, dy in STEPS:
+                if self.walkable(x + dx, y + dy):
+                    cells |= self._region_warps(x + dx, y + dy, remember)
+        return [self.warps[c] for c in sorted(cells) if c in self.warps]
+    
+    def cell_changed(self, x: int, y: int):
+        ev_id = self.cell(x, y)[2]
+        if self.events.get((x, y), 0) != ev_id:
+            self._set_event(x, y, ev_id)
+        
+        # the cell may join, split, open or close regions next to it: forget those, they are flooded again when asked
+        stale = set()
+        if (x, y) in self.labels:
+            stale.add(self.labels[x, y])
+        for dx, dy in STEPS:
+            nx, ny = x + dx, y + dy
+            if self.walkable(nx, ny):
+                label, _, _ = self._explore(nx, ny, blocked=(x, y))
+                if label is not None:
+                    stale.add(label)
+        for label in stale:
+            anchors, _ = self.regions.pop(label)
+            for c in anchors:
+                del self.labels[c]
+
+class WorldGraph:
+    # how the maps connect through change_map cells. A map is scanned when a query first reaches it, and
+    # GameMap.invalidate_cell keeps the scan of an edited map up to date in place
+    def __init__(self, game: "Game"):
+        self.game = game
+        self.scans: Dict[str, MapScan] = {}
+        self._store = None
+    
+    def scan(self, name: str) -> MapScan:
+        # a loaded game swaps the whole override store, and a new game clears it: both start over
+        store = self.game.map_overrides
+        if store is not self._store:
+            self._store = store
+            self.scans = {}
+        scan = self.scans.get(name)
+        if scan is None or scan.stamp != store.version(name):
+            scan = self.scans[name] = MapScan(self, name)
+        return scan
+    
+    def cell_changed(self, name: str, x: int, y: int):
+        scan = self.scans.get(name)
+        if scan is None or self.game.map_overrides is not self._store:
+            return
+        # one saved edit since the scan, or only a temporary one, is applied in place
+        version = self._store.version(name)
+        if scan.stamp not in (version, version - 1):
+            del self.scans[name]
+            return
+        scan.cell_changed(x, y)
+        scan.stamp = version
+    
+    def maps_with(self, kind: str) -> List[str]:
+        return sorted(name for name in self.game.maps if self.scan(name).kinds.get(kind))
+    
+    def warps(self, name: str) -> List[Warp]:
+        return sorted(self.scan(name).warps.values())
+    
+    def _walk(self, src: str, x: int, y: int):
+        # breadth-first over warps from (x, y) on src: yields (map, warps taken) the first time each map is reached
+        yield src, ()
+        seen_nodes = set()
+        seen_maps = {src}
+        frontier = [(warp, ()) for warp in self.scan(src).warps_at(x, y)]
+        while frontier:
+            nxt = []
+            for warp, via in frontier:
+                node = warp[3:]
+                if node in seen_nodes:
+                    continue
+                seen_nodes.add(node)
+                via = via + (warp,)
+                if node[0] not in seen_maps:
+                    seen_maps.add(node[0])
+                    yield node[0], via
+                nxt.extend((w, via) for w in self.scan(node[0]).warps_at(node[1], node[2], remember=True))
+            frontier = nxt
+    
+    def route(self, src: str, dst: str, x: int, y: int) -> Optional[List[Warp]]:
+        # fewest warps to take from (x, y) on src to reach dst; None when dst can't be reached
+        if src not in self.game.maps or dst not in self.game.maps:
+            return None
+        for name, via in self._walk(src, x, y):
+            if name == dst:
+                return list(via)
+        return None
+    
+    def reachable_maps(self, src: str, x: int, y: int) -> Set[str]:
+        if src not in self.game.maps:
+            return set()
+        return {name for name, _ in self._walk(src, x, y)}
@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+from collections import deque
 from typing import Optional, List
 import random
 
@@ -16,11 +17,51 @@ RED   = (220,40,40)
 BLUE  = (60,60,220)
 GRAY  = (40,40,40)
 MAX_DMG = 999
+LOG_LINES = 10
+
+class BattleLog:
+    # the last LOG_LINES messages; the composed log is only rebuilt when a message arrives
+    def __init__(self, game: "Game", pos=(20, 140), line_height: int = 20):
+        self.game = game
+        self.line_height = line_height
+        self.lines = deque(maxlen=LOG_LINES)
+        self.version = 0
+        
+        height = (LOG_LINES - 1) * line_height + game._get_font(16).get_height()
+        self.rect = pygame.Rect(pos, (WIDTH - pos[0], height))
+        self._surface: Optional[pygame.Surface] = None
+    
+    def append(self, entry):
+        msg, color = entry
+        self.lines.append((msg, color, self.game.render_text(msg, 16, color)))
+        self.version += 1
+        self._surface = None
+    
+    def __len__(self):
+        return len(self.lines)
+    
+    def __iter__(self):
+        return ((msg, color) for msg, color, _ in self.lines)
+    
+    def surface(self) -> pygame.Surface:
+        if self._surface is None:
+            self._surface = pygame.Surface(self.rect.size, pygame.SRCALPHA)
+            self._surface.fill((0, 0, 0, 0))
+            for i, (_, _, surf) in enumerate(self.lines):
+                # MAX keeps descenders that reach into the next line's slot intact
+                self._surface.blit(surf, (0, i * self.line_height), special_flags=pygame.BLEND_RGBA_MAX)
+        return self._surface
 
 def randomInt() -> int:
     return random.randrange(100)
 
 class BattleState(IState):
+    partial_render = True
+    
+    MON_BAR = pygame.Rect(12, 12, WIDTH - 12 * 3 - SHEET_SIZE_SCALED, 20)
+    HERO_BAR = pygame.Rect(SHEET_SIZE_SCALED + 24, 104, WIDTH - 12 * 3 - SHEET_SIZE_SCALED, 20)
+    MENU_AREA = pygame.Rect(200, 200, WIDTH - 200, HEIGHT - 200)
+    
     def __init__(self, game: "Game", return_to: IState):
         self.game = game
         self.return_to = return_to
@@ -36,7 +77,7 @@ class BattleState(IState):
         self.sub_index = 0
     
     def game_delay(self, time = int(FPS * 3)):
-        pygame.time.delay(time)
+        self.game.scheduler.lock_input(time / 1000)
     
     def enter(self):
         # init data
@@ -45,18 +86,24 @@ class BattleState(IState):
         self.mo["max_hp"] = self.mo["hp"]
         self.buffs = 0
         
+        # level and gear cannot change mid-fight, so the derived maxima are fixed for the battle
+        self.hero_max_hp = self.mc.get_hero_max_hp()
+        self.hero_max_mp = self.mc.get_hero_max_mp()
+        
         self.game_delay()
         self.menu_index = 0
         self.submenu = None
         self.sub_index = 0
-        self.wait_end = 0
         
         # states
         self.state = "player" # "action", "player", "monster"
         self.ready = f"{self.mc.name} is ready for the command."
         
-        self.messages = []
+        self.messages = BattleLog(self.game)
         self.messages.append((self.ready, BLUE))
+        
+        self._compose_static()
+        self._drawn = {}
     
     def hero_attack(self):
         dmg = self.mc.get_hero_atk() - self.mo["def"]
@@ -190,9 +237,6 @@ class BattleState(IState):
         if self.state != "player":
             return
         
-        # get screen
-        screen = pygame.display.get_surface()
-        
         if self.submenu is None:
             if event.key in (pygame.K_LEFT, pygame.K_a):
                 self.menu_index = (self.menu_index-1) % 4
@@ -209,8 +253,6 @@ class BattleState(IState):
                 if choice == "Attack":
                     self.state = "action"
                     self.messages.append((self.hero_attack(), BLUE))
-                    self.render(screen)
-                    pygame.display.flip()
                     is_win = self.check_win()
                     if not is_win:
                         self.state = "monster"
@@ -260,8 +302,6 @@ class BattleState(IState):
                                 return
                             self.state = "action"
                             self.messages.append((self.cast_magic(sid), BLUE))
-                            self.render(screen)
-                            pygame.display.flip()
                             
                             self.state = "monster"
                         else:
@@ -272,8 +312,6 @@ class BattleState(IState):
                                 return
                             self.state = "action"
                             self.messages.append((self.cast_magic(sid), BLUE))
-                            self.render(screen)
-                            pygame.display.flip()
                             is_win = self.check_win()
                             if not is_win:
                                 self.state = "monster"
@@ -283,33 +321,26 @@ class BattleState(IState):
                         self.state = "action"
                         iid = entries[self.sub_index]
                         self.messages.append((self._use_item(iid), BLUE))
-                        self.render(screen)
-                        pygame.display.flip()
                         self.state = "monster"
     
     def update(self, delta_time: float):
-        if self.state == "end":
-            self.wait_end += delta_time
-            if self.wait_end >= 3:
-                self.state = "end_"
-                self.game.change_state(self.game.states["map"])
-        
         if self.state == "monster":
             self.state = "action"
             self.messages.append((self.mon_attack(), RED))
-            screen = pygame.display.get_surface()
-            self.render(screen)
-            pygame.display.flip()
             is_lose = self.check_lose()
             if not is_lose:
                 self.messages.append((self.ready, BLUE))
                 self.state = "player"
     
+    def is_idle(self) -> bool:
+        # only the command menu waits on input; monster turns and the end timer run every frame
+        return self.state == "player"
+    
     def check_win(self):
         if self.mo["hp"] < 1:
             self.mc.power = 0
             self.result.append(True)
-            self.state = "end"
+            self.end_battle()
             return True
         return False
     
@@ -318,38 +349,100 @@ class BattleState(IState):
             self.mc.power = 0
             self.score_penalty()
             self.result.append(False)
-            self.state = "end"
+            self.end_battle()
             return True
         return False
     
+    def end_battle(self):
+        # the last messages stay up for a few seconds before going back to the map
+        self.state = "end"
+        self.game.scheduler.after(3, self.leave)
+    
+    def leave(self):
+        if self.state == "end":
+            self.state = "end_"
+            self.game.change_state(self.game.states["map"])
+    
     def score_penalty(self):
         self.mc.score -= 200
         if self.mc.score < 0:
             self.mc.score = 0
     
+    def _compose_static(self):
+        # everything that stays put for the whole fight: background and both sprites
+        self.static = pygame.Surface((WIDTH, HEIGHT)).convert()
+        self.static.fill(BLACK)
+        self.static.blit(self.game.sprites[self.mon_id - 1], (WIDTH - SHEET_SIZE * SCALE - 12, 12))
+        self.static.blit(self.game.sprites[15], (12, 60))
+    
+    def _submenu_labels(self):
+        labels = []
+        if self.submenu == "cast":
+            for e in self.available_spells():
+                if e == 0:
+                    summon = SUMMONS[self.mc.equip.get("ring") % 300]
+                    labels.append(f"{summon['name']:<14} (MP{summon['mp_cost']:02})")
+                else:
+                    spell = SPELLS[e]
+                    labels.append(f"{spell["name"]:<14} (MP{spell['mp_cost']:02})")
+        if self.submenu == "item":
+            for e in self.available_items():
+                item = ITEMS.get(e)["name"]
+                qty = self.mc.inventory.get(e, 0)
+                labels.append(f"{item:<14}  x{qty:02}")
+        return tuple(labels)
+    
+    def _parts(self):
+        # (key, screen area) of every piece that can change during the fight
+        mon_text = f'HP {self.mo["hp"]:03}/{self.mo["max_hp"]:03}'
+        mon_surf = self.game.render_text(mon_text, 16, WHITE)
+        mon_rect = mon_surf.get_rect(topleft=(WIDTH - 12 * 10.25 - SHEET_SIZE_SCALED, 40))
+        
+        hero_text = f"HP {self.mc.hp:04}/{self.hero_max_hp:04} • MP {self.mc.mp:04}/{self.hero_max_mp:04}"
+        hero_surf = self.game.render_text(hero_text, 16, WHITE)
+        hero_rect = hero_surf.get_rect(topleft=(SHEET_SIZE_SCALED + 24, 72))
+        
+        menu = (self.state == "player", self.submenu, self.menu_index, self.sub_index, self._submenu_labels())
+        
+        return {
+            "mon":  (mon_text, self.MON_BAR.union(mon_rect), (mon_surf, mon_rect)),
+            "hero": (hero_text, self.HERO_BAR.union(hero_rect), (hero_surf, hero_rect)),
+            "log":  (self.messages.version, self.messages.rect, None),
+            "menu": (menu, self.MENU_AREA, None),
+        }
+    
     def render(self, screen: pygame.Surface):
-        screen.fill(BLACK)
-        
-        self.percent_bar(screen, 12, 12, WIDTH - 12 * 3 - SHEET_SIZE_SCALED, 20, self.mo["hp"], self.mo["max_hp"])
-        en_text = self.game._get_font(16).render(f'HP {self.mo["hp"]:03}/{self.mo["max_hp"]:03}', True, WHITE)
-        screen.blit(en_text, (WIDTH - 12 * 10.25 - SHEET_SIZE_SCALED, 40))
+        parts = self._parts()
         
-        mon_sprite = self.game.sprites[self.mon_id - 1]
-        screen.blit(mon_sprite, (WIDTH - SHEET_SIZE * SCALE - 12, 12))
-        
-        self.percent_bar(screen, SHEET_SIZE_SCALED + 24, 104, WIDTH - 12 * 3 - SHEET_SIZE_SCALED, 20, self.mc.hp, self.mc.get_hero_max_hp())
-        hero_txt = f"HP {self.mc.hp:04}/{self.mc.get_hero_max_hp():04} • MP {self.mc.mp:04}/{self.mc.get_hero_max_mp():04}"
-        hero_txt = self.game._get_font(16).render(hero_txt, True, WHITE)
-        screen.blit(hero_txt, (SHEET_SIZE_SCALED + 24, 72))
+        if not self.game.dirty_rects_mode or self.game.full_redraw:
+            screen.blit(self.static, (0, 0))
+            self._draw_dynamic(screen, parts)
+        else:
+            regions = []
+            for name, (key, rect, _) in parts.items():
+                drawn = self._drawn.get(name)
+                if drawn is None or drawn[0] != key:
+                    if drawn is not None:
+                        regions.append(drawn[1])
+                    regions.append(rect)
+            
+            for region in regions:
+                screen.set_clip(region)
+                screen.blit(self.static, region, region)
+                self._draw_dynamic(screen, parts)
+                self.game.mark_dirty(region)
+            screen.set_clip(None)
+        
+        self._drawn = {name: (key, rect) for name, (key, rect, _) in parts.items()}
+    
+    def _draw_dynamic(self, screen: pygame.Surface, parts):
+        self.percent_bar(screen, *self.MON_BAR, self.mo["hp"], self.mo["max_hp"])
+        screen.blit(*parts["mon"][2])
         
-        hero = self.game.sprites[15]
-        screen.blit(hero, (12, 60))
+        self.percent_bar(screen, *self.HERO_BAR, self.mc.hp, self.hero_max_hp)
+        screen.blit(*parts["hero"][2])
         
-        ym = 140
-        for msg, color in self.messages[-10:]:
-            status = self.game._get_font(16).render(msg, True, color)
-            screen.blit(status, (20, ym))
-            ym += 20
+        screen.blit(self.messages.surface(), self.messages.rect)
         
         if self.state == "player":
             if self.submenu is None:
@@ -359,7 +452,7 @@ class BattleState(IState):
                 options = [(self.menu_items[0], 0, 0), (self.menu_items[1], 150, 0), (self.menu_items[2], 0, 40), (self.menu_items[3], 150, 40)]
                 
                 for label, dx, dy in options:
-                    text = self.game._get_font(16).render(label, True, WHITE)
+                    text = self.game.render_text(label, 16, WHITE)
                     screen.blit(text, (menu_x + dx, menu_y + dy))
                 
                 ptr_pos = {
@@ -371,33 +464,11 @@ class BattleState(IState):
                 
                 pygame.draw.polygon(screen, BLUE, [(ptr_pos[0], ptr_pos[1]), (ptr_pos[0]+8, ptr_pos[1]+6), (ptr_pos[0], ptr_pos[1]+12)])
             
-            if self.submenu == "cast":
+            if self.submenu in ("cast", "item"):
                 rect = pygame.Rect(200, 200, 240, 200)
                 pygame.draw.rect(screen, BLACK, rect)
-                entries = self.available_spells()
-                for i, e in enumerate(entries):
-                    if e == 0:
-                        summon = SUMMONS[self.mc.equip.get("ring") % 300]
-                        label = f"{summon['name']:<14} (MP{summon['mp_cost']:02})"
-                    else:
-                        spell = SPELLS[e]
-                        label = f"{spell["name"]:<14} (MP{spell['mp_cost']:02})"
-                    text = self.game._get_font(14).render(label, True, WHITE)
-                    screen.blit(text, (rect.x + 18, rect.y + 5 + i * 28))
-                
-                cx = rect.x + 2
-                cy = rect.y + 8 + self.sub_index*28
-                pygame.draw.polygon(screen, BLUE, [(cx,cy), (cx + 8, cy + 6), (cx, cy + 12)])
-            
-            if self.submenu == "item":
-                rect = pygame.Rect(200, 200, 240, 200)
-                pygame.draw.rect(screen, BLACK, rect)
-                entries = self.available_items()
-                for i, e in enumerate(entries):
-                    item = ITEMS.get(e)["name"]
-                    qty = self.mc.inventory.get(e, 0)
-                    
-                    text = self.game._get_font(14).render(f"{item:<14}  x{qty:02}", True, WHITE)
+                for i, label in enumerate(parts["menu"][0][4]):
+                    text = self.game.render_text(label, 14, WHITE)
                     screen.blit(text, (rect.x + 18, rect.y + 5 + i * 28))
                 
                 cx = rect.x + 2
@@ -6,15 +6,22 @@ from typing import Optional, List
 import pygame
 from .game_constants import WIDTH, HEIGHT, HELP_TEXT
 from .game_class import IState
+from .game_ui import TextDocument
+
+SCROLL_SPEED = 14
 
 class HelpState(IState):
     def __init__(self, game: "Game", return_to: Optional[IState] = None):
         self.game = game
         self.return_to = return_to
-        self.lines: List[str] = []
-        self.scroll = 0
         self.margin = 16
         self.line_height = 20
+        self.doc = TextDocument(game, WIDTH - self.margin*2, size=18, color=(220, 220, 220), line_height=self.line_height,
+                                wrap=lambda text, size, width: self.wrap_text(text, width, size=size))
+        
+        # pixel offsets: scroll is where we are heading, view is what is on screen
+        self.scroll = 0
+        self.view = 0.0
     
     def enter(self):
         text = ""
@@ -23,11 +30,12 @@ class HelpState(IState):
         if not text:
             text = "Help not found."
         
-        self.lines = self.wrap_text(text, WIDTH - self.margin*2, size=18)
+        self.doc.set_text(text)
         self.scroll = 0
+        self.view = 0.0
     
     def wrap_text(self, text: str, max_width: int, *, size: int) -> List[str]:
-        font = self.game._get_font(size)
+        space_w = self.game.text.measure(" ", size)
         wrapped: List[str] = []
         for paragraph in text.splitlines():
             if paragraph.strip() == "":
@@ -35,13 +43,17 @@ class HelpState(IState):
                 continue
             words = paragraph.split(" ")
             line = ""
+            line_w = 0
             for w in words:
-                test = w if line == "" else line + " " + w
-                if font.size(test)[0] <= max_width:
-                    line = test
+                w_w = self.game.text.measure(w, size)
+                test_w = w_w if line == "" else line_w + space_w + w_w
+                if test_w <= max_width:
+                    line = w if line == "" else line + " " + w
+                    line_w = test_w
                 else:
                     wrapped.append(line)
                     line = w
+                    line_w = w_w
             if line:
                 wrapped.append(line)
         return wrapped
@@ -52,29 +64,31 @@ class HelpState(IState):
         if event.key in (pygame.K_ESCAPE, pygame.K_BACKSPACE):
             self.game.change_state(self.return_to)
         if event.key in (pygame.K_UP, pygame.K_w):
-            self.scroll = max(0, self.scroll - 1)
+            self.scroll = max(0, self.scroll - self.line_height)
         if event.key in (pygame.K_DOWN, pygame.K_s):
-            self.scroll = min(max(0, len(self.lines) - 1), self.scroll + 1)
+            self.scroll = min(self.doc.max_scroll(), self.scroll + self.line_height)
         if event.key in (pygame.K_PAGEUP,):
-            self.scroll = max(0, self.scroll - 10)
+            self.scroll = max(0, self.scroll - 10 * self.line_height)
         if event.key in (pygame.K_PAGEDOWN,):
-            self.scroll = min(max(0, len(self.lines) - 1), self.scroll + 10)
+            self.scroll = min(self.doc.max_scroll(), self.scroll + 10 * self.line_height)
 
     def update(self, delta_time: float):
-        pass
+        step = (self.scroll - self.view) * min(1.0, delta_time * SCROLL_SPEED)
+        self.view += step
+        if abs(self.scroll - self.view) < 1:
+            self.view = self.scroll
+
+    def is_idle(self) -> bool:
+        return self.view == self.scroll
 
     def render(self, screen: pygame.Surface):
         screen.fill((18, 20, 24))
         self.game.draw_text_center("HELP", WIDTH//2, 20, size=22, color=(220,220,240))
         y = 44
-        font = self.game._get_font(18)
         visible_h = HEIGHT - y - 24
         max_lines = visible_h // self.line_height
-        start = self.scroll
-        end = min(len(self.lines), start + max_lines)
-        for i in range(start, end):
-            line = self.lines[i]
-            surf = font.render(line, True, (220, 220, 220))
-            screen.blit(surf, (self.margin, y + (i-start)*self.line_height))
-        info = f"{start+1}-{end} / {len(self.lines)} • ↑/↓/w/s/PgUp/PgDn — scroll • BS/Esc — back"
+        self.doc.draw(screen, (self.margin, y), int(self.view), max_lines * self.line_height)
+        start = self.scroll // self.line_height
+        end = min(len(self.doc.lines), start + max_lines)
+        info = f"{start+1}-{end} / {len(self.doc.lines)} • ↑/↓/w/s/PgUp/PgDn — scroll • BS/Esc — back"
         self.game.draw_text_center(info, WIDTH//2, HEIGHT - 12, size=14, color=(170,170,180))
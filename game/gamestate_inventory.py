@@ -8,6 +8,7 @@ import pygame
 from .game_constants import WIDTH, HEIGHT, ITEMS, MAX_ITEMS_COUNT, SPELLS
 from .game_bonus import give_bonus
 from .game_class import IState
+from .game_ui import WidgetLayer
 
 PAGE_SIZE = 14
 ALLOWED_CHARS = set(string.ascii_letters + " '")
@@ -22,6 +23,8 @@ def is_ring(iid: int) -> bool:
     return 301 <= iid <= 399
 
 class InventoryState(IState):
+    partial_render = True
+    
     def _get_count(self, iid: int) -> int:
         return int((self.game.player.inventory or {}).get(iid, 0))
     
@@ -35,6 +38,7 @@ class InventoryState(IState):
     def __init__(self, game: "Game", return_to: Optional[IState] = None):
         self.game = game
         self.return_to = return_to
+        self.ui = WidgetLayer(game)
         self.menu_items = ["Stats", "Spells", "Inventory", "Equipment", "Change Name", "Enter Bonus Code", "Back"]
         self.slots = ["Sword", "Armor", "Ring"]
     
@@ -375,23 +379,11 @@ class InventoryState(IState):
             self.scroll = self.index - (PAGE_SIZE - 1)
         self.scroll = max(0, min(self.scroll, max(0, len(self.entries) - PAGE_SIZE)))
     
-    def _draw_text_center_underline(self, screen: pygame.Surface, text: str, x: int, y: int, *, size: int = 18, color=(220,220,220), underline: bool = False):
-        font = self.game._get_font(size)
-        surf = font.render(text, True, color)
-        rect = surf.get_rect(center=(x, y))
-        screen.blit(surf, rect)
-        if underline:
-            uy = rect.bottom + 2
-            pygame.draw.line(screen, (80,150,255), (rect.left, uy), (rect.right, uy), 2)
-    
-    def _draw_panel(self, screen: pygame.Surface, rect: pygame.Rect, title: str):
-        bg = pygame.Surface(rect.size, pygame.SRCALPHA)
-        bg.fill((0,0,0,160))
-        screen.blit(bg, rect)
-        self.game.draw_text_center(title, rect.centerx, rect.top + 14, size=18, color=(255,240,220))
+    def is_idle(self) -> bool:
+        return True
     
-    def _draw_modal(self, screen):
-        self.game.draw_text_center(self.confirm_text, WIDTH//2, HEIGHT//2 - 18, size=20, color=(255,230,210))
+    def _draw_modal(self):
+        self.ui.label("confirm", self.confirm_text, (WIDTH//2, HEIGHT//2 - 18), size=20, color=(255,230,210))
         
         if self.buttons and len(self.buttons) > 1:
             iid, _ = self.entries[self.index]
@@ -402,57 +394,36 @@ class InventoryState(IState):
                 max_mp = getattr(p, 'get_hero_max_mp', lambda: 0)()
                 mp = f"{getattr(p, 'mp', 0):04}/{max_mp:04}"
                 
-                self.game.draw_text_center(f"HP: {hp}", WIDTH - 90, HEIGHT - 78, size=12, color=(170,170,180))
-                self.game.draw_text_center(f"MP: {mp}", WIDTH - 90, HEIGHT - 60, size=12, color=(170,170,180))
-        
-        if self.buttons and len(self.buttons) > 1:
-            # otherwise draw buttons + hint as before
-            btn_font = self.game._get_font(16)
-            spacing = 20
-            sizes = [btn_font.size(lbl) for lbl in self.buttons]
-            total_w = sum(w for (w, h) in sizes) + spacing*(len(self.buttons)-1)
-            start_x = (WIDTH - total_w) // 2
-            baseline_y = HEIGHT//2 + 18
-            
-            for i, lbl in enumerate(self.buttons):
-                w, h = sizes[i]
-                surf = btn_font.render(lbl, True, (255, 255, 255))
-                pos = (start_x, baseline_y - h)
-                screen.blit(surf, pos)
-                
-                if i == self.button_i:
-                    underline_y = baseline_y - 2
-                    pygame.draw.line(screen, (0, 128, 255), (start_x, underline_y), (start_x + w, underline_y), 2)
-                
-                start_x += w + spacing
+                self.ui.label("hp", f"HP: {hp}", (WIDTH - 90, HEIGHT - 78), size=12, color=(170,170,180))
+                self.ui.label("mp", f"MP: {mp}", (WIDTH - 90, HEIGHT - 60), size=12, color=(170,170,180))
         
         if self.buttons and len(self.buttons) > 1:
-            self.game.draw_text_center("←/→/a/d - move • Enter/Space - select • Esc/Backspace - cancel", WIDTH//2, HEIGHT - 18, size=14, color=(170,170,180))
+            self.ui.buttons("buttons", self.buttons, self.button_i, WIDTH//2, HEIGHT//2 + 18)
+            self.ui.hint("hint", "←/→/a/d - move • Enter/Space - select • Esc/Backspace - cancel", HEIGHT - 18)
         else:
-            self.game.draw_text_center("Enter/Space - Yes • Esc/Backspace - No", WIDTH//2, HEIGHT//2 + 18, size=16, color=(180,180,190))
-            self.game.draw_text_center(self.description_text, WIDTH//2, HEIGHT - 18, size=14, color=(170,170,180))
+            self.ui.label("confirm_hint", "Enter/Space - Yes • Esc/Backspace - No", (WIDTH//2, HEIGHT//2 + 18), size=16, color=(180,180,190))
+            self.ui.hint("hint", self.description_text, HEIGHT - 18)
     
     def render(self, screen: pygame.Surface):
-        screen.fill((24,20,28))
-        
+        self.ui.begin((24,20,28))
+        self._compose()
+        self.ui.render(screen)
+    
+    def _compose(self):
         if self.mode == "root":
             rect = pygame.Rect(24, 24, WIDTH-48, HEIGHT-58)
-            self._draw_panel(screen, rect, f"- {self.game.player.name} -")
+            self.ui.panel(rect, f"- {self.game.player.name} -")
             
             y0 = rect.top + 42
-            for i, label in enumerate(self.menu_items):
-                y = y0 + i*28
-                color = (255,220,120) if i == self.index else (200,200,210)
-                mark = "•" if i == self.index else ""
-                self.game.draw_text_center(f"{mark} {label} {mark}", rect.centerx, y, size=18, color=color)
+            self.ui.list_view("list", self.menu_items, self.index, (rect.centerx, y0), row_height=28, size=18, color=(200,200,210), selected_color=(255,220,120), marker=True)
             
             hint = "↑/↓/w/s - move • Enter/Space - select • Esc/Backspace - back"
-            self.game.draw_text_center(hint, WIDTH//2, HEIGHT - 18, size=14, color=(170,170,180))
+            self.ui.hint("hint", hint, HEIGHT - 18)
             return
         
         if self.mode == "stats":
             rect = pygame.Rect(24, 24, WIDTH-48, HEIGHT-58)
-            self._draw_panel(screen, rect, "Stats")
+            self.ui.panel(rect, "Stats")
             
             p = self.game.player
             max_hp = getattr(p, 'get_hero_max_hp', lambda: 0)()
@@ -473,135 +444,114 @@ class InventoryState(IState):
             ]
             
             y0 = rect.top + 42
-            for i, label in enumerate(lines):
-                y = y0 + i*24
-                color = (200,200,210)
-                self.game.draw_text_center(f"{label}", rect.centerx, y, size=18, color=color)
+            self.ui.list_view("list", lines, -1, (rect.centerx, y0), row_height=24, size=18, color=(200,200,210))
             
             hint = "Esc/Backspace - back"
-            self.game.draw_text_center(hint, WIDTH//2, HEIGHT - 18, size=14, color=(170,170,180))
+            self.ui.hint("hint", hint, HEIGHT - 18)
             return
         
         if self.mode == "spells":
             rect = pygame.Rect(24, 24, WIDTH-48, HEIGHT-58)
-            self._draw_panel(screen, rect, "Spells")
+            self.ui.panel(rect, "Spells")
             
             spls = self.game.player.spells
             
-            y0 = rect.top + 42
-            for i, sid in enumerate(spls):
-                y = y0 + i*24
-                color = (200,200,210)
+            lines = []
+            for sid in spls:
                 sp_name = SPELLS.get(sid).get("name")
                 sp_cost = SPELLS.get(sid).get("mp_cost")
                 sp_power = SPELLS.get(sid).get("power")
-                self.game.draw_text_center(f"{sp_name:<15} MP {sp_cost:02} PWR {sp_power:02}", rect.centerx, y, size=18, color=color)
+                lines.append(f"{sp_name:<15} MP {sp_cost:02} PWR {sp_power:02}")
+            
+            y0 = rect.top + 42
+            self.ui.list_view("list", lines, -1, (rect.centerx, y0), row_height=24, size=18, color=(200,200,210))
             
             if len(spls) == 0:
-                self.game.draw_text_center(f"(no known spells)", WIDTH//2, HEIGHT//2 - 9, size=18, color=(210,210,220))
+                self.ui.label("empty", f"(no known spells)", (WIDTH//2, HEIGHT//2 - 9), size=18, color=(210,210,220))
             
             hint = "Esc/Backspace - back"
-            self.game.draw_text_center(hint, WIDTH//2, HEIGHT - 18, size=14, color=(170,170,180))
+            self.ui.hint("hint", hint, HEIGHT - 18)
             return
         
         if (self.mode == "inventory" or self.mode == "equip" and self.sel_slot) and not self.selected:
             rect = pygame.Rect(24, 24, WIDTH-48, HEIGHT-85)
-            self._draw_panel(screen, rect, self.mode.capitalize())
+            self.ui.panel(rect, self.mode.capitalize())
             
             y0 = rect.top + 40
             if len(self.entries) > 0:
                 rows = self.entries[self.scroll:self.scroll+PAGE_SIZE]
-                for i, (iid, _) in enumerate(rows):
-                    idx = self.scroll + i
-                    sel = (idx == self.index)
-                    y = y0 + i*24
-                    
+                lines = []
+                for iid, _ in rows:
                     name = self._get_item_name(iid) if iid > 0 else "(unequip)"
                     have = int(self.game.player.inventory.get(iid, 0) or 0)
                     have = f" x{have:02}" if iid > 0 else '    '
-                    line = f"{name:<30}{have}"
-                    self._draw_text_center_underline(screen, line, rect.centerx, y, size=16, color=(255,220,120) if sel else (210,210,220), underline=sel)
+                    lines.append(f"{name:<30}{have}")
+                self.ui.list_view("list", lines, self.index - self.scroll, (rect.centerx, y0), row_height=24, size=16, color=(210,210,220), underline=(80,150,255))
                 
                 sel_item_id = self.entries[self.index][0]
                 sel_item_id = sel_item_id if sel_item_id > 0 else sel_item_id * -1
                 desc = self._get_item_info(sel_item_id)
-                self.game.draw_text_center(f"{desc[0]} • {desc[1]}", WIDTH//2, HEIGHT - 50, size=14,  color=(170,170,180))
+                self.ui.hint("desc", f"{desc[0]} • {desc[1]}", HEIGHT - 50)
                 
                 hintb = f"Item - {self.index+1:02}/{len(self.entries):02} • "
                 hintb += "↑/↓/←/→/w/s/a/d - move"
-                self.game.draw_text_center(hintb, WIDTH//2, HEIGHT - 31, size=14, color=(170,170,180))
+                self.ui.hint("controls", hintb, HEIGHT - 31)
             else:
-                self._draw_text_center_underline(screen, '(No items)', rect.centerx, HEIGHT//2 - 16, size=16, color=(210,210,220), underline=False)
+                self.ui.label("empty", '(No items)', (rect.centerx, HEIGHT//2 - 16), size=16, color=(210,210,220))
             
             select_text = "Enter/Space - select • " if len(self.entries) > 0 else ""
-            self.game.draw_text_center(f"{select_text}Esc/Backspace - back", WIDTH//2, HEIGHT - 12, size=14, color=(170,170,180))
+            self.ui.hint("hint", f"{select_text}Esc/Backspace - back", HEIGHT - 12)
             return
         
         if self.mode == "equip" and not self.sel_slot:
             rect = pygame.Rect(24, 24, WIDTH-48, HEIGHT-68)
-            self._draw_panel(screen, rect, self.mode.capitalize())
+            self.ui.panel(rect, self.mode.capitalize())
             
             y0 = rect.top + 40
-            for idx, slot_name in enumerate(self.slots):
-                sel = (idx == self.slot)
-                y = y0 + idx*24
-                
+            lines = []
+            for slot_name in self.slots:
                 slot_contain = self.game.player.equip[slot_name.lower()]
                 item_name = "(empty)" if slot_contain == 0 else self._get_item_name(slot_contain)
-                line = f"{slot_name:<5}: {item_name:<28}"
-                self._draw_text_center_underline(screen, line, rect.centerx, y, size=16, color=(255,220,120) if sel else (210,210,220), underline=sel)
+                lines.append(f"{slot_name:<5}: {item_name:<28}")
+            self.ui.list_view("list", lines, self.slot, (rect.centerx, y0), row_height=24, size=16, color=(210,210,220), underline=(80,150,255))
             
             equip_slot_s = self.slots[self.slot]
             eid = self.game.player.equip[equip_slot_s.lower()]
             equip_desc = self._get_item_info(eid) if eid > 0 else (equip_slot_s, "Empty Slot")
-            self.game.draw_text_center(f"{equip_desc[0]} • {equip_desc[1]}", WIDTH//2, HEIGHT - 31, size=14, color=(170,170,180))
-            self.game.draw_text_center("↑/↓/w/s - move • Enter/Space - select • Esc/Backspace - back", WIDTH//2, HEIGHT - 12, size=14, color=(170,170,180))
+            self.ui.hint("controls", f"{equip_desc[0]} • {equip_desc[1]}", HEIGHT - 31)
+            self.ui.hint("hint", "↑/↓/w/s - move • Enter/Space - select • Esc/Backspace - back", HEIGHT - 12)
         
         if self.selected:
-            screen.fill((24,20,28))
             rect = pygame.Rect(24, 24, WIDTH-48, HEIGHT-58)
-            self._draw_panel(screen, rect, "Action")
-            self._draw_modal(screen)
+            self.ui.panel(rect, "Action")
+            self._draw_modal()
         
         if self.mode == "change_name":
             rect = pygame.Rect(24, 24, WIDTH-48, HEIGHT-58)
-            self._draw_panel(screen, rect, "Change Name")
+            self.ui.panel(rect, "Change Name")
             
             # Draw input box
-            font = self.game._get_font(20)
-            txt_surface = font.render(self.input_text, True, (255, 255, 255))
-            
             box_rect = pygame.Rect(WIDTH//2 - 100, HEIGHT//2 - 20, 200, 40)
-            pygame.draw.rect(screen, (50, 50, 70), box_rect)
-            pygame.draw.rect(screen, (200, 200, 240), box_rect, 2)
-            screen.blit(txt_surface, (box_rect.x + 5, box_rect.y + 5))
+            self.ui.input_box("input", self.input_text, box_rect)
             
-            self.game.draw_text_center("Only A–Z, a–z, apostrophe, and space allowed", WIDTH//2, HEIGHT//2 + 40, size=14, color=(200,170,170))
-            self.game.draw_text_center("Type new name • Enter = confirm • Esc = cancel", WIDTH//2, HEIGHT - 18, size=14, color=(170,170,180))
+            self.ui.hint("note", "Only A–Z, a–z, apostrophe, and space allowed", HEIGHT//2 + 40, color=(200,170,170))
+            self.ui.hint("hint", "Type new name • Enter = confirm • Esc = cancel", HEIGHT - 18)
             return
         
         if self.mode == "bonus_code":
             rect = pygame.Rect(24, 24, WIDTH-48, HEIGHT-58)
-            self._draw_panel(screen, rect, "Enter Bonus Code")
+            self.ui.panel(rect, "Enter Bonus Code")
             
             # Input box
-            font = self.game._get_font(20)
-            
             # Pad with minus for missing digits
             display_text = self.input_text.ljust(5, "-")
             
-            txt_surface = font.render(display_text, True, (255, 255, 255))
-            
-            box_rect = pygame.Rect(WIDTH//2 - 100, HEIGHT//2 - 20, 200, 40)
-            pygame.draw.rect(screen, (50, 50, 70), box_rect)
-            pygame.draw.rect(screen, (200, 200, 240), box_rect, 2)
-            
             # Center inside the box
-            txt_rect = txt_surface.get_rect(center=box_rect.center)
-            screen.blit(txt_surface, txt_rect)
+            box_rect = pygame.Rect(WIDTH//2 - 100, HEIGHT//2 - 20, 200, 40)
+            self.ui.input_box("input", display_text, box_rect, centered=True)
             
             # Note + controls
-            self.game.draw_text_center("Enter a 5-digit code (0–9 only).", WIDTH//2, HEIGHT//2 + 40, size=14, color=(200,170,170))
-            self.game.draw_text_center("Only one code can be redeemed per save.", WIDTH//2, HEIGHT//2 + 58, size=14, color=(200,170,170))
-            self.game.draw_text_center("Type code • Enter = confirm • Esc = cancel", WIDTH//2, HEIGHT - 18, size=14, color=(170,170,180))
+            self.ui.hint("note", "Enter a 5-digit code (0–9 only).", HEIGHT//2 + 40, color=(200,170,170))
+            self.ui.hint("note2", "Only one code can be redeemed per save.", HEIGHT//2 + 58, color=(200,170,170))
+            self.ui.hint("hint", "Type code • Enter = confirm • Esc = cancel", HEIGHT - 18)
             return
@@ -1,17 +1,28 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import re
 import os
-import sys
 import json
-import copy
 import pygame
+from collections import OrderedDict
 
 from .game_class import IState, Player
-from .game_constants import FPS, WIDTH, HEIGHT, TILE_SIZE, SCALE, ITEMS, SPELLS, ENEMIES, MAX_ITEMS_COUNT
+from .game_constants import FPS, WIDTH, HEIGHT, TILE_SIZE, SCALE, MAP_CHUNK_SIZE, MAP_CHUNK_BUDGET, RENDER_CHUNK_BUDGET, ITEMS, SPELLS, ENEMIES, MAX_ITEMS_COUNT
 from .game_bonus import code_select
+from .game_grid import OverlayGrid
+from .game_nav import Navigator
+from .game_script import ScriptRunner
+from .game_spatial import EventIndex
+from .game_ui import TextDocument
 TILE_SIZE_SCALED = TILE_SIZE * SCALE
+CHUNK_SIZE_SCALED = MAP_CHUNK_SIZE * TILE_SIZE_SCALED
+
+DIALOGUE_LAYOUT_CACHE = 32
+
+MOVE_KEYS = (
+    pygame.K_UP, pygame.K_w, pygame.K_LEFT, pygame.K_a,
+    pygame.K_RIGHT, pygame.K_d, pygame.K_DOWN, pygame.K_s,
+)
 
 ranges = [
     range(34, 38), # gold
@@ -27,41 +38,224 @@ ranges = [
 def in_ranges(n: int) -> bool:
     return any(n in r for r in ranges)
 
+# event type -> EventIndex kind; treasure goes by id through in_ranges instead
+EVENT_KINDS = {
+    "battle": "battle", "boss": "battle",
+    "door": "door",
+    "change_map": "warp",
+    "dialogue_box": "npc", "one_time_dialogue_box": "npc", "queen": "npc", "princess": "npc", "script": "npc",
+    "shop": "npc", "inn": "npc", "tavern": "npc",
+}
+
+class DialogueModal:
+    # a dialogue drawn over the map while the game loop keeps running; result is set once it is answered
+    def __init__(self, owner: "MapState", layout, buttons):
+        self.owner = owner
+        self.layout = layout
+        self.buttons = buttons
+        self.focused = 0
+        self.result = None
+        # the map and panel do not change while it is open: composed once, then only the choice band is redrawn
+        self.frame = None
+        self.band = layout["underline_band"]
+        self.band_dirty = False
+    
+    def draw(self, screen: pygame.Surface):
+        self.owner._draw_dialogue_overlay(screen, self.layout)
+    
+    def draw_focus(self, screen: pygame.Surface):
+        self.owner._draw_dialogue_underline(screen, self.layout, self.focused)
+    
+    def handle_key(self, key):
+        single_button = len(self.buttons) < 2
+        if not single_button:
+            prev = self.focused
+            if key in (pygame.K_LEFT, pygame.K_a):
+                self.focused = (self.focused - 1) % len(self.buttons)
+            elif key in (pygame.K_RIGHT, pygame.K_d):
+                self.focused = (self.focused + 1) % len(self.buttons)
+            self.band_dirty = self.focused != prev
+        
+        if single_button and key in (pygame.K_ESCAPE, pygame.K_BACKSPACE):
+            self.result = True
+        if key in (pygame.K_SPACE, pygame.K_RETURN):
+            self.result = True if single_button else self.buttons[self.focused]
+
+class EndScreenModal:
+    def __init__(self, owner: "MapState"):
+        self.owner = owner
+        self.result = None
+        self.frame = None
+        self.band_dirty = False
+    
+    def draw(self, screen: pygame.Surface):
+        screen.fill((0,0,0))
+        self.owner.draw_end_center_text(screen)
+        self.owner.end_draw_hint(screen)
+    
+    def draw_focus(self, screen: pygame.Surface):
+        pass
+    
+    def handle_key(self, key):
+        if key in (pygame.K_SPACE, pygame.K_RETURN):
+            self.result = True
+
 class GameMap:
     def __init__(self, game: "Game"):
         self.game = game
-        self.maps = dict(game.maps)
+        # compiled maps decode on lookup, so only maps that are visited get built
+        self.maps = game.maps
+        
+        # pre-baked tile+object layers, one surface per MAP_CHUNK_SIZE x MAP_CHUNK_SIZE cells,
+        # built when first seen and kept for the RENDER_CHUNK_BUDGET most recently drawn
+        self.chunks = OrderedDict()
+        self.dirty_chunks = set()
+        self.changed_cells = []
+        
+        # one bit per cell packed in an int per chunk, terrain rules only; the Shadow's Cloak is applied at query time
+        self.walk_chunks = OrderedDict()
+        self.walk_version = 0
+        self.nav = Navigator(self)
+        self.event_index = EventIndex(0, 0, self.event_kind)
     
     def load_map(self):
         self.name = self.game.player.map_name
-        self.w, self.h, self.grid = copy.deepcopy(self.maps[self.name])
+        # the decoded base grid is shared by every visit; temporary edits stay in the overlay
+        w, h, grid = self.maps[self.name]
+        self.w, self.h, self.grid = w, h, OverlayGrid(grid)
+        self.overrides = self.game.map_overrides.for_map(self.name)
+        self.reset_walkability()
+        self.event_index = EventIndex(w, h, self.event_kind)
+        self.event_index.build(self.event_cells())
+        
+        # nothing is drawn up front: the first frame builds what the camera sees
+        self.chunks = OrderedDict()
+        self.dirty_chunks = set()
+        self.changed_cells = []
+    
+    def chunks_w(self):
+        return (self.w + MAP_CHUNK_SIZE - 1) // MAP_CHUNK_SIZE
+    
+    def chunks_h(self):
+        return (self.h + MAP_CHUNK_SIZE - 1) // MAP_CHUNK_SIZE
+    
+    def build_chunk(self, cx, cy):
+        x0 = cx * MAP_CHUNK_SIZE
+        y0 = cy * MAP_CHUNK_SIZE
+        x1 = min(self.w, x0 + MAP_CHUNK_SIZE)
+        y1 = min(self.h, y0 + MAP_CHUNK_SIZE)
+        
+        chunk = pygame.Surface(((x1 - x0) * TILE_SIZE_SCALED, (y1 - y0) * TILE_SIZE_SCALED)).convert()
+        chunk.fill((0,0,0))
+        
+        for gx, gy, tile_idx, obj_idx, _ in self.grid.rect(x0, y0, x1, y1):
+            sx = (gx - x0) * TILE_SIZE_SCALED
+            sy = (gy - y0) * TILE_SIZE_SCALED
+            
+            cell = self.overrides.get(gy * self.w + gx)
+            if cell is not None:
+                tile_idx, obj_idx, _ = cell
+            
+            if 0 <= tile_idx < len(self.game.tiles) and self.game.tiles[tile_idx]:
+                chunk.blit(self.game.tiles[tile_idx], (sx, sy))
+            
+            if obj_idx and 0 < obj_idx <= len(self.game.objects):
+                chunk.blit(self.game.objects[obj_idx-1], (sx, sy))
+        
+        return chunk
+    
+    def get_chunk(self, cx, cy):
+        key = (cx, cy)
+        chunk = self.chunks.get(key)
+        if chunk is None or key in self.dirty_chunks:
+            chunk = self.chunks[key] = self.build_chunk(cx, cy)
+            self.dirty_chunks.discard(key)
+            while len(self.chunks) > RENDER_CHUNK_BUDGET:
+                self.chunks.popitem(last=False)
+        self.chunks.move_to_end(key)
+        return chunk
+    
+    def visible_chunks(self, cam_x, cam_y):
+        start_cx = max(0, cam_x // CHUNK_SIZE_SCALED)
+        start_cy = max(0, cam_y // CHUNK_SIZE_SCALED)
+        
+        end_cx = min(self.chunks_w(), (cam_x + WIDTH) // CHUNK_SIZE_SCALED + 1)
+        end_cy = min(self.chunks_h(), (cam_y + HEIGHT) // CHUNK_SIZE_SCALED + 1)
+        return start_cx, start_cy, end_cx, end_cy
+    
+    def prefetch(self, cam_x, cam_y, dx, dy):
+        # bake the band of chunks the camera is heading into, one chunk past the visible edge
+        start_cx, start_cy, end_cx, end_cy = self.visible_chunks(cam_x, cam_y)
+        if dx:
+            cx = end_cx if dx > 0 else start_cx - 1
+            band = [(cx, cy) for cy in range(start_cy, end_cy)]
+        else:
+            cy = end_cy if dy > 0 else start_cy - 1
+            band = [(cx, cy) for cx in range(start_cx, end_cx)]
+        
+        for cx, cy in band:
+            if 0 <= cx < self.chunks_w() and 0 <= cy < self.chunks_h():
+                if (cx, cy) not in self.chunks:
+                    self.get_chunk(cx, cy)
+                self.walk_mask(cx, cy)
+    
+    def invalidate_cell(self, x, y):
+        key = (x // MAP_CHUNK_SIZE, y // MAP_CHUNK_SIZE)
+        if key in self.chunks:
+            self.dirty_chunks.add(key)
+        self.changed_cells.append((x, y))
+        cell = self.cell_components(x, y)
+        if key in self.walk_chunks:
+            bit = 1 << ((y % MAP_CHUNK_SIZE) * MAP_CHUNK_SIZE + x % MAP_CHUNK_SIZE)
+            if self.cell_walkable(*cell):
+                self.walk_chunks[key] |= bit
+            else:
+                self.walk_chunks[key] &= ~bit
+        self.walk_version += 1
+        self.event_index.update(x, y, cell[2])
+        self.game.world.cell_changed(self.name, x, y)
+    
+    def take_changed_cells(self):
+        cells = self.changed_cells
+        self.changed_cells = []
+        return cells
     
     def cell_components(self, x, y):
-        map_values = self.grid[x][y]
-        if f'{self.name},{x:02},{y:02}' in self.game.map_flags:
-            map_values = tuple(map(int, self.game.map_flags[f'{self.name},{x:02},{y:02}'].split(":")))
-        return map_values
+        cell = self.overrides.get(y * self.w + x)
+        return self.grid[x, y] if cell is None else cell
+    
+    def event_cells(self):
+        # (x, y, event id) with saved overrides applied
+        for x, y, ev_id in self.grid.cells_with_event():
+            if y * self.w + x not in self.overrides:
+                yield x, y, ev_id
+        for i, (_, _, ev_id) in self.overrides.items():
+            if ev_id:
+                yield i % self.w, i // self.w, ev_id
+    
+    def event_kind(self, ev_id):
+        if in_ranges(ev_id):
+            return "treasure"
+        ev = self.game.events.get(ev_id)
+        return EVENT_KINDS.get(ev.kind) if ev else None
     
     def set_override(self, x, y, tile_idx, obj_idx, ev_id):
-        self.game.map_flags[f'{self.name},{x:02},{y:02}'] = f"{tile_idx:02}:{obj_idx:02}:{ev_id:03}"
+        self.game.map_overrides.set(self.name, y * self.w + x, (tile_idx, obj_idx, ev_id))
+        self.invalidate_cell(x, y)
     
     def set_event_id(self, x, y, ev_id):
-        tile_idx, obj_idx, _ = self.grid[x][y]
-        self.game.map_flags[f'{self.name},{x:02},{y:02}'] = f"{tile_idx:02}:{obj_idx:02}:{ev_id:03}"
+        tile_idx, obj_idx, _ = self.grid[x, y]
+        self.game.map_overrides.set(self.name, y * self.w + x, (tile_idx, obj_idx, ev_id))
+        self.invalidate_cell(x, y)
     
     def set_event_id_temp(self, x, y, ev_id):
-        tile_idx, obj_idx, _ = self.grid[x][y]
-        self.grid[x][y] = tile_idx, obj_idx, ev_id
+        tile_idx, obj_idx, _ = self.grid[x, y]
+        self.grid[x, y] = tile_idx, obj_idx, ev_id
+        self.invalidate_cell(x, y)
     
-    def is_walkable(self, x, y):
-        if x < 0 or y < 0 or x >= self.w or y >= self.h:
-            return False
-        
-        tile_idx, obj_idx, ev_id = self.cell_components(x, y)
-        ev_type = self.game.events.get(ev_id)[0] if ev_id > 0 else None
-        
-        if self.game.player.has_item(12) > 0:
-            return True
+    def cell_walkable(self, tile_idx, obj_idx, ev_id):
+        ev = self.game.events.get(ev_id) if ev_id > 0 else None
+        ev_type = ev.kind if ev else None
         
         if ev_type in ('change_map', 'unwalkable', 'door'):
             return False
@@ -74,7 +268,78 @@ class GameMap:
         else:
             return (obj_idx <= 1) or (obj_idx == 44)
     
+    def reset_walkability(self):
+        self.walk_chunks = OrderedDict()
+        self.walk_version += 1
+    
+    def walk_mask(self, cx, cy):
+        # bit (y % MAP_CHUNK_SIZE) * MAP_CHUNK_SIZE + x % MAP_CHUNK_SIZE is set when the cell can be walked on
+        key = (cx, cy)
+        mask = self.walk_chunks.get(key)
+        if mask is not None:
+            self.walk_chunks.move_to_end(key)
+            return mask
+        
+        x0, y0 = cx * MAP_CHUNK_SIZE, cy * MAP_CHUNK_SIZE
+        x1, y1 = min(self.w, x0 + MAP_CHUNK_SIZE), min(self.h, y0 + MAP_CHUNK_SIZE)
+        mask = 0
+        for x, y, tile_idx, obj_idx, ev_id in self.grid.rect(x0, y0, x1, y1):
+            cell = self.overrides.get(y * self.w + x)
+            if cell is not None:
+                tile_idx, obj_idx, ev_id = cell
+            if self.cell_walkable(tile_idx, obj_idx, ev_id):
+                mask |= 1 << ((y - y0) * MAP_CHUNK_SIZE + x - x0)
+        
+        self.walk_chunks[key] = mask
+        # masks are rebuilt from the grid when needed again, so dropping them loses nothing
+        while len(self.walk_chunks) > MAP_CHUNK_BUDGET:
+            self.walk_chunks.popitem(last=False)
+        return mask
+    
+    def is_walkable(self, x, y):
+        if x < 0 or y < 0 or x >= self.w or y >= self.h:
+            return False
+        
+        # Shadow's Cloak
+        if self.game.player.has_item(12) > 0:
+            return True
+        
+        mask = self.walk_mask(x // MAP_CHUNK_SIZE, y // MAP_CHUNK_SIZE)
+        return mask >> ((y % MAP_CHUNK_SIZE) * MAP_CHUNK_SIZE + x % MAP_CHUNK_SIZE) & 1 == 1
+    
+    def walkable_cells(self, cells):
+        # bulk form of is_walkable for bots and path searches: one bool per (x, y)
+        if self.game.player.has_item(12) > 0:
+            return [0 <= x < self.w and 0 <= y < self.h for x, y in cells]
+        w, h, c = self.w, self.h, MAP_CHUNK_SIZE
+        return [0 <= x < w and 0 <= y < h and self.walk_mask(x // c, y // c) >> ((y % c) * c + x % c) & 1 == 1 for x, y in cells]
+    
+    def walkable_window(self, x0, y0, x1, y1) -> bytes:
+        # one byte per cell of [x0, x1) x [y0, y1), row-major, for path searches
+        c = MAP_CHUNK_SIZE
+        out = bytearray((x1 - x0) * (y1 - y0))
+        i = 0
+        for y in range(y0, y1):
+            for x in range(x0, x1):
+                out[i] = self.walk_mask(x // c, y // c) >> ((y % c) * c + x % c) & 1
+                i += 1
+        return bytes(out)
+    
+    def walkable_mask(self) -> bytes:
+        # one byte per cell, row-major, for whole-map consumers
+        return self.walkable_window(0, 0, self.w, self.h)
+    
     def draw(self, surface, cam_x, cam_y):
+        start_cx, start_cy, end_cx, end_cy = self.visible_chunks(cam_x, cam_y)
+        
+        for cx in range(start_cx, end_cx):
+            for cy in range(start_cy, end_cy):
+                surface.blit(self.get_chunk(cx, cy), (cx * CHUNK_SIZE_SCALED - cam_x, cy * CHUNK_SIZE_SCALED - cam_y))
+        
+        if self.game.player.has_item(11) > 0:
+            self.draw_radar(surface, cam_x, cam_y)
+    
+    def draw_radar(self, surface, cam_x, cam_y):
         cols_visible = WIDTH // TILE_SIZE_SCALED + 2
         rows_visible = HEIGHT // TILE_SIZE_SCALED + 2
         
@@ -84,82 +349,107 @@ class GameMap:
         end_x = min(self.w, start_x + cols_visible)
         end_y = min(self.h, start_y + rows_visible)
         
-        for gx in range(start_x, end_x):
-            for gy in range(start_y, end_y):
-                sx = gx * TILE_SIZE_SCALED - cam_x
-                sy = gy * TILE_SIZE_SCALED - cam_y
-                
-                tile_idx, obj_idx, ev_id = self.cell_components(gx, gy)
-                
-                if 0 <= tile_idx < len(self.game.tiles) and self.game.tiles[tile_idx]:
-                    scaled_tile = self.game.tiles[tile_idx]
-                    surface.blit(scaled_tile, (sx, sy))
-                
-                if obj_idx and 0 < obj_idx <= len(self.game.objects):
-                    scaled_obj = self.game.objects[obj_idx-1]
-                    surface.blit(scaled_obj, (sx, sy))
-                
-                if self.game.player.has_item(11) > 0 and ev_id > 0 and in_ranges(ev_id):
-                    surface.fill((255, 0, 0), (sx, sy, 4 * SCALE, 4 * SCALE))
+        for gx, gy, _ in self.event_index.rect("treasure", start_x, start_y, end_x, end_y):
+            sx = gx * TILE_SIZE_SCALED - cam_x
+            sy = gy * TILE_SIZE_SCALED - cam_y
+            surface.fill((255, 0, 0), (sx, sy, 4 * SCALE, 4 * SCALE))
 
 class MapState(IState):
+    partial_render = True
+    
     def __init__(self, game: "Game"):
         self.game = game
         self.game.cur_map = GameMap(self.game)
         
         self.cam_x = 0
         self.cam_y = 0
+        
+        # what the last presented frame showed, to work out dirty regions
+        self._last_cam = None
+        self._last_player = None
+        self._last_hud = None
+        
+        # (text, title, buttons) -> pre-rendered dialogue text block
+        self._dialogue_layouts = {}
+        
+        # cell the player is auto-walking to after a click
+        self.walk_target = None
+        
+        # event flow in progress: a generator the frame loop steps once per update, waiting on modals and timers
+        self.flow = None
+        self.modal = None
+        self.script = None
+        
+        # event kind -> handler(ev, x, y, tile_idx, obj_idx); kinds without one do nothing when bumped into
+        self.event_handlers = {
+            "walkable_button":       self.on_button,
+            "walkable_dialogue_box": self.on_walkable_dialogue,
+            "change_map":            self.on_warp,
+            "door":                  self.on_script,
+            "sign":                  self.on_dialogue,
+            "dialogue_box":          self.on_dialogue,
+            "one_time_dialogue_box": self.on_dialogue,
+            "battle":                self.on_battle,
+            "boss":                  self.on_script,
+            "tavern":                self.on_tavern,
+            "queen":                 self.on_script,
+            "princess":              self.on_script,
+            "script":                self.on_script,
+            "shop":                  self.on_shop,
+            "gold":                  self.on_gold,
+            "item":                  self.on_item,
+            "inn":                   self.on_inn,
+            "end_screen":            self.on_end_screen,
+        }
     
     def enter(self):
         self.repeat_delay = FPS/1000 * 3
         self.move_cooldown = 0
-        self.active_event = False
         self.gossip_id = 0
+        self.walk_target = None
         
         if self.game.load_map_flag:
             self.game.cur_map.load_map()
             self.game.load_map_flag = False
+            self.flow = None
+            self.modal = None
+            self.script = None
         
         if self.game.states["battle"].mon_id > 0:
-            self.active_event = True
-            
             mon_id = self.game.states["battle"].mon_id
-            mon = ENEMIES.get(mon_id)
-            
             x, y, won_flag = self.game.states["battle"].result
             self.game.states["battle"].mon_id = -1
             self.game.states["battle"].result = None
             
-            if won_flag:
-                tile_idx, obj_idx, ev_id = self.game.cur_map.cell_components(x, y)
-                etype, data = self.game.events.get(ev_id)
-                
-                if etype in("battle",):
-                    self.game.player.add_exp(mon["exp"])
-                    self.game.player.add_gold(mon["gold"])
-                    prize_text = self.game.events.get(132)[1]
-                    if mon_id == 14:
-                        self.game.player.mult_str += 2
-                        prize_text = self.game.events.get(133)[1]
-                
-                    self.dialogue(prize_text.format(name=mon["name"], exp=mon["exp"], gold=mon["gold"]))
-                    
-                    if obj_idx in (11, 41): # tile enemies
-                        self.game.cur_map.set_override(x, y, tile_idx, 0, 0)
-                    else:
-                        self.game.cur_map.set_event_id_temp(x, y, 0)
-                
-                if etype in("boss",):
-                    king_talk_data = self.game.events.get(138)[1].split('@')
-                    king_name = king_talk_data[0]
-                    king_talk = self.game.assets.load_text(king_talk_data[1])
-                    self.dialogue(king_talk, title = king_name)
-                    
-                    self.game.cur_map.set_override(6, 3, 8, 0, 0)
-                    self.game.cur_map.set_override(6, 4, 8, 44, 139)
+            if self.script is not None:
+                # the battle was started by a script, which carries on from the battle op
+                self.script.battle_over(won_flag)
+            else:
+                self.start_flow(self.after_battle(mon_id, x, y, won_flag))
+    
+    def after_battle(self, mon_id, x, y, won_flag):
+        mon = ENEMIES.get(mon_id)
+        
+        if won_flag:
+            tile_idx, obj_idx, ev_id = self.game.cur_map.cell_components(x, y)
+            etype = self.game.events[ev_id].kind
             
-            self.game_delay()
-            self.active_event = False
+            if etype in("battle",):
+                self.game.player.add_exp(mon["exp"])
+                self.game.player.add_gold(mon["gold"])
+                prize_text = self.game.events[132].text
+                if mon_id == 14:
+                    self.game.player.mult_str += 2
+                    prize_text = self.game.events[133].text
+            
+                yield from self.dialogue(prize_text.format(name=mon["name"], exp=mon["exp"], gold=mon["gold"]))
+                
+                if obj_idx in (11, 41): # tile enemies
+                    self.game.cur_map.set_override(x, y, tile_idx, 0, 0)
+                else:
+                    self.game.cur_map.set_event_id_temp(x, y, 0)
+        
+        self.game_delay()
     
     def snap_camera_to_player(self):
         player_px = self.game.player.x * TILE_SIZE_SCALED
@@ -182,9 +472,27 @@ class MapState(IState):
             self.cam_y = self.clamp(target_cy, 0, map_h_px - HEIGHT)
     
     def handle_event(self, event: pygame.event.Event):
+        if self.modal is not None:
+            if event.type == pygame.KEYDOWN:
+                self.modal.handle_key(event.key)
+                if self.modal.result is not None:
+                    self.modal = None
+                    self.game.redraw_all()
+            return
+        
+        if self.flow is not None:
+            return
+        
+        if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+            self.walk_to((event.pos[0] + self.cam_x) // TILE_SIZE_SCALED, (event.pos[1] + self.cam_y) // TILE_SIZE_SCALED)
+            return
+        
         if event.type != pygame.KEYDOWN:
             return
         
+        # any key takes control back from auto-walk
+        self.walk_target = None
+        
         if event.key == pygame.K_i:
             self.game.change_state(self.game.states["inventory"])
             return
@@ -194,6 +502,10 @@ class MapState(IState):
             self.game.change_state(self.game.states["menu"])
             return
         
+        if event.key == pygame.K_g:
+            self.guide()
+            return
+        
         if event.key == pygame.K_c:
             char_stats = (
                 f" Level: {self.game.player.get_hero_level()} \n"
@@ -237,14 +549,19 @@ class MapState(IState):
             if self.game.player.bonus_code != 0:
                 char_stats += f" Bonus Code: {self.game.player.bonus_code}"
             
-            c_selected = self.dialogue(char_stats, title = self.game.player.name, buttons = ())
+            self.start_flow(self.dialogue(char_stats, title = self.game.player.name, buttons = ()))
             return
     
     def update(self, delta_time: float):
         self.move_cooldown -= delta_time
         keys = pygame.key.get_pressed()
         
-        if self.active_event:
+        if self.flow is not None:
+            self.step_flow()
+            return
+        
+        # held keys wait out the pause after an event, like key presses do
+        if self.game.scheduler.input_locked:
             return
         
         moved = False
@@ -255,6 +572,13 @@ class MapState(IState):
         move_R = keys[pygame.K_RIGHT] or keys[pygame.K_d]
         move_D = keys[pygame.K_DOWN]  or keys[pygame.K_s]
         
+        if self.walk_target is not None:
+            if move_U or move_L or move_R or move_D:
+                self.walk_target = None
+            elif self.move_cooldown <= 0:
+                self.auto_walk_step()
+            return
+        
         if self.move_cooldown <= 0:
             if move_U and self.game.player.facing != 0:
                 self.game.player.facing = 0
@@ -284,21 +608,104 @@ class MapState(IState):
                 dy = 1
             
             if dx != 0 or dy != 0:
-                try_walk = self.game.player.x + dx, self.game.player.y + dy
-                is_walkable = self.game.cur_map.is_walkable(try_walk[0], try_walk[1])
-                
-                if is_walkable:
-                    self.game.player.move(try_walk[0], try_walk[1])
-                    self.move_cooldown = self.repeat_delay
-                
-                self.active_event = True
-                self.trigger_event(try_walk[0], try_walk[1])
-                self.active_event = False
+                self.step(dx, dy)
+    
+    def step(self, dx, dy):
+        try_walk = self.game.player.x + dx, self.game.player.y + dy
+        is_walkable = self.game.cur_map.is_walkable(try_walk[0], try_walk[1])
+        
+        if is_walkable:
+            self.game.player.move(try_walk[0], try_walk[1])
+            self.move_cooldown = self.repeat_delay
+            self.game.cur_map.prefetch(self.cam_x, self.cam_y, dx, dy)
+        
+        self.trigger_event(try_walk[0], try_walk[1])
+    
+    def walk_to(self, x, y):
+        cur_map = self.game.cur_map
+        if not (0 <= x < cur_map.w and 0 <= y < cur_map.h) or (x, y) == (self.game.player.x, self.game.player.y):
+            return False
+        if cur_map.nav.distance(self.game.player.x, self.game.player.y, x, y) is None:
+            self.game.toast("No way there.")
+            return False
+        self.walk_target = (cur_map.name, x, y)
+        return True
+    
+    def guide(self):
+        # walk to the next warp on the shortest way to the map of the final battle,
+        # or to the closest map with a locked door while the doors still shut that way
+        world = self.game.world
+        player = self.game.player
+        goals = world.maps_with("boss")
+        if not goals:
+            return
+        
+        route = world.route(player.map_name, goals[0], player.x, player.y)
+        if route is None:
+            routes = [world.route(player.map_name, name, player.x, player.y) for name in world.maps_with("door")]
+            route = min((r for r in routes if r is not None), key=len, default=None)
+            if not route:
+                self.game.toast("Something bars the way on." if route is None else "A locked door bars the way.")
+                return
+        elif not route:
+            self.game.toast("The way ends on this map.")
+            return
+        
+        _, x, y, dest, _, _ = route[0]
+        if self.walk_to(x, y):
+            self.game.toast(f"Heading for {dest}.")
+    
+    def auto_walk_step(self):
+        cur_map = self.game.cur_map
+        name, tx, ty = self.walk_target
+        step = None
+        if name == cur_map.name:
+            step = cur_map.nav.next_step(self.game.player.x, self.game.player.y, tx, ty)
+        if step is None:
+            self.walk_target = None
+            return
+        
+        dx, dy, facing = step
+        if self.game.player.facing != facing:
+            # turning costs a beat, same as with the keys
+            self.game.player.facing = facing
+            self.move_cooldown = self.repeat_delay
+            return
+        
+        if (self.game.player.x + dx, self.game.player.y + dy) == (tx, ty):
+            self.walk_target = None
+        self.step(dx, dy)
+    
+    def is_idle(self) -> bool:
+        if self.modal is not None:
+            return True
+        if self.flow is not None or self.walk_target is not None:
+            return False
+        keys = pygame.key.get_pressed()
+        return not any(keys[k] for k in MOVE_KEYS)
     
     def game_delay(self):
-        pygame.time.delay(int(self.repeat_delay * 1000))
+        # short pause after an event so a held key does not walk straight on or trigger it again
+        self.game.scheduler.lock_input(self.repeat_delay)
+    
+    def start_flow(self, flow):
+        # runs the flow up to its first wait; update() carries it on from there, one step a frame
+        self.flow = flow
+        self.step_flow()
+    
+    def step_flow(self):
+        flow = self.flow
+        try:
+            next(flow)
+        except StopIteration:
+            if self.flow is flow:
+                self.flow = None
     
     def trigger_event(self, x, y):
+        self.start_flow(self.event_flow(x, y))
+    
+    def event_flow(self, x, y):
+        # handlers that wait on the player are generators; the rest finish in the call
         if x < 0 or y < 0:
             return
         if x >= self.game.cur_map.w or y >= self.game.cur_map.h:
@@ -310,235 +717,168 @@ class MapState(IState):
             return
         
         ev = self.game.events.get(ev_id)
-        if not ev:
-            return
+        handler = self.event_handlers.get(ev.kind) if ev else None
+        if handler is not None:
+            flow = handler(ev, x, y, tile_idx, obj_idx)
+            if flow is not None:
+                yield from flow
+    
+    def on_button(self, ev, x, y, tile_idx, obj_idx):
+        self.game.cur_map.set_override(x + ev.dx, y + ev.dy, *ev.cell)
+        self.game.cur_map.set_event_id(x, y, 97)
+    
+    def on_walkable_dialogue(self, ev, x, y, tile_idx, obj_idx):
+        yield from self.dialogue(ev.text)
+        self.game.cur_map.set_event_id(x, y, 97)
         
-        etype, data = ev
+        self.game_delay()
+    
+    def on_warp(self, ev, x, y, tile_idx, obj_idx):
+        self.game.player.map_name = ev.map_name
+        self.game.player.x = ev.x
+        self.game.player.y = ev.y
+        self.game.player.facing = ev.facing
+        self.game.cur_map.load_map()
         
-        if etype in ("walkable",):
-            return
+        self.game_delay()
+    
+    def on_dialogue(self, ev, x, y, tile_idx, obj_idx):
+        yield from self.dialogue(ev.text)
         
-        if etype in ("walkable_button",):
-            data = data.split("@")
-            map_pos_x, map_pos_y = list(map(int, data[0].split(",")))
-            map_new_data = [int(p.strip()) for p in data[1].split(":")]
-            
-            self.game.cur_map.set_override(x + map_pos_x, y + map_pos_y, map_new_data[0], map_new_data[1], map_new_data[2])
-            self.game.cur_map.set_event_id(x, y, 97)
-            
-            return
+        if ev.kind == "one_time_dialogue_box":
+            self.game.cur_map.set_event_id(x, y, 0)
         
-        if etype in ("walkable_dialogue_box",):
-            self.dialogue(data)
-            self.game.cur_map.set_event_id(x, y, 97)
-            
-            self.game_delay()
-            return
+        self.game_delay()
+    
+    def on_battle(self, ev, x, y, tile_idx, obj_idx):
+        mon = ENEMIES[ev.mon_id]
         
-        if etype in ("change_map",):
-            parts = [p.strip() for p in data.split(",")]
-            map_name, sx, sy, dir_code = parts[0], int(parts[1]), int(parts[2]), int(parts[3])
-            
-            self.game.player.map_name = map_name
-            self.game.player.x = sx
-            self.game.player.y = sy
-            self.game.player.facing = dir_code
-            self.game.cur_map.load_map()
-            
-            self.game_delay()
+        if self.game.player.hp == 0:
+            self.game.toast("I need to rest...")
             return
         
-        if etype in ("door",):
-            if self.game.player.has_item(10) > 0:
-                ask_open_door = self.game.events.get(111)[1]
-                do_open_door = self.dialogue(ask_open_door, buttons=("Yes", "No"))
-                if do_open_door == "Yes":
-                    self.game.cur_map.set_event_id(x, y, 0)
-                    self.game.player.consume_item(10)
-            else:
-                no_keys_text = self.game.events.get(110)[1]
-                self.dialogue(no_keys_text)
-            
-            self.game_delay()
-            return
+        battle_text = self.game.events[131].text
+        do_battle = yield from self.dialogue(battle_text.format(name=mon["name"], hp=mon["hp"]), buttons=("Yes", "No"))
         
-        if etype in ("sign", "dialogue_box", "one_time_dialogue_box",):
-            self.dialogue(data)
-            
-            if etype in ("one_time_dialogue_box",):
-                self.game.cur_map.set_event_id(x, y, 0)
-            
-            self.game_delay()
+        if do_battle == "Yes":
+            self.start_battle(ev.mon_id, x, y)
             return
         
-        if etype in ("battle","boss"):
-            mon_id = int(data)
-            mon = ENEMIES.get(mon_id)
-            
-            if mon == None:
-                return
-            
-            if self.game.player.hp == 0:
-                self.game.toast("I need to rest...")
-                return
-            
-            battle_text = self.game.events.get(131)[1]
-            do_battle = self.dialogue(battle_text.format(name=mon["name"], hp=mon["hp"]), buttons=("Yes", "No"))
-            
-            if do_battle == "Yes":
-                if etype == "boss":
-                    king_talk_data = self.game.events.get(137)[1].split('@')
-                    king_name = king_talk_data[0]
-                    king_talk = self.game.assets.load_text(king_talk_data[1])
-                    self.dialogue(king_talk, title = king_name)
-                
-                self.game.states["battle"].mon_id = mon_id
-                self.game.states["battle"].result = [x, y]
-                
-                self.game.change_state(self.game.states["battle"])
-                return
-            
-            self.game_delay()
-            return
+        self.game_delay()
+    
+    def start_battle(self, mon_id, x, y):
+        self.game.states["battle"].mon_id = mon_id
+        self.game.states["battle"].result = [x, y]
         
-        if etype in ("tavern",):
-            ask_gossips_text = self.game.events.get(114)[1]
-            ask_gossips = self.dialogue(ask_gossips_text, buttons=("Yes", "No"))
-            
-            if ask_gossips == "Yes":
-                self.gossip_id = 0 if self.gossip_id > 7 else self.gossip_id
-                gossips_text = self.game.events.get(120 + self.gossip_id)[1]
-                self.dialogue(gossips_text)
-                self.gossip_id += 1
-            
-            self.game_delay()
+        self.game.change_state(self.game.states["battle"])
+    
+    def on_script(self, ev, x, y, tile_idx, obj_idx):
+        # queen, princess, door and boss are the scripts of the same name in scripts.txt
+        name = ev.name if ev.kind == "script" else ev.kind
+        script = self.game.scripts.get(name)
+        if script is None:
             return
         
-        if etype in ("queen",):
-            sad_queen = self.game.events.get(112)[1]
-            do_talk = self.dialogue(sad_queen, buttons=("Yes", "No"))
-            
-            if do_talk == "Yes":
-                queen_talk_data = self.game.events.get(134)[1].split('@')
-                queen_name = queen_talk_data[0]
-                queen_talk = self.game.assets.load_text(queen_talk_data[1])
-                self.dialogue(queen_talk, title = queen_name)
-                
-                accept_quest_text = self.game.events.get(115)[1]
-                accept_quest = self.dialogue(accept_quest_text, buttons=("Yes", "No"))
-                if accept_quest == "Yes":
-                    self.game.player.add_item(10)
-                    self.game.cur_map.set_event_id(x, y, 81)
-                    self.trigger_event(x, y)
-                    return
-            
-            self.game_delay()
-            return
+        runner = self.script = ScriptRunner(script, self, x, y, getattr(ev, "mon_id", None))
+        while not runner.resume():
+            yield
+        self.script = None
         
-        if etype in ("princess",):
-            ask_release_text = self.game.events.get(113)[1]
-            ask_release = self.dialogue(ask_release_text, buttons=("Yes", "No"))
-            
-            if ask_release == "Yes":
-                princess_talk_data = self.game.events.get(135)[1].split('@')
-                princess_name = princess_talk_data[0]
-                princess_talk = self.game.assets.load_text(princess_talk_data[1])
-                self.dialogue(princess_talk, title = princess_name)
-                self.game.cur_map.set_override(x, y, 22, 0, 96)
-            
-            self.game_delay()
-            return
+        if runner.trigger:
+            yield from self.event_flow(x, y)
+    
+    def on_tavern(self, ev, x, y, tile_idx, obj_idx):
+        ask_gossips_text = self.game.events[114].text
+        ask_gossips = yield from self.dialogue(ask_gossips_text, buttons=("Yes", "No"))
         
-        if etype in ("shop",):
-            shop_ask = self.game.events.get(109)[1]
-            do_shop = self.dialogue(shop_ask, buttons=("Yes", "No"))
-            
-            if do_shop == "Yes":
-                self.game.change_state(self.game.states["shop"])
-                return
-            
-            self.game_delay()
-            return
+        if ask_gossips == "Yes":
+            self.gossip_id = 0 if self.gossip_id > 7 else self.gossip_id
+            gossips_text = self.game.events[120 + self.gossip_id].text
+            yield from self.dialogue(gossips_text)
+            self.gossip_id += 1
         
-        if etype in ("gold",):
-            self.game.player.add_gold(int(data))
-            
-            gold_text = self.game.events.get(128)[1].format(gold=int(data))
-            self.dialogue(gold_text)
-            self.game.cur_map.set_event_id(x, y, 0)
-            
-            self.game_delay()
+        self.game_delay()
+    
+    def on_shop(self, ev, x, y, tile_idx, obj_idx):
+        shop_ask = self.game.events[109].text
+        do_shop = yield from self.dialogue(shop_ask, buttons=("Yes", "No"))
+        
+        if do_shop == "Yes":
+            self.game.change_state(self.game.states["shop"])
             return
         
-        if etype in ("item",):
-            item_id = int(data)
-            item = ITEMS.get(item_id)
+        self.game_delay()
+    
+    def on_gold(self, ev, x, y, tile_idx, obj_idx):
+        self.game.player.add_gold(ev.amount)
+        
+        gold_text = self.game.events[128].text.format(gold=ev.amount)
+        yield from self.dialogue(gold_text)
+        self.game.cur_map.set_event_id(x, y, 0)
+        
+        self.game_delay()
+    
+    def on_item(self, ev, x, y, tile_idx, obj_idx):
+        item_id = ev.item_id
+        item = ITEMS[item_id]
+        
+        if self.game.player.has_item(item_id) >= MAX_ITEMS_COUNT:
+            full_bag_text = self.game.events[129].text
+            yield from self.dialogue(full_bag_text.format(name=item["name"]))
+        else:
+            found_item_text = self.game.events[130].text
             
-            if item == None:
-                return
+            if tile_idx == 22 and obj_idx == 0: # itembox
+                self.game.cur_map.set_override(x, y, tile_idx+1, 0, 0)
+            else:
+                self.game.cur_map.set_event_id(x, y, 0)
             
-            if self.game.player.has_item(item_id) >= MAX_ITEMS_COUNT:
-                full_bag_text = self.game.events.get(129)[1]
-                self.dialogue(full_bag_text.format(name=item["name"]))
+            item_description = ""
+            if item["type"] == "special" and item_id != 10:
+                if item_id == 6:
+                    self.game.player.mult_str += 1
+                if item_id == 7:
+                    self.game.player.mult_str += 2
+                if item_id == 8:
+                    self.game.player.mult_hp += 1
+                if item_id == 9:
+                    self.game.player.mult_mp += 1
+                item_description = item["description"]
             else:
-                found_item_text = self.game.events.get(130)[1]
-                
-                if tile_idx == 22 and obj_idx == 0: # itembox
-                    self.game.cur_map.set_override(x, y, tile_idx+1, 0, 0)
-                else:
-                    self.game.cur_map.set_event_id(x, y, 0)
-                
-                item_description = ""
-                if item["type"] == "special" and item_id != 10:
-                    if item_id == 6:
-                        self.game.player.mult_str += 1
-                    if item_id == 7:
-                        self.game.player.mult_str += 2
-                    if item_id == 8:
-                        self.game.player.mult_hp += 1
-                    if item_id == 9:
-                        self.game.player.mult_mp += 1
-                    item_description = item["description"]
-                else:
-                     self.game.player.add_item(item_id)
-                
-                self.dialogue(found_item_text.format(name=item["name"], description=item_description))
+                 self.game.player.add_item(item_id)
             
-            self.game_delay()
-            return
+            yield from self.dialogue(found_item_text.format(name=item["name"], description=item_description))
         
-        if etype in ("inn",):
-            rest_ask = self.game.events.get(108)[1]
-            do_rest = self.dialogue(rest_ask, buttons=("Yes", "No"))
-            
-            if do_rest == "Yes" and self.game.player.gold >= 100:
-                self.game.player.gold -= 100
-                self.game.player.hp = self.game.player.get_hero_max_hp()
-                self.game.player.mp = self.game.player.get_hero_max_mp()
-                
-                new_x, new_y = list(map(int, data.split(",")))
-                new_x = self.game.player.x + new_x
-                new_y = self.game.player.y + new_y
-                
-                if self.game.cur_map.is_walkable(new_x, new_y):
-                    self.game.player.x = new_x
-                    self.game.player.y = new_y
+        self.game_delay()
+    
+    def on_inn(self, ev, x, y, tile_idx, obj_idx):
+        rest_ask = self.game.events[108].text
+        do_rest = yield from self.dialogue(rest_ask, buttons=("Yes", "No"))
+        
+        if do_rest == "Yes" and self.game.player.gold >= 100:
+            self.game.player.gold -= 100
+            self.game.player.hp = self.game.player.get_hero_max_hp()
+            self.game.player.mp = self.game.player.get_hero_max_mp()
             
-            elif do_rest == "Yes":
-                rest_gold = self.game.events.get(136)[1]
-                self.dialogue(rest_gold)
+            new_x = self.game.player.x + ev.dx
+            new_y = self.game.player.y + ev.dy
             
-            self.game_delay()
-            return
+            if self.game.cur_map.is_walkable(new_x, new_y):
+                self.game.player.x = new_x
+                self.game.player.y = new_y
         
-        if etype in ("end_screen",):
-            self.render_end_screen()
-            self.game_delay()
-            return
+        elif do_rest == "Yes":
+            rest_gold = self.game.events[136].text
+            yield from self.dialogue(rest_gold)
+        
+        self.game_delay()
+    
+    def on_end_screen(self, ev, x, y, tile_idx, obj_idx):
+        yield from self.show(EndScreenModal(self))
+        self.game.states["menu"].return_to = None
+        self.game.change_state(self.game.states["menu"])
         
-        self.game.toast("Not Ready Yet")
         self.game_delay()
-        return
     
     def clamp(self, v, lo, hi):
         return max(lo, min(v, hi))
@@ -552,7 +892,7 @@ class MapState(IState):
             str(code_select(self.game.player.score)),
         ]
         
-        rendered_lines = [self.game._get_font(32).render(line, True, (255,255,255)) for line in lines]
+        rendered_lines = [self.game.render_text(line, 32, (255,255,255)) for line in lines]
         total_height = sum(r.get_height() for r in rendered_lines) + (len(lines)-1) * 5
     
         start_y = (surface.get_height() - total_height) // 2
@@ -562,164 +902,180 @@ class MapState(IState):
             start_y += r.get_height() + 5
     
     def end_draw_hint(self, surface):
-        text_surf = self.game._get_font(16).render("Enter/Space - back to main screen", True, (180, 180, 180))
+        text_surf = self.game.render_text("Enter/Space - back to main screen", 16, (180, 180, 180))
         rect = text_surf.get_rect(midbottom=(surface.get_width()//2, surface.get_height() - 16))
         surface.blit(text_surf, rect)
     
-    def render_end_screen(self):
-        clock = pygame.time.Clock()
-        screen = pygame.display.get_surface()
-        
-        while True:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    pygame.quit(); sys.exit()
-                if event.type == pygame.KEYDOWN:
-                    if event.key in (pygame.K_SPACE, pygame.K_RETURN):
-                        self.game.states["menu"].return_to = None
-                        self.game.change_state(self.game.states["menu"])
-                        return
-            
-            screen.fill((0,0,0))
-            self.draw_end_center_text(screen)
-            self.end_draw_hint(screen)
-            pygame.display.flip()
-            clock.tick(FPS)
+    def show(self, modal):
+        # flows wait on a modal with "result = yield from self.show(modal)"
+        self.modal = modal
+        self.game.redraw_all()
+        while modal.result is None:
+            yield
+        return modal.result
     
-    def dialogue(self, text: str, title="", buttons=("OK",)) -> str | bool:
-        clock = pygame.time.Clock()
-        screen = pygame.display.get_surface()
-        
-        focused = 0
+    def open_dialogue(self, text: str, title="", buttons=("OK",)) -> DialogueModal:
         single_button = len(buttons) < 2
-        
-        while True:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    pygame.quit(); sys.exit()
-                if event.type == pygame.KEYDOWN:
-                    if not single_button:
-                        if event.key in (pygame.K_LEFT, pygame.K_a):
-                            focused = (focused - 1) % len(buttons)
-                        elif event.key in (pygame.K_RIGHT, pygame.K_d):
-                            focused = (focused + 1) % len(buttons)
-                    
-                    if single_button and event.key in (pygame.K_ESCAPE, pygame.K_BACKSPACE):
-                        return True
-                    if event.key in (pygame.K_SPACE, pygame.K_RETURN):
-                        if single_button:
-                            return True
-                        else:
-                            return buttons[focused]
-            
-            self.render(screen)
-            if not single_button:
-                self._draw_dialogue_overlay(screen, text, buttons, focused, title)
-            else:
-                self._draw_dialogue_overlay(screen, text, (), -1, title)
-            pygame.display.flip()
-            clock.tick(FPS)
+        self.modal = DialogueModal(self, self._dialogue_layout(text, title, () if single_button else buttons), buttons)
+        self.game.redraw_all()
+        return self.modal
+    
+    def dialogue(self, text: str, title="", buttons=("OK",)):
+        # "answer = yield from self.dialogue(...)": the button label, or True for a single-button dialogue
+        modal = self.open_dialogue(text, title, buttons)
+        while modal.result is None:
+            yield
+        return modal.result
     
     def render(self, screen: pygame.Surface):
         self.snap_camera_to_player()
         
-        screen.fill((0,0,0))
-        self.game.cur_map.draw(screen, self.cam_x, self.cam_y)
-        self.game.player.draw(screen, self.cam_x, self.cam_y)
-        
-        box_surface = pygame.Surface((WIDTH, 16), pygame.SRCALPHA)
-        box_surface.fill((0, 0, 0, 128))
-        screen.blit(box_surface, (0, 0))
-        
-        keys = self.game.player.has_item(10)
+        player = self.game.player
+        player_rect = pygame.Rect(player.x * TILE_SIZE_SCALED - self.cam_x, player.y * TILE_SIZE_SCALED - self.cam_y, TILE_SIZE_SCALED, TILE_SIZE_SCALED)
+        player_key = (player_rect.topleft, player.facing)
         
         hud = (
-            f"HP {self.game.player.hp}/{self.game.player.get_hero_max_hp()} | "
-            f"MP {self.game.player.mp}/{self.game.player.get_hero_max_mp()} | "
-            f"Gold {self.game.player.gold} | Keys {keys}"
+            f"HP {player.hp}/{player.get_hero_max_hp()} | "
+            f"MP {player.mp}/{player.get_hero_max_mp()} | "
+            f"Gold {player.gold} | Keys {player.has_item(10)}"
         )
         
-        hud = self.game._get_font(10).render(hud, True, (255,255,255))
-        screen.blit(hud, (5, 0))
-    
-    def _wrap_text(self, text: str, font: pygame.font.Font, max_width: int):
-        text = text.replace("\\n", "\n")
+        if self.modal is not None and self.modal.frame is not None:
+            self.render_modal(screen)
+            return
         
-        lines = []
-        for paragraph in text.split("\n"):
-            tokens = re.findall(r'\S+|\s+', paragraph)
-            
-            cur = ""
-            for t in tokens:
-                test = cur + t
-                if not cur or font.size(test)[0] <= max_width:
-                    cur = test
-                else:
-                    lines.append(cur)
-                    cur = t.lstrip()
-            
-            if cur:
-                lines.append(cur)
+        cam = (self.cam_x, self.cam_y)
+        changed_cells = self.game.cur_map.take_changed_cells()
+        
+        if not self.game.dirty_rects_mode or self.game.full_redraw or cam != self._last_cam:
+            self.game.redraw_all()
+            self.draw_scene(screen, hud)
+        else:
+            rects = []
+            for x, y in changed_cells:
+                rects.append(pygame.Rect(x * TILE_SIZE_SCALED - self.cam_x, y * TILE_SIZE_SCALED - self.cam_y, TILE_SIZE_SCALED, TILE_SIZE_SCALED))
+            if player_key != self._last_player:
+                rects.append(player_rect)
+                if self._last_player is not None:
+                    rects.append(pygame.Rect(self._last_player[0], player_rect.size))
+            if hud != self._last_hud:
+                rects.append(pygame.Rect(0, 0, WIDTH, 16))
             
-            if paragraph == "":
-                lines.append("")
+            for rect in rects:
+                screen.set_clip(rect)
+                self.draw_scene(screen, hud)
+                self.game.mark_dirty(rect)
+            screen.set_clip(None)
         
-        return lines
+        if self.modal is not None:
+            # first frame of a modal: keep the composed scene and panel for the frames that follow
+            self.modal.draw(screen)
+            self.modal.frame = screen.copy()
+            self.modal.draw_focus(screen)
+            self.game.redraw_all()
+        
+        self._last_cam = cam
+        self._last_player = player_key
+        self._last_hud = hud
+    
+    def render_modal(self, screen: pygame.Surface):
+        modal = self.modal
+        if not self.game.dirty_rects_mode or self.game.full_redraw:
+            screen.blit(modal.frame, (0, 0))
+            modal.draw_focus(screen)
+            self.game.redraw_all()
+        elif modal.band_dirty:
+            screen.blit(modal.frame, modal.band, modal.band)
+            modal.draw_focus(screen)
+            self.game.mark_dirty(modal.band)
+        modal.band_dirty = False
     
-    def _draw_dialogue_overlay(self, screen: pygame.Surface, text: str, buttons, focused_idx: int, title: str = ""):
+    def draw_scene(self, screen: pygame.Surface, hud: str):
+        screen.fill((0,0,0))
+        self.game.cur_map.draw(screen, self.cam_x, self.cam_y)
+        self.game.player.draw(screen, self.cam_x, self.cam_y)
+        
+        self.game.overlays.blit(screen, (0, 0, WIDTH, 16), (0, 0, 0, 128))
+        
+        hud = self.game.render_text(hud, 10, (255,255,255))
+        screen.blit(hud, (5, 0))
+    
+    def _wrap_text(self, text: str, size: int, max_width: int):
+        return self.game.text.wrap(text.replace("\\n", "\n"), size, max_width)
+    
+    def _dialogue_layout(self, text: str, title: str, buttons):
+        key = (text, title, tuple(buttons))
+        layout = self._dialogue_layouts.get(key)
+        if layout is not None:
+            return layout
+        
         margin, pad = 8, 8
         box_h = HEIGHT // 1 if title else HEIGHT // 4
         box_y = HEIGHT - box_h
-        
-        # translucent dialogue panel
-        box = pygame.Surface((WIDTH - margin*2, box_h - margin*2), pygame.SRCALPHA)
-        box.fill((0, 0, 0, 220))
-        screen.blit(box, (margin, box_y + margin))
+        blits = []
         
         if title:
-            title_font = self.game._get_font(18)
-            title_surf = title_font.render(title, True, (255, 255, 255))
+            title_surf = self.game.render_text(title, 18, (255, 255, 255))
             title_x = (WIDTH - title_surf.get_width()) // 2
             title_y = box_y + margin + pad
-            screen.blit(title_surf, (title_x, title_y))
+            blits.append((title_surf, (title_x, title_y)))
             text_offset_y = title_surf.get_height() + 12
         else:
             text_offset_y = 0
         
-        # wrapped dialogue text
-        font = self.game._get_font(14)
+        # wrapped dialogue text, laid out as one document block
         max_w = WIDTH - margin*2 - pad*2
-        lines = self._wrap_text(text, font, max_w)
+        doc = TextDocument(self.game, max_w, size=14, color=(255, 255, 255), line_height=18, wrap=self._wrap_text)
+        doc.set_text(text)
         
-        for i, line in enumerate(lines[: (box_h - pad*2 - text_offset_y) // 18]):
-            surf = font.render(line, True, (255, 255, 255))
-            screen.blit(surf, (margin + pad, box_y + margin + pad + text_offset_y + i*18))
+        max_lines = (box_h - pad*2 - text_offset_y) // 18
+        view_h = max(0, max_lines - 1) * 18 + self.game._get_font(14).get_height()
+        view = pygame.Rect(0, 0, max_w, view_h).clip(doc.layout().get_rect())
+        blits.append((doc.layout(), (margin + pad, box_y + margin + pad + text_offset_y), view))
         
+        underlines = []
+        baseline_y = HEIGHT - 40
         if buttons and len(buttons) > 1:
-            # otherwise draw buttons + hint as before
-            btn_font = self.game._get_font(14)
             spacing = 20
-            sizes = [btn_font.size(lbl) for lbl in buttons]
+            sizes = [(self.game.text.measure(lbl, 14), self.game._get_font(14).get_height()) for lbl in buttons]
             total_w = sum(w for (w, h) in sizes) + spacing*(len(buttons)-1)
             start_x = (WIDTH - total_w) // 2
-            baseline_y = HEIGHT - 40
             
             for i, lbl in enumerate(buttons):
                 w, h = sizes[i]
-                surf = btn_font.render(lbl, True, (255, 255, 255))
-                pos = (start_x, baseline_y - h)
-                screen.blit(surf, pos)
-                
-                if i == focused_idx:
-                    underline_y = baseline_y - 2
-                    pygame.draw.line(screen, (0, 128, 255), (start_x, underline_y), (start_x + w, underline_y), 2)
-                
+                surf = self.game.render_text(lbl, 14, (255, 255, 255))
+                blits.append((surf, (start_x, baseline_y - h)))
+                underlines.append((start_x, start_x + w))
                 start_x += w + spacing
         
         # hint
-        hint_font = self.game._get_font(11)
         hint_text = "←/→/a/d — choose • Enter/Space — confirm" if buttons else "Enter/Backspace/Space/ESC — continue"
-        hint_surf = hint_font.render(hint_text, True, (180, 180, 180))
+        hint_surf = self.game.render_text(hint_text, 11, (180, 180, 180))
         hint_x = (WIDTH - hint_surf.get_width()) // 2
         hint_y = HEIGHT - 24
-        screen.blit(hint_surf, (hint_x, hint_y))
+        blits.append((hint_surf, (hint_x, hint_y)))
+        
+        layout = {
+            "box": pygame.Rect(margin, box_y + margin, WIDTH - margin*2, box_h - margin*2),
+            "blits": blits,
+            "underlines": underlines,
+            "underline_y": baseline_y - 2,
+            "underline_band": pygame.Rect(0, baseline_y - 4, WIDTH, 6),
+        }
+        
+        if len(self._dialogue_layouts) >= DIALOGUE_LAYOUT_CACHE:
+            self._dialogue_layouts.pop(next(iter(self._dialogue_layouts)))
+        self._dialogue_layouts[key] = layout
+        return layout
+    
+    def _draw_dialogue_overlay(self, screen: pygame.Surface, layout):
+        # translucent dialogue panel
+        self.game.overlays.blit(screen, layout["box"], (0, 0, 0, 220))
+        
+        screen.blits(layout["blits"], doreturn=False)
+    
+    def _draw_dialogue_underline(self, screen: pygame.Surface, layout, focused_idx: int):
+        if 0 <= focused_idx < len(layout["underlines"]):
+            x0, x1 = layout["underlines"][focused_idx]
+            y = layout["underline_y"]
+            pygame.draw.line(screen, (0, 128, 255), (x0, y), (x1, y), 2)
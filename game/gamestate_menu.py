@@ -7,16 +7,19 @@ import json
 import pygame
 from .game_constants import GAME_TITLE, WIDTH, HEIGHT
 from .game_class import IState
+from .game_grid import MapOverrides
+from .game_ui import WidgetLayer
 
 class MenuState(IState):
+    partial_render = True
+    
     def __init__(self, game: "Game", return_to: Optional[IState] = None):
         self.game = game
         self.return_to = return_to
         self.items: List[str] = []
         self.index = 0
         self.bg = (20, 22, 28)
-        self.panel = pygame.Surface((WIDTH - 40, HEIGHT - 50), pygame.SRCALPHA)
-        self.panel.fill((0, 0, 0, 160))
+        self.ui = WidgetLayer(game)
         self.title_logo: Optional[pygame.Surface] = None
     
     def get_prev_state(self):
@@ -59,7 +62,7 @@ class MenuState(IState):
             self.game.change_state(self.return_to)
         if item == "New Game":
             self.game.player.create()
-            self.game.map_flags = {}
+            self.game.map_overrides.clear()
             self.game.load_map_flag = True
             self.game.change_state(self.game.states["map"])
         if item == "Load Game":
@@ -95,7 +98,7 @@ class MenuState(IState):
             
             self.game.player.score      = int(save_data.get("score", self.game.player.score))
             self.game.player.bonus_code = int(save_data.get("bonus_code", self.game.player.bonus_code))
-            self.game.map_flags         = dict(sorted(save_data.get("map_flags", {}).items()))
+            self.game.map_overrides     = MapOverrides.from_legacy(save_data.get("map_flags", {}), self.game.maps)
             
             self.game.toast("Game loaded.")
             self.game.load_map_flag = True
@@ -126,7 +129,7 @@ class MenuState(IState):
                 
                 "score":       self.game.player.score,
                 "bonus_code":  self.game.player.bonus_code,
-                "map_flags":   dict(sorted(self.game.map_flags.items())),
+                "map_flags":   self.game.map_overrides.to_legacy(self.game.maps),
             }
             try:
                 with open(self.game.save_path, "w", encoding="utf-8") as f:
@@ -143,18 +146,18 @@ class MenuState(IState):
     def update(self, delta_time: float):
         pass
     
+    def is_idle(self) -> bool:
+        return True
+    
     def render(self, screen: pygame.Surface):
-        screen.fill(self.bg)
-        screen.blit(self.panel, (20, 30))
+        self.ui.begin(self.bg)
+        self.ui.panel(pygame.Rect(20, 30, WIDTH - 40, HEIGHT - 50))
         y = 50
         
         TITLE = GAME_TITLE if self.get_prev_state() == 'NoneType' else 'PAUSE'
-        self.game.draw_text_center(TITLE, WIDTH//2, y, size=28)
+        self.ui.label("title", TITLE, (WIDTH//2, y), size=28)
         y += 40
         
-        for i, item in enumerate(self.items):
-            sel = (i == self.index)
-            color = (255, 240, 200) if sel else (210, 210, 220)
-            marker = "•" if sel else ""
-            self.game.draw_text_center(f"{marker} {item} {marker}", WIDTH//2, y + 28*i, size=22, color=color)
-        self.game.draw_text_center("↑/↓/w/s — Navigate • Enter/Space — Select", WIDTH//2, HEIGHT - 12, size=14, color=(170,170,180))
+        self.ui.list_view("items", self.items, self.index, (WIDTH//2, y), row_height=28, size=22, color=(210, 210, 220), selected_color=(255, 240, 200), marker=True)
+        self.ui.hint("hint", "↑/↓/w/s — Navigate • Enter/Space — Select", HEIGHT - 12)
+        self.ui.render(screen)
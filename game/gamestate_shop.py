@@ -6,6 +6,7 @@ from typing import Optional, List, Tuple
 import pygame
 from .game_constants import WIDTH, HEIGHT, ITEMS, SPELLS, MAX_ITEMS_COUNT
 from .game_class import IState
+from .game_ui import WidgetLayer
 
 PAGE_SIZE = 14  # rows per page for shop lists
 
@@ -24,9 +25,12 @@ BUY_PAGES = [
 ]
 
 class ShopState(IState):
+    partial_render = True
+    
     def __init__(self, game: "Game", return_to: Optional[IState] = None):
         self.game = game
         self.return_to = return_to
+        self.ui = WidgetLayer(game)
         
         self.mode = "root"     # "root" | "buy" | "sell" | "confirm"
         self.menu_items: List[str] = ["Buy", "Sell", "Learn Spell", "Exit"]
@@ -247,27 +251,12 @@ class ShopState(IState):
             self.scroll = self.index - (PAGE_SIZE - 1)
         self.scroll = max(0, min(self.scroll, max(0, len(self.entries) - PAGE_SIZE)))
     
-    def _draw_text_center_underline(self, screen: pygame.Surface, text: str, x: int, y: int, *, size: int = 18, color=(220,220,220), underline: bool = False):
-        # Render text centered at (x, y). If underline, draw a blue underline below.
-        font = self.game._get_font(size)
-        surf = font.render(text, True, color)
-        rect = surf.get_rect(center=(x, y))
-        screen.blit(surf, rect)
-        if underline:
-            # Blue underline slightly below the text
-            uy = rect.bottom + 2
-            pygame.draw.line(screen, (80,150,255), (rect.left, uy), (rect.right, uy), 2)
-    
-    def _draw_panel(self, screen: pygame.Surface, rect: pygame.Rect, title: str):
-        bg = pygame.Surface(rect.size, pygame.SRCALPHA)
-        bg.fill((0,0,0,160))
-        screen.blit(bg, rect)
-        # title
-        self.game.draw_text_center(title, rect.centerx, rect.top + 14, size=18, color=(255,240,220))
+    def is_idle(self) -> bool:
+        return True
     
-    def _draw_money(self, screen: pygame.Surface):
+    def _draw_money(self):
         text = f"Gold: {self.game.player.gold:>9} G"
-        self.game.draw_text_center(text, WIDTH - 118, 20, size=18, color=(255,240,180))
+        self.ui.label("money", text, (WIDTH - 118, 20), size=18, color=(255,240,180))
     
     def _get_item_name(self, iid: int) -> str:
         return ITEMS.get(iid, {}).get("name", f"#{iid}")
@@ -289,26 +278,25 @@ class ShopState(IState):
         return (t or ""), (d or ""), mp, pwr
     
     def render(self, screen: pygame.Surface):
-        screen.fill((24,20,28))
-        
+        self.ui.begin((24,20,28))
+        self._compose()
+        self.ui.render(screen)
+    
+    def _compose(self):
         # header
-        self._draw_money(screen)
+        self._draw_money()
         
         if self.mode == "root":
             rect = pygame.Rect(24, 40, WIDTH-48, HEIGHT-70)
-            self._draw_panel(screen, rect, "Shop")
+            self.ui.panel(rect, "Shop")
             
             # menu list
             y0 = rect.top + 42
-            for i, label in enumerate(self.menu_items):
-                y = y0 + i*28
-                color = (255,220,120) if i == self.index else (200,200,210)
-                mark = "•" if i == self.index else ""
-                self.game.draw_text_center(f"{mark} {label} {mark}", rect.centerx, y, size=18, color=color)
+            self.ui.list_view("list", self.menu_items, self.index, (rect.centerx, y0), row_height=28, size=18, color=(200,200,210), selected_color=(255,220,120), marker=True)
             
             # hints
             hint = "↑/↓ - move • Enter/Space - select • Esc/Backspace - back"
-            self.game.draw_text_center(hint, WIDTH//2, HEIGHT - 18, size=14, color=(170,170,180))
+            self.ui.hint("hint", hint, HEIGHT - 18)
             return
         
         if self.mode in ("buy", "sell", "learn"):
@@ -318,27 +306,24 @@ class ShopState(IState):
                 title += f"  -{self.page_no+1}/{len(BUY_PAGES)}-  "
                 title += f"{BUY_PAGES[self.page_no][0]:>12}"
             rect = pygame.Rect(24, 40, WIDTH-48, HEIGHT-100)
-            self._draw_panel(screen, rect, title)
+            self.ui.panel(rect, title)
             
             # draw columns: Name | Price | Have
             y0 = rect.top + 40
             rows = self.entries[self.scroll:self.scroll+PAGE_SIZE]
-            for i, (iid, price) in enumerate(rows):
-                idx = self.scroll + i
-                sel = (idx == self.index)
-                y = y0 + i*24
-                
+            lines = []
+            for iid, price in rows:
                 name = self._get_spell_name(iid) if self.mode == "learn" else self._get_item_name(iid)
                 if self.mode == "learn":
                     mp = int(SPELLS.get(iid, {}).get("mp_cost", 0) or 0)
-                    line = f"{name:<25} {price:>4}G (MP{mp:02})"
+                    lines.append(f"{name:<25} {price:>4}G (MP{mp:02})")
                 else:
                     have = int(self.game.player.inventory.get(iid, 0) or 0)
-                    line = f"{name:<25} {price:>4}G ({have:02})"
-                self._draw_text_center_underline(screen, line, rect.centerx, y, size=16, color=(255,220,120) if sel else (210,210,220), underline=sel)
+                    lines.append(f"{name:<25} {price:>4}G ({have:02})")
+            self.ui.list_view("list", lines, self.index - self.scroll, (rect.centerx, y0), row_height=24, size=16, color=(210,210,220), underline=(80,150,255))
             
             if not rows:
-                self.game.draw_text_center("(No items)", rect.centerx, rect.centery, size=16, color=(200,200,210))
+                self.ui.label("empty", "(No items)", rect.center, size=16, color=(200,200,210))
             
             # bottom hint: show type + description of selected
             hint0 = ""
@@ -352,7 +337,7 @@ class ShopState(IState):
                     t, d = self._get_item_desc(sel_iid)
                     hint0 = f"{t.capitalize()} • {d}"
             if hint0:
-                self.game.draw_text_center(hint0, WIDTH//2, HEIGHT - 50, size=14, color=(170,170,180))
+                self.ui.hint("desc", hint0, HEIGHT - 50)
             
             # control hints
             if self.mode == "buy":
@@ -362,10 +347,10 @@ class ShopState(IState):
                 hint1 += "↑/↓/←/→/w/s/a/d - move"
             if self.mode == "learn":
                 hint1 = "↑/↓ - move"
-            self.game.draw_text_center(hint1, WIDTH//2, HEIGHT - 31, size=14, color=(170,170,180))
-            self.game.draw_text_center("Enter/Space - select • Esc/Backspace - back", WIDTH//2, HEIGHT - 12, size=14, color=(170,170,180))
+            self.ui.hint("controls", hint1, HEIGHT - 31)
+            self.ui.hint("hint", "Enter/Space - select • Esc/Backspace - back", HEIGHT - 12)
             return
         
         if self.mode == "confirm":
-            self.game.draw_text_center(self.confirm_text or "Are you sure? (Y/N)", WIDTH//2, HEIGHT//2 - 6, size=20, color=(255,230,210))
-            self.game.draw_text_center("Enter/Space - Yes • Esc/Backspace - No", WIDTH//2, HEIGHT//2 + 18, size=16, color=(180,180,190))
+            self.ui.label("confirm", self.confirm_text or "Are you sure? (Y/N)", (WIDTH//2, HEIGHT//2 - 6), size=20, color=(255,230,210))
+            self.ui.label("confirm_hint", "Enter/Space - Yes • Esc/Backspace - No", (WIDTH//2, HEIGHT//2 + 18), size=16, color=(180,180,190))
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import importlib.util
+import os
+import sys
+
+import pytest
+
+# no window, no audio device: the game runs headless under pytest
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import pygame
+
+def key(k):
+    return pygame.event.Event(pygame.KEYDOWN, key=k, unicode="", mod=0, scancode=0)
+
+@pytest.fixture(scope="session")
+def main_module():
+    # game.py shares its name with the game package, so it is loaded from its path
+    spec = importlib.util.spec_from_file_location("ring_fantasy", os.path.join(ROOT, "game.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+@pytest.fixture
+def game(main_module):
+    game = main_module.Game(headless=True)
+    game.states["menu"].activate("New Game")
+    return game
+
+@pytest.fixture(scope="session")
+def events():
+    from game.game_events import load_events_file
+    return load_events_file(os.path.join(ROOT, "assets", "data", "events.txt"))
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from game.game_events import EVENT_TYPES, ButtonEvent, MonsterEvent, TextBoxEvent, WarpEvent, compile_event, load_events_file
+
+def test_records_are_typed(events):
+    assert all(isinstance(ev, EVENT_TYPES[ev.kind]) for ev in events.values())
+    
+    warp = events[1]
+    assert isinstance(warp, WarpEvent)
+    assert (warp.map_name, warp.x, warp.y, warp.facing) == ("MapT1", 18, 34, 0)
+    assert isinstance(events[134], TextBoxEvent) and events[134].title == "Queen"
+    assert isinstance(events[74], MonsterEvent) and events[74].mon_id == 15
+
+def test_button_data():
+    ev = compile_event(5, "walkable_button", "-1,0@14:00:000")
+    assert isinstance(ev, ButtonEvent)
+    assert (ev.dx, ev.dy, ev.cell) == (-1, 0, (14, 0, 0))
+
+@pytest.mark.parametrize("kind, data, message", [
+    ("teleport", "", "unknown event kind 'teleport'"),
+    ("change_map", "MapT1,18", "expected 'map,x,y,facing'"),
+    ("battle", "9999", "unknown monster 9999"),
+])
+def test_bad_records(kind, data, message):
+    with pytest.raises(ValueError) as e:
+        compile_event(1, kind, data)
+    assert str(e.value) == message
+
+def test_bad_lines_are_skipped(tmp_path, capsys):
+    path = tmp_path / "events.txt"
+    path.write_text("001@sign@Hello\nnope\n002@teleport@x\n003@walkable\n", encoding="utf-8")
+    events = load_events_file(str(path))
+    assert sorted(events) == [1, 3]
+    assert events[1].text == "Hello"
+    assert capsys.readouterr().out.count("[WARN]") == 2
+
+def test_map_kinds_have_handlers(game, events):
+    # every kind placed on a map either has a handler or is terrain
+    handlers = game.states["map"].event_handlers
+    passive = {"start_pos", "text_box", "walkable", "unwalkable"}
+    assert {ev.kind for ev in events.values()} - passive <= set(handlers)
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import pygame
+
+from conftest import key
+
+KEY_ID = 10
+
+def enter_map(game, name, x, y):
+    game.player.map_name = name
+    game.player.x, game.player.y = x, y
+    game.cur_map.load_map()
+
+def press(game, *keys, ticks=30):
+    # one key per beat, each followed by enough ticks for input locks and timers to run out
+    for k in keys:
+        game.simulate(ticks, {0: [key(k)]})
+
+def settle(game, limit=600):
+    # ticks until the map screen has no flow, dialogue or input lock left
+    state = game.states["map"]
+    for _ in range(limit):
+        if game.state is state and state.flow is None and state.modal is None and not game.scheduler.busy():
+            return
+        game.simulate(1)
+    raise AssertionError("the flow did not finish")
+
+def test_queen_hands_out_the_key_and_quest(game):
+    enter_map(game, "MapP1", 12, 4)
+    game.states["map"].trigger_event(12, 3)
+    assert game.states["map"].modal is not None
+    
+    press(game, pygame.K_RETURN, pygame.K_RETURN, pygame.K_RETURN)
+    assert game.player.has_item(KEY_ID) == 1
+    assert game.cur_map.cell_components(12, 3)[2] == 81
+    
+    # the cell's new event runs straight after the script
+    assert game.states["map"].modal is not None
+    press(game, pygame.K_RETURN)
+    settle(game)
+
+def test_queen_declined(game):
+    enter_map(game, "MapP1", 12, 4)
+    game.states["map"].trigger_event(12, 3)
+    press(game, pygame.K_RIGHT, pygame.K_RETURN)
+    settle(game)
+    assert game.player.has_item(KEY_ID) == 0
+    assert game.cur_map.cell_components(12, 3)[2] == 80
+
+def test_locked_door_without_key(game):
+    enter_map(game, "MapP1", 5, 5)
+    game.states["map"].trigger_event(6, 5)
+    assert game.states["map"].modal.buttons == ("OK",)
+    press(game, pygame.K_RETURN)
+    settle(game)
+    assert game.cur_map.cell_components(6, 5)[2] == 59
+
+def test_door_takes_a_key(game):
+    game.player.add_item(KEY_ID)
+    enter_map(game, "MapP1", 5, 5)
+    game.states["map"].trigger_event(6, 5)
+    press(game, pygame.K_RETURN)
+    settle(game)
+    assert game.cur_map.cell_components(6, 5)[2] == 0
+    assert game.player.has_item(KEY_ID) == 0
+    assert game.cur_map.is_walkable(6, 5)
+
+def test_tired_hero_does_not_fight_the_boss(game):
+    game.player.hp = 0
+    enter_map(game, "MapD4", 6, 5)
+    game.states["map"].trigger_event(6, 4)
+    assert game._toast[0] == "I need to rest..."
+    settle(game)
+    assert game.state is game.states["map"]
+
+def test_boss_battle_opens_the_end(game):
+    game.player.mult_str = 200
+    game.player.hp = 9999
+    enter_map(game, "MapD4", 6, 5)
+    game.states["map"].trigger_event(6, 4)
+    press(game, pygame.K_RETURN, pygame.K_RETURN)
+    assert game.state is game.states["battle"]
+    
+    for _ in range(50):
+        if game.state is not game.states["battle"]:
+            break
+        press(game, pygame.K_RETURN)
+    assert game.state is game.states["map"]
+    
+    press(game, pygame.K_RETURN)
+    settle(game)
+    assert game.cur_map.cell_components(6, 3) == (8, 0, 0)
+    assert game.cur_map.cell_components(6, 4) == (8, 44, 139)
+
+def test_dialogue_returns_the_chosen_button(game):
+    state = game.states["map"]
+    answers = []
+    def flow():
+        answers.append((yield from state.dialogue("Go on?", buttons=("Yes", "No"))))
+    
+    state.start_flow(flow())
+    modal = state.modal
+    press(game, pygame.K_RIGHT)
+    assert modal.band_dirty and modal.result is None
+    press(game, pygame.K_RETURN)
+    assert answers == ["No"]
+    assert state.modal is None and state.flow is None
+
+def test_toasts_expire_on_the_simulation_clock(game):
+    game.toast("Hello", duration=2)
+    game.simulate(110)
+    assert game._toast is not None
+    game.simulate(20)
+    assert game._toast is None
+
+def test_simulate_is_deterministic(main_module):
+    def run():
+        game = main_module.Game(headless=True)
+        game.states["menu"].activate("New Game")
+        game.player.add_item(KEY_ID)
+        enter_map(game, "MapP1", 5, 5)
+        game.states["map"].trigger_event(6, 5)
+        press(game, pygame.K_RETURN)
+        settle(game)
+        # auto-walk through the opened door
+        game.states["map"].walk_to(8, 5)
+        game.simulate(120)
+        return game.scheduler.now, game.player.x, game.player.y, game.player.has_item(KEY_ID)
+    first = run()
+    assert first[1:3] == (8, 5)
+    assert run() == first
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+
+from conftest import ROOT
+from game.game_grid import MapGrid, MapOverrides, OverlayGrid
+from game.game_mapfile import IndexedMaps
+
+def maps():
+    return IndexedMaps(os.path.join(ROOT, "assets", "data", "maps.txt"))
+
+def base_grid():
+    # 3x2, an event on the middle of the top row
+    return MapGrid.from_cells(3, 2, [(1, 0, 0), (2, 0, 7), (3, 0, 0), (4, 0, 0), (5, 0, 0), (6, 0, 0)])
+
+def test_overlay_leaves_base_untouched():
+    base = base_grid()
+    grid = OverlayGrid(base)
+    grid[1, 0] = (9, 9, 0)
+    grid[2, 1] = (8, 0, 5)
+    
+    assert grid[1, 0] == (9, 9, 0)
+    assert base[1, 0] == (2, 0, 7)
+    assert [list(plane) for plane in grid.row(1)] == [[4, 5, 8], [0, 0, 0], [0, 0, 5]]
+    assert [cell[2:] for cell in grid.rect(1, 0, 3, 1)] == [(9, 9, 0), (3, 0, 0)]
+    assert sorted(grid.cells_with_event()) == [(2, 1, 5)]
+    assert list(base.cells_with_event()) == [(1, 0, 7)]
+
+def test_temporary_edits_end_with_the_visit(game):
+    game.player.map_name, game.player.x, game.player.y = "MapP1", 5, 5
+    game.cur_map.load_map()
+    game.cur_map.set_event_id_temp(6, 5, 0)
+    assert game.cur_map.cell_components(6, 5)[2] == 0
+    
+    game.cur_map.load_map()
+    assert game.cur_map.cell_components(6, 5)[2] == 59
+    assert game.maps["MapP1"][2][6, 5][2] == 59
+
+def test_legacy_round_trip():
+    flags = {"MapD1,05,07": "22:00:096", "MapD1,12,00": "08:44:139", "MapD2,00,11": "12:00:000"}
+    store = MapOverrides.from_legacy(flags, maps())
+    
+    w = maps().size("MapD1")[0]
+    assert store.get("MapD1", 7 * w + 5) == (22, 0, 96)
+    assert store.version("MapD1") == 2
+    assert store.to_legacy(maps()) == flags
+
+def test_legacy_skips_bad_flags(capsys):
+    flags = {"MapD1,01,01": "1:2", "MapNope,01,01": "01:02:003", "MapD1,xx": "01:02:003", "MapD1,02,02": "01:02:003"}
+    store = MapOverrides.from_legacy(flags, maps())
+    assert store.to_legacy(maps()) == {"MapD1,02,02": "01:02:003"}
+    assert capsys.readouterr().out.count("[WARN]") == 3
+
+def test_clear_bumps_versions():
+    store = MapOverrides()
+    store.set("MapD1", 3, (1, 2, 3))
+    store.clear()
+    assert store.get("MapD1", 3) is None
+    assert store.version("MapD1") == 2
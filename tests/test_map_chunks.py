@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import pygame
+
+from game import gamestate_map
+from game.game_constants import MAP_CHUNK_SIZE
+from game.gamestate_map import TILE_SIZE_SCALED
+
+def enter_map(game, name):
+    game.player.map_name = name
+    game.cur_map.load_map()
+    return game.cur_map
+
+def cell_pixels(surface, x, y):
+    rect = (x * TILE_SIZE_SCALED, y * TILE_SIZE_SCALED, TILE_SIZE_SCALED, TILE_SIZE_SCALED)
+    return pygame.image.tobytes(surface.subsurface(rect), "RGB")
+
+def drawn_cell(game, tile_idx, obj_idx):
+    # one cell drawn the slow way, tile then object
+    surface = pygame.Surface((TILE_SIZE_SCALED, TILE_SIZE_SCALED)).convert()
+    surface.fill((0, 0, 0))
+    surface.blit(game.tiles[tile_idx], (0, 0))
+    if obj_idx:
+        surface.blit(game.objects[obj_idx - 1], (0, 0))
+    return pygame.image.tobytes(surface, "RGB")
+
+def test_chunk_bakes_tiles_and_objects(game):
+    cur_map = enter_map(game, "MapP1")
+    chunk = cur_map.get_chunk(1, 0)
+    assert chunk.get_size() == (MAP_CHUNK_SIZE * TILE_SIZE_SCALED, MAP_CHUNK_SIZE * TILE_SIZE_SCALED)
+    
+    objects = 0
+    for y in range(MAP_CHUNK_SIZE):
+        for x in range(MAP_CHUNK_SIZE):
+            tile_idx, obj_idx, _ = cur_map.cell_components(MAP_CHUNK_SIZE + x, y)
+            objects += obj_idx > 0
+            assert cell_pixels(chunk, x, y) == drawn_cell(game, tile_idx, obj_idx), (x, y)
+    assert objects
+
+def test_edge_chunk_is_clipped_to_the_map(game):
+    cur_map = enter_map(game, "MapD1")
+    cx = cur_map.chunks_w() - 1
+    w = cur_map.w - cx * MAP_CHUNK_SIZE
+    assert cur_map.get_chunk(cx, 0).get_width() == w * TILE_SIZE_SCALED
+
+def test_least_recently_drawn_chunk_is_evicted(game, monkeypatch):
+    monkeypatch.setattr(gamestate_map, "RENDER_CHUNK_BUDGET", 3)
+    cur_map = enter_map(game, "MapD3")
+    first = cur_map.get_chunk(0, 0)
+    cur_map.get_chunk(1, 0)
+    cur_map.get_chunk(2, 0)
+    assert cur_map.get_chunk(0, 0) is first
+    
+    cur_map.get_chunk(0, 1)
+    assert list(cur_map.chunks) == [(2, 0), (0, 0), (0, 1)]
+    assert cur_map.get_chunk(0, 0) is first
+
+def test_invalidated_chunk_is_baked_again(game):
+    cur_map = enter_map(game, "MapP1")
+    chunk = cur_map.get_chunk(0, 0)
+    other = cur_map.get_chunk(1, 0)
+    
+    tile_idx, obj_idx, ev_id = cur_map.cell_components(2, 2)
+    new_tile = next(t for t in range(len(game.tiles)) if t != tile_idx and drawn_cell(game, t, obj_idx) != drawn_cell(game, tile_idx, obj_idx))
+    cur_map.set_override(2, 2, new_tile, obj_idx, ev_id)
+    
+    rebaked = cur_map.get_chunk(0, 0)
+    assert rebaked is not chunk
+    assert cell_pixels(rebaked, 2, 2) == drawn_cell(game, new_tile, obj_idx)
+    assert cell_pixels(rebaked, 3, 2) == cell_pixels(chunk, 3, 2)
+    assert cur_map.get_chunk(1, 0) is other
+    
+    # the saved edit is baked in on the next visit too
+    cur_map.load_map()
+    assert cell_pixels(cur_map.get_chunk(0, 0), 2, 2) == drawn_cell(game, new_tile, obj_idx)
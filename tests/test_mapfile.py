@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import os
+import shutil
+
+import pytest
+
+from conftest import ROOT
+from game.game_mapfile import CompiledMaps, IndexedMaps, load_compiled_maps, parse_map_rows, parse_size_header
+
+MAPS_TXT = os.path.join(ROOT, "assets", "data", "maps.txt")
+
+def parse_text(path):
+    # straight top-to-bottom read of maps.txt: {name: (w, h, cells)}
+    with open(path, "r", encoding="utf-8") as f:
+        lines = [ln.strip() for ln in f if ln.strip() and not ln.strip().startswith("#")]
+    maps = {}
+    i = 0
+    while i < len(lines):
+        name = lines[i]
+        w, h = parse_size_header(name, lines[i + 1], path)
+        maps[name] = (w, h, parse_map_rows(name, w, h, lines[i + 2:i + 2 + h]))
+        i += 2 + h
+    return maps
+
+def cells_of(grid, w, h):
+    return [cell[2:] for cell in grid.rect(0, 0, w, h)]
+
+@pytest.fixture
+def maps_txt(tmp_path):
+    path = tmp_path / "maps.txt"
+    shutil.copy(MAPS_TXT, path)
+    return str(path)
+
+def test_indexed_maps_match_text():
+    expected = parse_text(MAPS_TXT)
+    maps = IndexedMaps(MAPS_TXT)
+    assert list(maps) == list(expected)
+    for name, (w, h, cells) in expected.items():
+        mw, mh, grid = maps[name]
+        assert (mw, mh) == (w, h) == maps.size(name)
+        assert cells_of(grid, w, h) == cells
+
+def test_compiled_maps_match_text(maps_txt):
+    bin_path = maps_txt[:-4] + ".bin"
+    assert isinstance(load_compiled_maps(maps_txt, bin_path, warm=False), IndexedMaps)
+    
+    maps = load_compiled_maps(maps_txt, bin_path)
+    assert isinstance(maps, CompiledMaps)
+    for name, (w, h, cells) in parse_text(maps_txt).items():
+        _, _, grid = maps[name]
+        assert cells_of(grid, w, h) == cells
+        assert sorted(grid.cells_with_event()) == sorted((i % w, i // w, c[2]) for i, c in enumerate(cells) if c[2])
+    maps.close()
+
+def test_stale_bin_is_rebuilt(maps_txt):
+    bin_path = maps_txt[:-4] + ".bin"
+    load_compiled_maps(maps_txt, bin_path, warm=False)
+    with open(maps_txt, "a", encoding="utf-8") as f:
+        f.write("\nMapZ9\nsize: 2,1\n01:02:003,04:05:006\n")
+    
+    maps = load_compiled_maps(maps_txt, bin_path, warm=False)
+    assert isinstance(maps, IndexedMaps)
+    maps = load_compiled_maps(maps_txt, bin_path)
+    assert isinstance(maps, CompiledMaps)
+    assert cells_of(maps["MapZ9"][2], 2, 1) == [(1, 2, 3), (4, 5, 6)]
+    maps.close()
+
+def test_unwritable_cache_falls_back(maps_txt, tmp_path, capsys):
+    bin_path = str(tmp_path / "missing" / "maps.bin")
+    maps = load_compiled_maps(maps_txt, bin_path, warm=False)
+    assert isinstance(maps, IndexedMaps)
+    assert "[WARN]" in capsys.readouterr().out
+
+def test_malformed_cell_is_replaced(tmp_path, capsys):
+    path = tmp_path / "maps.txt"
+    path.write_text("MapA1\nsize: 2,1\n01:02:003,oops\n", encoding="utf-8")
+    _, _, grid = IndexedMaps(str(path))["MapA1"]
+    assert cells_of(grid, 2, 1) == [(1, 2, 3), (99, 99, 0)]
+    assert "MapA1 cell 1,0 is malformed" in capsys.readouterr().out
+
+def test_new_mtime_with_same_content_is_fresh(maps_txt):
+    # what a onefile build sees on every launch: maps.txt unpacked again with a new mtime
+    bin_path = maps_txt[:-4] + ".bin"
+    load_compiled_maps(maps_txt, bin_path, warm=False)
+    st = os.stat(maps_txt)
+    os.utime(maps_txt, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    
+    maps = load_compiled_maps(maps_txt, bin_path, warm=False)
+    assert isinstance(maps, CompiledMaps)
+    maps.close()
+
+def test_same_size_edit_is_stale(maps_txt):
+    bin_path = maps_txt[:-4] + ".bin"
+    load_compiled_maps(maps_txt, bin_path, warm=False)
+    with open(maps_txt, "r+b") as f:
+        data = f.read()
+        f.seek(data.index(b"41:00:000"))
+        f.write(b"42")
+    st = os.stat(maps_txt)
+    os.utime(maps_txt, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    
+    assert isinstance(load_compiled_maps(maps_txt, bin_path, warm=False), IndexedMaps)
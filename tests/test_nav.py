@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from game.game_nav import Navigator
+
+def start_map(game):
+    cur_map = game.cur_map
+    return cur_map, game.player.x, game.player.y
+
+def test_small_window_falls_back_to_the_search(game):
+    cur_map, px, py = start_map(game)
+    small = Navigator(cur_map, radius=3)
+    whole = Navigator(cur_map, radius=cur_map.w + cur_map.h)
+    
+    far = 0
+    for ty in range(cur_map.h):
+        for tx in range(cur_map.w):
+            d = whole.distance(px, py, tx, ty)
+            assert small.distance(px, py, tx, ty) == d, (tx, ty)
+            path = small.path(px, py, tx, ty)
+            assert (path is None) == (d is None) and (path is None or len(path) == d), (tx, ty)
+            far += d is not None and max(abs(tx - px), abs(ty - py)) > 3
+    assert far
+
+def test_search_gives_up_past_its_budget(game):
+    cur_map, px, py = start_map(game)
+    whole = Navigator(cur_map, radius=cur_map.w + cur_map.h)
+    tx, ty = max(((x, y) for y in range(cur_map.h) for x in range(cur_map.w) if whole.distance(px, py, x, y) is not None),
+                 key=lambda c: whole.distance(px, py, *c))
+    
+    nav = Navigator(cur_map, radius=2, budget=20)
+    assert nav.distance(px, py, tx, ty) is None
+    assert nav.next_step(px, py, tx, ty) is None
+    assert len(nav.search(tx, ty).dist) < 24
+
+def test_fields_are_rebuilt_after_an_edit(game):
+    cur_map, px, py = start_map(game)
+    nav = cur_map.nav
+    tx, ty = next((x, y) for x, y in ((px + 1, py), (px - 1, py), (px, py + 1), (px, py - 1)) if cur_map.is_walkable(x, y))
+    assert nav.distance(px, py, tx, ty) == 1
+    
+    tile_idx, _, ev_id = cur_map.cell_components(tx, ty)
+    cur_map.set_override(tx, ty, tile_idx, 2, ev_id)
+    assert not cur_map.is_walkable(tx, ty)
+    # the target itself is reached by bumping into it
+    assert nav.distance(px, py, tx, ty) == 1
+    assert nav.misses == 2
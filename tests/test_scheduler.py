@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import pygame
+
+from conftest import key
+from game.game_scheduler import Scheduler
+
+def test_after_runs_once_in_due_order():
+    s = Scheduler()
+    fired = []
+    s.after(0.5, lambda: fired.append("b"))
+    s.after(0.2, lambda: fired.append("a"))
+    s.after(0.5, lambda: fired.append("c"))
+    
+    s.update(0.1)
+    assert fired == []
+    s.update(0.1)
+    assert fired == ["a"]
+    s.update(0.4)
+    assert fired == ["a", "b", "c"]
+    s.update(1)
+    assert fired == ["a", "b", "c"]
+    assert not s.busy()
+
+def test_cancelled_timer_does_not_run():
+    s = Scheduler()
+    fired = []
+    s.after(0.1, lambda: fired.append(1)).cancel()
+    assert not s.busy()
+    s.update(1)
+    assert fired == []
+
+def test_lock_input_holds_and_releases_in_order():
+    s = Scheduler()
+    s.lock_input(0.5)
+    s.lock_input(0.2)
+    assert s.input_locked and s.busy()
+    
+    other = pygame.event.Event(pygame.USEREVENT)
+    first, second = key(pygame.K_a), key(pygame.K_b)
+    assert s.filter_input([first, other]) == [other]
+    s.update(0.3)
+    assert s.filter_input([second]) == []
+    assert s.busy()
+    
+    s.update(0.3)
+    assert not s.input_locked
+    third = key(pygame.K_c)
+    assert s.filter_input([third]) == [first, second, third]
+    assert s.filter_input([]) == []
+    assert not s.busy()
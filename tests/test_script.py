@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from game.game_script import (
+    ARITY, OP_ASK, OP_GIVE, OP_JUMP, OP_MONSTER, OP_SAY, OP_SET, OP_STOP, OP_TOAST, compile_script,
+)
+
+def compile_lines(events, *lines):
+    return compile_script("test", list(enumerate(lines, 1)), events)
+
+def test_ops_and_arguments(events):
+    script = compile_lines(events, 'say 134', 'give 10', 'monster 15', 'toast "I need to rest..."', 'stop')
+    assert list(script.code) == [OP_SAY, 134, OP_GIVE, 10, OP_MONSTER, 15, OP_TOAST, 0, OP_STOP]
+    assert script.consts == ("I need to rest...",)
+
+def test_labels_resolve_to_code_offsets(events):
+    script = compile_lines(events, 'ask 112 done', 'jump done', 'give 10', 'done:', 'stop')
+    done = 1 + ARITY[OP_ASK] + 1 + ARITY[OP_JUMP] + 1 + ARITY[OP_GIVE]
+    assert list(script.code) == [OP_ASK, 112, done, OP_JUMP, done, OP_GIVE, 10, OP_STOP]
+    assert script.code[done] == OP_STOP
+
+def test_set_positions(events):
+    script = compile_lines(events, 'set +0,-1 22:00:096', 'set 6,3 08:00:000')
+    assert list(script.code) == [OP_SET, 1, 0, -1, 22, 0, 96, OP_SET, 0, 6, 3, 8, 0, 0]
+
+def test_scripts_file_compiles(game):
+    assert {"queen", "princess", "door", "boss"} <= set(game.scripts)
+
+@pytest.mark.parametrize("lines, message", [
+    (('dance',), "line 1: unknown op 'dance'"),
+    (('give',), "line 1: 'give' takes 1 argument(s)"),
+    (('say 10', 'say 1'), "line 1: event 10 is not a text"),
+    (('give 9999',), "line 1: unknown item 9999"),
+    (('monster 9999',), "line 1: unknown monster 9999"),
+    (('set 1,1 2:3',), "line 1: expected 'tile:object:event'"),
+    (('stop', 'jump nowhere'), "line 2: unknown label 'nowhere'"),
+    (('a:', 'a:'), "line 2: label 'a' defined twice"),
+])
+def test_errors_name_the_line(events, lines, message):
+    with pytest.raises(ValueError) as e:
+        compile_lines(events, *lines)
+    assert str(e.value) == message
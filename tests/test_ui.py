@@ -0,0 +1,20 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from game.game_ui import Label, ListView, Widget
+
+def test_widget_without_build_fails_when_created(game):
+    class Broken(Widget):
+        pass
+    
+    with pytest.raises(TypeError):
+        Broken(game)
+
+def test_list_view_draws_through_its_rows(game):
+    view = ListView(game).set(["Sword", "Shield"], 1, (100, 50), row_height=20)
+    assert [type(leaf) for leaf in view.leaves()] == [Label, Label]
+    for leaf in view.leaves():
+        leaf.prepare()
+    assert view.leaves()[1].props["color"] == (255, 220, 120)
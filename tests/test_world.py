@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from game.game_world import WorldGraph
+
+DOORS = ((6, 5), (18, 5), (6, 15), (18, 15))
+
+def routes(world, game, name):
+    # from every other cell: the maps in reach and the way to the final battle
+    w, h = game.maps.size(name)
+    return {(x, y): (world.reachable_maps(name, x, y), world.route(name, "MapD4", x, y)) for y in range(0, h, 2) for x in range(0, w, 2)}
+
+def test_nothing_is_scanned_before_a_query(game):
+    assert game.world.scans == {}
+    game.world.route(game.player.map_name, "MapT1", game.player.x, game.player.y)
+    assert game.player.map_name in game.world.scans
+    assert len(game.world.scans) < len(game.maps)
+
+def test_edits_update_routes_in_place(game):
+    game.player.map_name, game.player.x, game.player.y = "MapP1", 5, 5
+    game.cur_map.load_map()
+    before = routes(game.world, game, "MapP1")
+    scan = game.world.scans["MapP1"]
+    
+    for x, y in DOORS:
+        game.cur_map.set_event_id(x, y, 0)
+    assert game.world.scans["MapP1"] is scan
+    assert "door" not in scan.kinds
+    after = routes(game.world, game, "MapP1")
+    assert after != before
+    assert after == routes(WorldGraph(game), game, "MapP1")
+    
+    tile_idx, _, _ = game.cur_map.cell_components(6, 5)
+    game.cur_map.set_override(6, 5, tile_idx, 2, 0)
+    assert routes(game.world, game, "MapP1") == routes(WorldGraph(game), game, "MapP1")
+
+def test_only_anchor_cells_are_remembered(game):
+    world = game.world
+    for name in game.maps:
+        world.reachable_maps(name, *game.maps.size(name))
+        w, h = game.maps.size(name)
+        for y in range(0, h, 3):
+            for x in range(0, w, 3):
+                world.reachable_maps(name, x, y)
+    for scan in world.scans.values():
+        arrivals = {warp[4:] for other in world.scans.values() for warp in other.warps.values() if warp[3] == scan.name}
+        for x, y in scan.labels:
+            near_warp = any((x + dx, y + dy) in scan.warps for dx, dy in ((0, -1), (-1, 0), (1, 0), (0, 1)))
+            assert near_warp or (x, y) in arrivals or any((x + dx, y + dy) in arrivals for dx, dy in ((0, -1), (-1, 0), (1, 0), (0, 1)))
+
+def test_new_game_starts_over(game):
+    game.player.map_name, game.player.x, game.player.y = "MapP1", 5, 5
+    game.cur_map.load_map()
+    game.cur_map.set_event_id(6, 5, 0)
+    assert game.world.maps_with("door").count("MapP1") == 1
+    
+    game.states["menu"].activate("New Game")
+    assert "door" in game.world.scan("MapP1").kinds